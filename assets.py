@@ -0,0 +1,210 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pygame
+
+
+def owned_bytes(value):
+    """
+    pixel memory owned by a surface, or by all surfaces in a (nested) dict, list or tuple. subsurfaces share the
+    pixels of their parent and own nothing
+    """
+    if isinstance(value, pygame.Surface):
+        if value.get_parent() is not None:
+            return 0
+        return value.get_pitch() * value.get_height()
+
+    if isinstance(value, dict):
+        return sum(owned_bytes(item) for item in value.values())
+
+    if isinstance(value, (list, tuple)):
+        return sum(owned_bytes(item) for item in value)
+
+    return 0
+
+
+class _Entry(object):
+    def __init__(self, key):
+        self.key = key
+        self.value = None
+        self.size = 0
+
+        # keys of the entries that were requested while building this one (i.e. the sheet a sprite set was cut from)
+        self.depends = set()
+        self.dependents = set()
+
+        # ids of the maps this asset was requested for. None stands for anything loaded outside of a map
+        self.maps = set()
+
+
+class AssetManager(object):
+    """
+    one shared cache for every surface the game loads, deduplicated by key (path and slicing parameters).
+
+    assets are kept in least recently used order and evicted from the front whenever the pixel memory they own goes
+    over the budget. an asset that was built from other assets (i.e. a set of subsurfaces cut from a sheet) depends
+    on them: using it keeps them fresh, and evicting one of them evicts it as well.
+
+    everything requested inside map_scope(map_id) is tagged with that map, so that purge_map() can drop the assets
+    that no other map (nor the player or the ui) asked for once the map has been left.
+
+    the manager can be shared by threads (see scheduling.SystemScheduler): the map scope and the assets being built
+    are kept per thread, and one thread at a time looks up, builds or evicts.
+    """
+
+    def __init__(self, budget=64 * 1024 * 1024):
+        self.budget = budget
+
+        # purge the assets of a map when it is left (see helpers.map_transition)
+        self.purge_maps = True
+
+        self._entries = OrderedDict()
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def current_map(self):
+        return getattr(self._local, 'current_map', None)
+
+    @current_map.setter
+    def current_map(self, map_id):
+        self._local.current_map = map_id
+
+    @property
+    def _building(self):
+        building = getattr(self._local, 'building', None)
+        if building is None:
+            building = self._local.building = []
+        return building
+
+    def get(self, key, factory):
+        """
+        return the asset cached under key, building it with factory() on a miss
+        """
+        with self._lock:
+            return self._get(key, factory)
+
+    def _get(self, key, factory):
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self.hits += 1
+            self._touch(entry, self.current_map)
+        else:
+            self.misses += 1
+
+            entry = _Entry(key)
+            self._building.append(entry)
+            try:
+                entry.value = factory()
+            finally:
+                self._building.pop()
+
+            entry.size = owned_bytes(entry.value)
+            entry.maps.add(self.current_map)
+            self._entries[key] = entry
+            self.bytes += entry.size
+
+        if self._building:
+            parent = self._building[-1]
+            parent.depends.add(key)
+            entry.dependents.add(parent.key)
+        else:
+            # only evict once the outermost asset is complete, never in the middle of building one
+            self._shrink()
+
+        return entry.value
+
+    def image(self, name, alpha=True):
+        """
+        an image file decoded once and converted to the display format
+        """
+        return self.get(('image', name, alpha), lambda: self._load_image(name, alpha))
+
+    @contextmanager
+    def map_scope(self, map_id):
+        previous, self.current_map = self.current_map, map_id
+        try:
+            yield
+        finally:
+            self.current_map = previous
+
+    def purge_map(self, map_id):
+        """
+        evict every asset that was only ever requested for the given map
+        """
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.maps == {map_id} and entry.key in self._entries:
+                    self.evict(entry.key)
+
+    def leave_map(self, map_id):
+        if self.purge_maps:
+            self.purge_map(map_id)
+
+    def evict(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+
+            self.bytes -= entry.size
+            self.evictions += 1
+
+            for dependent in entry.dependents:
+                self.evict(dependent)
+
+            for dependency in entry.depends:
+                other = self._entries.get(dependency)
+                if other is not None:
+                    other.dependents.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'evictions': self.evictions
+        }
+
+    def _touch(self, entry, map_id):
+        self._entries.move_to_end(entry.key)
+        entry.maps.add(map_id)
+
+        for dependency in entry.depends:
+            other = self._entries.get(dependency)
+            if other is not None:
+                self._touch(other, map_id)
+
+    def _shrink(self):
+        while self.bytes > self.budget and len(self._entries) > 1:
+            self.evict(next(iter(self._entries)))
+
+    @staticmethod
+    def _load_image(name, alpha):
+        image = pygame.image.load(os.path.join('./', name))
+        return image.convert_alpha() if alpha else image.convert()
+
+
+# the asset manager shared by all loaders
+asset_manager = AssetManager()
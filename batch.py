@@ -0,0 +1,224 @@
+"""
+balance sweeps: play many headless games at once, one for every combination of cobra stats (see COBRA_STATS) and
+map, spread over a pool of worker processes. the player is either driven by AiPilot, which goes for the closest
+automaton and swings at it, or by a scripted input stream (see headless.load_input_script). i.e.
+
+    python batch.py --maps 2,3 --aggro-range 200,300,400 --damage 5,10 --frames 7200 --output sweep.json
+
+every worker loads the maps and sprites once and reuses them for all of its games. per combination of stats and map,
+the time it took the player to die, the damage it took and the frames simulated per second are reported.
+"""
+import os
+
+# must be set before pygame initializes the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# pygame.init would otherwise install SDL's handler for SIGTERM in the workers, which swallows it when the pool is done
+os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+import argparse
+import csv
+import itertools
+import json
+import time
+from ast import literal_eval
+from multiprocessing import Pool
+
+from pygame.locals import K_LEFT, K_RIGHT, K_UP, K_DOWN, K_SPACE
+
+import headless
+from components import AutomatonComponent, BoundsComponent
+from constants import COBRA_STATS
+from loader import load_map_files
+
+# the maps of this process, loaded by init_worker
+_world = None
+
+# filename -> input script, loaded on first use
+_scripts = {}
+
+
+class AiPilot(object):
+    """
+    plays for the player: walks toward the closest automaton and swings at it once it is within reach
+    """
+
+    # the direction each arrow key moves the player in on screen, where y grows downward (see input_system)
+    directions = {K_LEFT: (-1, 0), K_RIGHT: (1, 0), K_UP: (0, -1), K_DOWN: (0, 1)}
+
+    # pixels between the centers of the player and its target
+    reach = 80
+
+    def __init__(self):
+        self.held = set()
+
+    def __call__(self, frame, entities, player):
+        bounds = player.components[BoundsComponent.name].bounds
+
+        target = None
+        distance = None
+        for entity in entities.query([AutomatonComponent.name, BoundsComponent.name]):
+            other = entity.components[BoundsComponent.name].bounds
+            d = (other.centerx - bounds.centerx) ** 2 + (other.centery - bounds.centery) ** 2
+            if distance is None or d < distance:
+                target, distance = other, d
+
+        key_transitions = {}
+        wanted = set()
+
+        if target is not None:
+            dx, dy = target.centerx - bounds.centerx, target.centery - bounds.centery
+
+            for key, (x, y) in self.directions.items():
+                if dx * x > self.reach // 2 or dy * y > self.reach // 2:
+                    wanted.add(key)
+
+            if abs(dx) <= self.reach and abs(dy) <= self.reach:
+                key_transitions[K_SPACE] = True
+
+        for key in self.held - wanted:
+            key_transitions[key] = False
+        for key in wanted - self.held:
+            key_transitions[key] = True
+        self.held = wanted
+
+        return key_transitions
+
+
+def init_worker():
+    global _world
+
+    headless.init_display()
+    _world = load_map_files()
+
+
+def run_game(task):
+    """
+    play one game in this process. task is a dict with the 'stats' to override COBRA_STATS with, the 'map' to start
+    on, the number of 'frames' to play at most, the 'delta' of every frame and the 'pilot' ('ai' or the filename of an
+    input script)
+
+    Returns: the task plus the result of headless.run_headless
+    """
+    if _world is None:
+        init_worker()
+
+    if task['pilot'] == 'ai':
+        pilot, script = AiPilot(), None
+    else:
+        pilot = None
+        script = _scripts.get(task['pilot'])
+        if script is None:
+            script = _scripts[task['pilot']] = headless.load_input_script(task['pilot'])
+
+    result = headless.run_headless(_world, task['frames'], map_id=task['map'], script=script, delta_time=task['delta'],
+                                   pilot=pilot, stop_on_death=True, cobra_stats=task['stats'])
+
+    return dict(task, **result)
+
+
+def run_batch(tasks, workers=None):
+    """
+    play every task (see run_game) on a pool of workers processes (one per core if None)
+
+    Returns: (list of results in the order of tasks, seconds it took)
+    """
+    start = time.perf_counter()
+
+    if workers == 1:
+        results = [run_game(task) for task in tasks]
+    else:
+        pool = Pool(workers, initializer=init_worker)
+        try:
+            results = pool.map(run_game, tasks, chunksize=1)
+        finally:
+            # let the workers run out on their own rather than terminating them
+            pool.close()
+            pool.join()
+
+    return results, time.perf_counter() - start
+
+
+def make_tasks(sweep, maps, frames, delta=16, pilot='ai'):
+    """
+    Args:
+        sweep: dict of COBRA_STATS key -> list of values to try, the other stats keep their default
+        maps: ids of the maps to start on
+
+    Returns: one task for every combination of the swept values and map
+    """
+    keys = sorted(sweep)
+    return [{'stats': dict(zip(keys, values)), 'map': map_id, 'frames': frames, 'delta': delta, 'pilot': pilot}
+            for values in itertools.product(*(sweep[key] for key in keys))
+            for map_id in maps]
+
+
+def summarize(results):
+    """
+    Returns: one row per task, with the stats flattened into it and the time to death in seconds (None if the player
+        survived)
+    """
+    rows = []
+    for result in results:
+        row = dict(result['stats'])
+        row.update({
+            'map': result['map'],
+            'frames': result['frames'],
+            'died': result['death_frame'] is not None,
+            'time_to_death': result['death_frame'] * result['delta'] / 1000.0
+            if result['death_frame'] is not None else None,
+            'damage_taken': result['damage_taken'],
+            'fps': result['fps']
+        })
+        rows.append(row)
+
+    return rows
+
+
+def dump(rows, filename):
+    if filename.endswith('.csv'):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=sorted(rows[0]) if rows else [])
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(filename, 'w') as f:
+            json.dump(rows, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play headless games for every combination of cobra stats')
+    parser.add_argument('--maps', default='2,3', help='comma separated ids of the maps to start on')
+    parser.add_argument('--frames', type=int, default=3600, help='frames to play at most, unless the player dies')
+    parser.add_argument('--delta', type=int, default=16, help='fixed delta_time per frame in milliseconds')
+    parser.add_argument('--pilot', default='ai', help="'ai' or an input script, see headless.load_input_script")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--output', metavar='FILE', default=None, help='write every game to FILE (.json or .csv)')
+    for key, value in sorted(COBRA_STATS.items()):
+        parser.add_argument('--' + key.replace('_', '-'), dest=key, default=None,
+                            help='comma separated values to try for {} (default {})'.format(key, value))
+    args = parser.parse_args()
+
+    sweep = {key: [literal_eval(value) for value in getattr(args, key).split(',')]
+             for key in COBRA_STATS if getattr(args, key) is not None}
+
+    tasks = make_tasks(sweep, args.maps.split(','), args.frames, args.delta, args.pilot)
+    results, seconds = run_batch(tasks, args.workers)
+    rows = summarize(results)
+
+    keys = sorted(sweep)
+    print(' '.join('{:>12}'.format(key) for key in keys + ['map', 'death (s)', 'taken', 'fps']))
+    for row in rows:
+        death = '{:.2f}'.format(row['time_to_death']) if row['died'] else 'survived'
+        print(' '.join('{:>12}'.format(str(row[key])) for key in keys + ['map']) +
+              ' {:>12} {:>12} {:>12.0f}'.format(death, row['damage_taken'], row['fps']))
+
+    frames = sum(row['frames'] for row in rows)
+    print('{} games, {} frames in {:.2f} s: {:.0f} frames per second over all workers'.format(
+        len(rows), frames, seconds, frames / seconds))
+
+    if args.output:
+        dump(rows, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+"""
+stand-alone benchmarks for the engine. run them from the repository root so that the data paths resolve, i.e.
+
+    python -m benchmarks.entity_queries
+"""
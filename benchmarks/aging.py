@@ -0,0 +1,56 @@
+"""
+aging_system with many entities of which only a few carry timed components (attacks with a time to live, rooted,
+invulnerable, ...). compares counting every ttl down every frame (scan_aging) with the timer heap of EntityRegistry,
+which only looks at the timers that are due.
+"""
+import random
+import timeit
+
+from components import *
+from benchmarks.scenes import make_world
+from registry import EntityRegistry
+from systems import aging_system, scan_aging
+
+FRAMES = 100
+DELTA = 16
+TIMED = 200
+
+
+def make_scene(size, rng):
+    entities = make_world(size, rng)
+
+    for entity in rng.sample(entities, TIMED):
+        entity.components[InvulnerableComponent.name] = InvulnerableComponent(rng.randrange(100, 100000))
+    for entity in rng.sample(entities, TIMED):
+        entity.components[TimeToLiveComponent.name] = TimeToLiveComponent(rng.randrange(100, 100000))
+
+    return entities
+
+
+def benchmark(size, heap):
+    registry = EntityRegistry(make_scene(size, random.Random(8)))
+
+    if heap:
+        def frame():
+            aging_system(registry, delta_time=DELTA)
+            registry.flush()
+    else:
+        frame = lambda: scan_aging(registry, DELTA)
+
+    seconds = timeit.timeit(frame, number=FRAMES)
+    return seconds * 1000 / FRAMES, len(registry)
+
+
+def main():
+    print('{} timed components of each kind, ms per aging_system call'.format(TIMED))
+    print('{:>8} {:>10} {:>10} {:>8}'.format('entities', 'scan', 'heap', 'speedup'))
+
+    for size in (1000, 5000, 20000):
+        scan, left_scan = benchmark(size, False)
+        heap, left_heap = benchmark(size, True)
+        assert left_scan == left_heap
+        print('{:>8} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(size, scan, heap, scan / heap))
+
+
+if __name__ == '__main__':
+    main()
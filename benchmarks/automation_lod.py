@@ -0,0 +1,48 @@
+"""
+automation_system on a large map with thousands of cobras spread around the player. compares planning every automaton
+on every frame (the whole map in the viewport) with the level of detail scheduling, where only the automatons near the
+player or on screen are planned every frame.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from benchmarks.scenes import make_entity
+from registry import EntityRegistry
+from systems import automation_system
+
+FRAMES = 64
+SIDE = 8000
+
+
+def make_scene(cobras, rng):
+    entities = [make_entity('cobra', rng.randrange(0, SIDE), rng.randrange(0, SIDE)) for _ in range(cobras)]
+    entities.append(make_entity('player', SIDE // 2, SIDE // 2))
+    return entities
+
+
+def benchmark(cobras, viewport):
+    registry = EntityRegistry(make_scene(cobras, random.Random(7)))
+
+    # first frame plans everyone once
+    automation_system(registry, viewport=viewport)
+    seconds = timeit.timeit(lambda: automation_system(registry, viewport=viewport), number=FRAMES)
+
+    return seconds * 1000 / FRAMES
+
+
+def main():
+    screen = Rect(SIDE // 2 - 320, SIDE // 2 - 240, 640, 480)
+
+    print('ms per automation_system call, {0}x{0} map'.format(SIDE))
+    print('{:>8} {:>12} {:>12} {:>8}'.format('cobras', 'every frame', 'lod', 'speedup'))
+
+    for cobras in (500, 2000, 8000):
+        full = benchmark(cobras, Rect(0, 0, SIDE, SIDE))
+        lod = benchmark(cobras, screen)
+        print('{:>8} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(cobras, full, lod, full / lod))
+
+
+if __name__ == '__main__':
+    main()
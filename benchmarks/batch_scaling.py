@@ -0,0 +1,33 @@
+"""
+throughput of batch.run_batch with more and more worker processes, up to one per core. the same sweep of cobra stats
+is played every time, so the frames per second over all workers should grow with the workers as long as there are
+cores for them.
+"""
+import os
+
+from batch import make_tasks, run_batch
+
+FRAMES = 2000
+SWEEP = {'damage': [5, 10, 20, 40], 'aggro_range': [200, 300, 400]}
+MAPS = ['2', '3']
+
+
+def main():
+    cores = os.cpu_count() or 1
+    tasks = make_tasks(SWEEP, MAPS, FRAMES)
+
+    print('{} games of up to {} frames, {} cores'.format(len(tasks), FRAMES, cores))
+    print('{:>8} {:>10} {:>12} {:>8}'.format('workers', 'seconds', 'frames / s', 'scaling'))
+
+    base = None
+    workers = 1
+    while workers <= cores:
+        results, seconds = run_batch(tasks, workers)
+        throughput = sum(result['frames'] for result in results) / seconds
+        base = base or throughput
+        print('{:>8} {:>10.2f} {:>12.0f} {:>7.2f}x'.format(workers, seconds, throughput, throughput / base))
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+change tracking: a crowd of movers where only a few change their velocity every frame, as when most automatons are
+planned every few frames only (see automation_system). compares direction_system and
+direction_movement_animation_system going over every mover each frame (what they did before the registry tracked
+changes) with them only going over the movers that changed (EntityRegistry.changed).
+
+then the same with automation_system planning a crowd of cobras around a player that stands still, every cobra on
+every frame. once they have turned to the player, planning them again keeps their velocity as it is, so the systems
+after it have nothing left to do.
+
+checks that both end up with the same directions and animation states.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import *
+from constants import *
+from entities import Entity
+from registry import EntityRegistry
+from systems import direction_system, direction_movement_animation_system, automation_system
+
+FRAMES = 200
+# movers that change their velocity per frame
+CHANGES = 20
+# side of the square the cobras are spread over, the player stands in the middle
+SIDE = 2000
+
+STATES = [state + direction for state in (STATE_MOVING, STATE_STANDING_STILL)
+          for direction in (DirectionComponent.North, DirectionComponent.South, DirectionComponent.East,
+                            DirectionComponent.West)]
+
+
+class UntrackedRegistry(EntityRegistry):
+    """
+    hands out every entity of the query, like the registry did before it tracked changes
+    """
+
+    def changed(self, key, watched, required, optional=(), disallowed=()):
+        return self.query(required, optional, disallowed)
+
+
+def make_mover(rng):
+    return Entity([AnimatedSpriteComponent({state: [None] for state in STATES}),
+                   BoundsComponent(Rect(rng.randrange(0, SIDE), rng.randrange(0, SIDE), 64, 64)),
+                   MovementComponent(), DirectionComponent()])
+
+
+def make_cobra(rng):
+    cobra = make_mover(rng)
+    cobra.components[AutomatonComponent.name] = AutomatonComponent(PERSONALITY_AGGRESSIVE)
+    cobra.components[AttributesComponent.name] = AttributesComponent({ATTRIBUTES_AGGRO_RANGE: 300,
+                                                                      ATTRIBUTES_MOVE_SPEED: 0.09})
+    return cobra
+
+
+def simulate(entities, rng):
+    movers = list(entities)
+
+    for _ in range(FRAMES):
+        for mover in rng.sample(movers, CHANGES):
+            mov = mover.components[MovementComponent.name]
+            mov.reset_constant()
+            mov.add_constant(rng.choice((-0.1, 0, 0.1)), rng.choice((-0.1, 0, 0.1)))
+
+        direction_system(entities)
+        direction_movement_animation_system(entities)
+
+
+def simulate_automatons(entities, rng):
+    # the whole square is on screen, so every cobra is planned on every frame
+    viewport = Rect(0, 0, SIDE + 64, SIDE + 64)
+
+    for _ in range(FRAMES):
+        automation_system(entities, viewport=viewport)
+        direction_system(entities)
+        direction_movement_animation_system(entities)
+
+
+def benchmark(size, registry_class, simulation=simulate, make=make_mover):
+    rng = random.Random(5)
+    entities = registry_class(make(rng) for _ in range(size))
+    if simulation is simulate_automatons:
+        entities.append(Entity([BoundsComponent(Rect(SIDE // 2, SIDE // 2, 64, 64)), PlayerComponent()]))
+
+    seconds = timeit.timeit(lambda: simulation(entities, rng), number=1)
+
+    states = [(entity.components[DirectionComponent.name].direction,
+               entity.components[AnimatedSpriteComponent.name].state)
+              for entity in entities if DirectionComponent.name in entity.components]
+    return seconds * 1000 / FRAMES, states
+
+
+def main():
+    print('{} of the movers change their velocity per frame, ms per frame'.format(CHANGES))
+    print('{:>8} {:>10} {:>10} {:>8}'.format('movers', 'every', 'changed', 'speedup'))
+
+    for size in (1000, 5000, 20000):
+        every, expected = benchmark(size, UntrackedRegistry)
+        changed, states = benchmark(size, EntityRegistry)
+        assert states == expected
+
+        print('{:>8} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(size, every, changed, every / changed))
+
+    print('automation_system plans every cobra per frame, ms per frame')
+    print('{:>8} {:>10} {:>10} {:>8}'.format('cobras', 'every', 'changed', 'speedup'))
+
+    for size in (1000, 5000):
+        every, expected = benchmark(size, UntrackedRegistry, simulate_automatons, make_cobra)
+        changed, states = benchmark(size, EntityRegistry, simulate_automatons, make_cobra)
+        assert states == expected
+
+        print('{:>8} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(size, every, changed, every / changed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+stress scene for movement_system / collision_system: thousands of target dummies and a few hundred cobras walking
+through them at constant speed. compares the spatial hash broadphase of EntityRegistry with testing every mover
+against every bounded entity (cell_size=None).
+
+the playing field grows with the number of dummies so that the density, and with it the number of actual collisions
+per mover, stays the same.
+"""
+import random
+import timeit
+from math import sqrt
+
+from components import *
+from benchmarks.scenes import make_entity
+from registry import EntityRegistry
+from systems import movement_system
+
+MOVERS = 200
+FRAMES = 10
+DELTA = 16
+
+
+def make_scene(dummies, rng):
+    side = int(sqrt(dummies) * 128)
+
+    entities = [make_entity('dummy', rng.randrange(0, side), rng.randrange(0, side)) for _ in range(dummies)]
+
+    for _ in range(MOVERS):
+        cobra = make_entity('cobra', rng.randrange(0, side), rng.randrange(0, side))
+        cobra.components[MovementComponent.name].add_constant(rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1))
+        entities.append(cobra)
+
+    return entities
+
+
+def benchmark(dummies, cell_size):
+    registry = EntityRegistry(make_scene(dummies, random.Random(2)), cell_size=cell_size)
+
+    movement_system(registry, delta_time=DELTA)
+    seconds = timeit.timeit(lambda: movement_system(registry, delta_time=DELTA), number=FRAMES)
+
+    return seconds * 1000 / FRAMES
+
+
+def main():
+    print('{} movers, ms per movement_system call'.format(MOVERS))
+    print('{:>8} {:>12} {:>12} {:>8}'.format('dummies', 'brute force', 'broadphase', 'speedup'))
+
+    for dummies in (250, 1000, 2000, 4000):
+        brute = benchmark(dummies, None)
+        hashed = benchmark(dummies, 64)
+        print('{:>8} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(dummies, brute, hashed, brute / hashed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+crowd scene for movement_system: thousands of cobras walking around a field scattered with walls and target dummies,
+some of them still being knocked back. compares the plain per entity movement_system with the numpy struct-of-arrays
+backend (EntityRegistry(vectorized_movement=True)) and checks that both end up with the same positions.
+
+the field grows with the crowd so that the density, and with it the share of movers that touch something, stays the
+same.
+"""
+import random
+import timeit
+from math import sqrt
+
+from components import *
+from benchmarks.scenes import make_entity
+from registry import EntityRegistry
+from systems import movement_system
+
+FRAMES = 20
+DELTA = 16
+
+
+def make_scene(movers, rng):
+    side = int(sqrt(movers) * 256)
+
+    entities = []
+    for _ in range(movers // 10):
+        entities.append(make_entity(rng.choice(['wall', 'dummy']), rng.randrange(0, side), rng.randrange(0, side)))
+
+    for _ in range(movers):
+        cobra = make_entity('cobra', rng.randrange(0, side), rng.randrange(0, side))
+        mov = cobra.components[MovementComponent.name]
+        mov.add_constant(rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1))
+        if rng.random() < 0.05:
+            mov.add_dynamic(rng.uniform(-0.8, 0.8), rng.uniform(-0.8, 0.8), rng.randrange(10, 200))
+        entities.append(cobra)
+
+    return entities
+
+
+def positions(registry):
+    return [tuple(entity.components[BoundsComponent.name].bounds) for entity in registry]
+
+
+def benchmark(movers, vectorized):
+    registry = EntityRegistry(make_scene(movers, random.Random(4)), vectorized_movement=vectorized)
+
+    movement_system(registry, delta_time=DELTA)
+    seconds = timeit.timeit(lambda: movement_system(registry, delta_time=DELTA), number=FRAMES)
+
+    return seconds * 1000 / FRAMES, positions(registry)
+
+
+def main():
+    print('ms per movement_system call')
+    print('{:>8} {:>10} {:>10} {:>8}  {}'.format('movers', 'python', 'numpy', 'speedup', 'same positions'))
+
+    for movers in (500, 2000, 5000, 10000):
+        python, expected = benchmark(movers, False)
+        vectorized, result = benchmark(movers, True)
+        print('{:>8} {:>10.2f} {:>10.2f} {:>7.1f}x  {}'.format(movers, python, vectorized, python / vectorized,
+                                                               result == expected))
+
+
+if __name__ == '__main__':
+    main()
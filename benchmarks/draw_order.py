@@ -0,0 +1,73 @@
+"""
+the draw list of graphics_system for a scene of walls, dummies and walking cobras on a map much larger than the screen.
+compares building and sorting the list from the query every frame (what graphics_system used to do) with the
+DrawOrder the registry keeps sorted as entities move, both with the whole map and with one screen as the viewport.
+
+checks that both give the same entities in the same order every frame.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import *
+from benchmarks.scenes import make_entity
+from registry import EntityRegistry
+from systems import movement_system, relevant_entities
+
+FRAMES = 50
+DELTA = 16
+SIDE = 6000
+
+
+def make_scene(size, rng):
+    entities = []
+    for _ in range(size):
+        entity = make_entity(rng.choice(['wall', 'dummy', 'dummy', 'cobra']), rng.randrange(0, SIDE),
+                             rng.randrange(0, SIDE))
+        mov = entity.components.get(MovementComponent.name)
+        if mov is not None:
+            mov.add_constant(rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1))
+        entities.append(entity)
+    return entities
+
+
+def sorted_list(registry, viewport):
+    entities_to_draw = [entity for entity in relevant_entities(registry, [BoundsComponent.name],
+                                                               [(AnimatedSpriteComponent.name, SpriteComponent.name)])
+                        if viewport.colliderect(entity.components[BoundsComponent.name].bounds)]
+    entities_to_draw.sort(key=lambda x: x.components[BoundsComponent.name].bounds.y)
+    return entities_to_draw
+
+
+def draw_order(registry, viewport):
+    return registry.draw_order.visible(viewport)
+
+
+def benchmark(size, build, viewport):
+    registry = EntityRegistry(make_scene(size, random.Random(9)))
+    seconds = 0.0
+
+    for _ in range(FRAMES):
+        movement_system(registry, delta_time=DELTA)
+        seconds += timeit.timeit(lambda: build(registry, viewport), number=1)
+        assert build(registry, viewport) == sorted_list(registry, viewport)
+
+    return seconds * 1000 / FRAMES
+
+
+def main():
+    viewports = [('whole map', Rect(0, 0, SIDE, SIDE)), ('one screen', Rect(SIDE // 2, SIDE // 2, 640, 480))]
+
+    print('ms to get the draw list per frame, {0}x{0} map'.format(SIDE))
+    print('{:>8} {:>12} {:>10} {:>12} {:>8}'.format('entities', 'viewport', 'sort', 'draw order', 'speedup'))
+
+    for size in (1000, 5000, 20000):
+        for name, viewport in viewports:
+            full = benchmark(size, sorted_list, viewport)
+            kept = benchmark(size, draw_order, viewport)
+            print('{:>8} {:>12} {:>10.3f} {:>12.3f} {:>7.1f}x'.format(size, name, full, kept, full / kept))
+
+
+if __name__ == '__main__':
+    main()
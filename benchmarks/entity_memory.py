@@ -0,0 +1,103 @@
+"""
+memory per entity for 100k entities shaped like CobraEntity and DummyEntity (placeholder sprites shared by all of
+them, like the loaders share theirs).
+
+the slotted Entity and components are compared with twins of the same classes that keep their attributes in a
+per-instance __dict__ again, the way they used to.
+"""
+import gc
+import tracemalloc
+
+from pygame import Rect
+
+import components
+from constants import *
+from entities import Entity
+
+COUNT = 100000
+
+SPRITES = {STATE_STANDING_STILL: [None]}
+
+
+def with_dict(cls):
+    """
+    a copy of cls (methods of its bases included) without any __slots__
+    """
+    slots = set()
+    namespace = {}
+    for klass in reversed(cls.__mro__[:-1]):
+        namespace.update(klass.__dict__)
+        slots.update(klass.__dict__.get('__slots__', ()))
+
+    for name in slots | {'__slots__', '__dict__', '__weakref__'}:
+        namespace.pop(name, None)
+
+    return type(cls.__name__, (object,), namespace)
+
+
+class Kinds(object):
+    """
+    the classes the builders below construct, either the real ones or their __dict__ twins
+    """
+
+    def __init__(self, dicts):
+        for name in ('AnimatedSpriteComponent', 'BoundsComponent', 'MovementComponent', 'DirectionComponent',
+                     'HealthComponent', 'AutomatonComponent', 'AttributesComponent', 'CollisionKnockbackComponent',
+                     'CollisionDamagingComponent'):
+            cls = getattr(components, name)
+            setattr(self, name, with_dict(cls) if dicts else cls)
+
+        self.Entity = with_dict(Entity) if dicts else Entity
+
+
+def cobra(kinds, x, y):
+    return kinds.Entity([
+        kinds.AnimatedSpriteComponent(SPRITES, STATE_STANDING_STILL, 150),
+        kinds.BoundsComponent(Rect(x, y, 96, 96)),
+        kinds.MovementComponent(),
+        kinds.DirectionComponent(),
+        kinds.HealthComponent(100),
+        kinds.AutomatonComponent(components.PERSONALITY_AGGRESSIVE),
+        kinds.AttributesComponent({
+            components.ATTRIBUTES_AGGRO_RANGE: 300,
+            components.ATTRIBUTES_ATTACK_RANGE: 50,
+            components.ATTRIBUTES_MOVE_SPEED: 0.09
+        }),
+        kinds.CollisionKnockbackComponent(0.8, 10),
+        kinds.CollisionDamagingComponent(5)
+    ])
+
+
+def dummy(kinds, x, y):
+    return kinds.Entity([
+        kinds.AnimatedSpriteComponent(SPRITES),
+        kinds.BoundsComponent(Rect(x, y, 64, 64)),
+        kinds.CollisionDamagingComponent(5)
+    ])
+
+
+def bytes_per_entity(build, kinds):
+    gc.collect()
+    tracemalloc.start()
+
+    built = [build(kinds, i % 640, i % 480) for i in range(COUNT)]
+    size = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.stop()
+    del built
+
+    return size / COUNT
+
+
+def main():
+    print('bytes per entity, {} entities'.format(COUNT))
+    print('{:>8} {:>10} {:>10} {:>8}'.format('', '__dict__', 'slots', 'saved'))
+
+    for name, build in (('cobra', cobra), ('dummy', dummy)):
+        before = bytes_per_entity(build, Kinds(dicts=True))
+        after = bytes_per_entity(build, Kinds(dicts=False))
+        print('{:>8} {:>10.0f} {:>10.0f} {:>7.0%}'.format(name, before, after, 1 - after / before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+compare the cached archetype queries of EntityRegistry against scanning a plain list with systems.scan_entities
+
+the world is 10k entities shaped like the ones the loader creates (walls, dummies, cobras, a player). every frame a
+handful of entities gain and lose a status component, the same churn that attacking and taking damage cause, so the
+registry has to rebuild some of its cached results.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import *
+from benchmarks.scenes import make_world
+from registry import EntityRegistry
+from systems import scan_entities
+
+WORLD_SIZE = 10000
+FRAMES = 50
+
+# the queries made by the systems in one frame of play_game (collision_system runs once per mover)
+SYSTEM_QUERIES = [
+    ([HealthComponent.name], [], []),
+    ([TimeToLiveComponent.name], [], []),
+    ([InputComponent.name], [], []),
+    ([AutomatonComponent.name], [], []),
+    ([PlayerComponent.name], [], []),
+    ([MovementComponent.name, DirectionComponent.name], [], [RootedComponent.name]),
+    ([MovementComponent.name, DirectionComponent.name, AnimatedSpriteComponent.name], [], [RootedComponent.name]),
+    ([BoundsComponent.name, MovementComponent.name], [], []),
+    ([BoundsComponent.name], [(AnimatedSpriteComponent.name, SpriteComponent.name)], []),
+]
+
+COLLISION_QUERY = ([BoundsComponent.name], [], [CollisionImmaterialComponent.name])
+
+
+def run_frame(entities, select, churn, movers_checked):
+    # structural churn: some entities become invulnerable, the ones from last frame recover
+    for entity in churn:
+        if InvulnerableComponent.name in entity.components:
+            del entity.components[InvulnerableComponent.name]
+        else:
+            entity.components[InvulnerableComponent.name] = InvulnerableComponent(300)
+
+    count = 0
+    for query in SYSTEM_QUERIES:
+        for _ in select(entities, *query):
+            count += 1
+
+    for _ in range(movers_checked):
+        for _ in select(entities, *COLLISION_QUERY):
+            count += 1
+
+    return count
+
+
+def benchmark(name, entities, select, churn, movers_checked):
+    # warm up (and make sure that both implementations agree on what they see)
+    count = run_frame(entities, select, churn, movers_checked)
+    run_frame(entities, select, churn, movers_checked)
+
+    seconds = timeit.timeit(lambda: run_frame(entities, select, churn, movers_checked), number=FRAMES)
+    print('{:<32} {:>10.3f} ms/frame  ({} entities visited)'.format(name, seconds * 1000 / FRAMES, count))
+    return seconds
+
+
+def main():
+    rng = random.Random(1)
+    entities = make_world(WORLD_SIZE, rng)
+    churn = rng.sample(entities, 20)
+
+    print('{} entities, {} frames'.format(WORLD_SIZE, FRAMES))
+
+    for movers_checked in (0, 10):
+        print('\ncollision queries per frame: {}'.format(movers_checked))
+
+        scan = benchmark('list + scan_entities', entities, lambda e, *q: list(scan_entities(e, *q)), churn,
+                         movers_checked)
+
+        registry = EntityRegistry(entities)
+        cached = benchmark('EntityRegistry.query', registry, lambda e, *q: e.query(*q), churn, movers_checked)
+        registry.clear()
+
+        print('speedup: {:.1f}x'.format(scan / cached))
+
+
+if __name__ == '__main__':
+    main()
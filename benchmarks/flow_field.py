@@ -0,0 +1,87 @@
+"""
+automation_system with more and more cobras crowding a player that walks around a walled room. the cobras with a wall
+in their way path along the one flow field of the map, searched again only when the player steps into another cell.
+the baseline gives every such cobra a search of its own, the way per entity pathfinding would.
+
+with the shared field, the time per cobra should stay flat as the cobras grow.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import *
+from benchmarks.scenes import make_entity
+from navigation import FlowField
+from registry import EntityRegistry
+from spatial import SolidGrid
+from systems import automation_system
+
+TILE = 32
+SIDE = 48
+FRAMES = 60
+RANGE = 1024
+
+
+class WalledMap(object):
+    def __init__(self, solids, flow_field):
+        self.solids = solids
+        self.flow_field = flow_field
+
+
+class OwnSearch(FlowField):
+    """
+    a field that searches again for every automaton that steps along it
+    """
+
+    def step(self, bounds, away=False):
+        self.fields.clear()
+        return FlowField.step(self, bounds, away)
+
+
+def make_scene(cobras, rng):
+    solids = SolidGrid(0, 0, SIDE, SIDE, TILE, TILE)
+    for _ in range(SIDE * 2):
+        x, y = rng.randrange(0, SIDE - 6), rng.randrange(0, SIDE)
+        solids.add_rect(Rect(x * TILE, y * TILE, rng.randrange(2, 6) * TILE, TILE))
+
+    center = SIDE * TILE // 2
+    entities = [make_entity('cobra', center + rng.randrange(-280, 280), center + rng.randrange(-280, 280))
+                for _ in range(cobras)]
+    player = make_entity('player', center, center)
+    entities.append(player)
+
+    return solids, entities, player
+
+
+def benchmark(cobras, shared):
+    solids, entities, player = make_scene(cobras, random.Random(5))
+    field = (FlowField if shared else OwnSearch)(solids, RANGE // TILE)
+    world = {'default': WalledMap(solids, field)}
+    registry = EntityRegistry(entities)
+    bounds = player.components[BoundsComponent.name].bounds
+
+    def frame():
+        # the player walks a few pixels a frame, into another cell every few frames
+        bounds.x += 5
+        automation_system(registry, world=world)
+
+    automation_system(registry, world=world)
+    seconds = timeit.timeit(frame, number=FRAMES)
+
+    return seconds * 1000 / FRAMES, field.searches
+
+
+def main():
+    print('{0}x{0} tile map, ms per automation_system call'.format(SIDE))
+    print('{:>8} {:>12} {:>10} {:>12} {:>12}'.format('cobras', 'own search', 'shared', 'us per cobra', 'searches'))
+
+    for cobras in (25, 100, 400, 1600):
+        own = benchmark(cobras, False)[0] if cobras <= 100 else None
+        shared, searches = benchmark(cobras, True)
+        print('{:>8} {:>12} {:>10.2f} {:>12.2f} {:>12}'.format(
+            cobras, '{:.2f}'.format(own) if own is not None else '-', shared, shared * 1000 / cobras, searches))
+
+
+if __name__ == '__main__':
+    main()
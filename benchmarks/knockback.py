@@ -0,0 +1,155 @@
+"""
+heavy combat for the dynamic (knockback) movements: every mover keeps being hit and carries a few impulses at all
+times. compares the Impulses store of MovementComponent, which applies and decays them in place, with rebuilding a
+fresh list of tuples per mover and frame the way movement_system used to. then the same combat through
+movement_system itself, which adds up the impulses of every mover in one batch before moving anyone and ages them in
+another one afterwards (see systems.apply_impulses), against movement_system stepping them mover by mover.
+
+reports the time per frame and how many lists and tuples holding impulses were allocated in a frame. checks that
+both ways of running movement_system move everyone to the same place.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import Impulses, BoundsComponent, MovementComponent
+from entities import Entity
+from registry import EntityRegistry
+from systems import movement_system
+
+MOVERS = 2000
+IMPULSES = 3
+FRAMES = 50
+DELTA = 16
+
+
+class Unbatched(dict):
+    """
+    EntityRegistry.impulsed that movement_system takes for empty, so that it steps the impulses of each mover while
+    moving it rather than in a batch
+    """
+
+    def __bool__(self):
+        return False
+
+
+def make_impulses(rng):
+    return [(rng.uniform(-0.8, 0.8), rng.uniform(-0.8, 0.8), rng.randrange(20, 400)) for _ in range(IMPULSES)]
+
+
+def frame_lists(movers, rng):
+    for i, dynamic in enumerate(movers):
+        delta_x, delta_y = 0, 0
+
+        updated_dynamics = []
+        for dyn in dynamic:
+            delta_x += dyn[0]
+            delta_y += dyn[1]
+
+            if dyn[2] - DELTA > 0.0:
+                updated_dynamics.append((dyn[0], dyn[1], dyn[2] - DELTA))
+
+        # keep the combat going
+        while len(updated_dynamics) < IMPULSES:
+            updated_dynamics.append((rng.uniform(-0.8, 0.8), rng.uniform(-0.8, 0.8), 300))
+
+        movers[i] = updated_dynamics
+
+
+def frame_impulses(movers, rng):
+    for impulses in movers:
+        delta_x, delta_y = 0, 0
+        if impulses.count:
+            delta_x, delta_y = impulses.step(delta_x, delta_y, DELTA)
+
+        while impulses.count < IMPULSES:
+            impulses.add(rng.uniform(-0.8, 0.8), rng.uniform(-0.8, 0.8), 300)
+
+
+def frame_system(entities, rng):
+    movement_system(entities, DELTA)
+
+    for entity in entities:
+        mov = entity.components[MovementComponent.name]
+        while mov.dynamic.count < IMPULSES:
+            mov.add_dynamic(rng.uniform(-0.8, 0.8), rng.uniform(-0.8, 0.8), 300)
+
+
+def make_registry(impulses, batched):
+    entities = EntityRegistry()
+    if not batched:
+        entities.impulsed = Unbatched()
+
+    # spread out on a grid, nobody starts out touching anybody
+    for i, dynamic in enumerate(impulses):
+        mov = MovementComponent()
+        for velx, vely, ttl in dynamic:
+            mov.add_dynamic(velx, vely, ttl)
+        entities.append(Entity([BoundsComponent(Rect(i % 50 * 200, i // 50 * 200, 32, 32)), mov]))
+
+    return entities
+
+
+def containers(movers):
+    """
+    every list and tuple (or Impulses store and its slot lists) that holds the impulses of the movers
+    """
+    held = []
+    for dynamic in movers:
+        if isinstance(dynamic, Entity):
+            dynamic = dynamic.components[MovementComponent.name].dynamic
+
+        if isinstance(dynamic, Impulses):
+            held.extend((dynamic, dynamic.velx, dynamic.vely, dynamic.ttl))
+        else:
+            held.append(dynamic)
+            held.extend(dynamic)
+    return held
+
+
+def allocations(frame, movers, rng):
+    # the containers of the last frame are kept alive, so that a new one can't reuse the id of an old one
+    before = containers(movers)
+    known = set(id(held) for held in before)
+
+    frame(movers, rng)
+
+    return sum(1 for held in containers(movers) if id(held) not in known)
+
+
+def benchmark(frame, movers):
+    rng = random.Random(6)
+
+    frame(movers, rng)
+    seconds = timeit.timeit(lambda: frame(movers, rng), number=FRAMES)
+
+    return seconds * 1000 / FRAMES, allocations(frame, movers, rng)
+
+
+def main():
+    rng = random.Random(5)
+    impulses = [make_impulses(rng) for _ in range(MOVERS)]
+
+    print('{} movers with {} impulses each'.format(MOVERS, IMPULSES))
+    print('{:>10} {:>12} {:>22}'.format('', 'ms / frame', 'containers / frame'))
+
+    for name, frame, movers in (('lists', frame_lists, [list(dynamic) for dynamic in impulses]),
+                                ('impulses', frame_impulses, [Impulses(dynamic) for dynamic in impulses])):
+        ms, allocated = benchmark(frame, movers)
+        print('{:>10} {:>12.2f} {:>22}'.format(name, ms, allocated))
+
+    print('movement_system')
+    positions = []
+    for name, batched in (('per mover', False), ('batch', True)):
+        entities = make_registry(impulses, batched)
+        ms, allocated = benchmark(frame_system, entities)
+        print('{:>10} {:>12.2f} {:>22}'.format(name, ms, allocated))
+
+        positions.append([tuple(entity.components[BoundsComponent.name].bounds) for entity in entities])
+
+    assert positions[0] == positions[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+render cost of a scrolling camera on maps that grow to hundreds of tiles on a side. the maps are made by repeating the
+tile layers of data/places/1.tmx (its objects are dropped).
+
+compares drawing every tile of every layer each frame (the cost of rendering the whole map, which is all the old
+render_map could do) with the chunked TiledRenderer, which only blits the cached chunks inside the camera. the camera
+follows a target that walks a loop around the center of the map at a few pixels per frame. the chunks are built
+lazily during the first lap (first pass), the second lap finds them in the cache (warm).
+"""
+import os
+import re
+import shutil
+import tempfile
+import timeit
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from pygame import Rect
+
+from graphics import TiledRenderer, Camera
+from constants import VIEW_SIZE
+
+SOURCE = os.path.join('data', 'places', '1.tmx')
+FRAMES = 400
+FULL_FRAMES = 3
+
+# pixels the target walks per frame
+SPEED = 8
+
+
+def write_map(directory, repeat):
+    """
+    write a copy of SOURCE with its tile layers repeated repeat times in each direction
+
+    Returns: the path of the new map
+    """
+    with open(SOURCE) as f:
+        text = f.read()
+
+    text = re.sub(r'<objectgroup.*?</objectgroup>\n?', '', text, flags=re.S)
+
+    # the tilesets are referenced relative to the map
+    places = os.path.abspath(os.path.dirname(SOURCE))
+    text = re.sub(r'source="([^"]+)"', lambda m: 'source="{}"'.format(os.path.join(places, m.group(1))), text)
+
+    def repeat_layer(match):
+        rows = [row.rstrip(',') for row in match.group(1).strip().splitlines()]
+        rows = [','.join([row] * repeat) for row in rows] * repeat
+        return '<data encoding="csv">\n{}\n</data>'.format(',\n'.join(rows))
+
+    text = re.sub(r'<data encoding="csv">(.*?)</data>', repeat_layer, text, flags=re.S)
+    text = re.sub(r'width="20" height="15"', 'width="{}" height="{}"'.format(20 * repeat, 15 * repeat), text)
+
+    path = os.path.join(directory, '{}.tmx'.format(repeat))
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def draw_every_tile(renderer, surface):
+    tw, th = renderer.tmx_data.tilewidth, renderer.tmx_data.tileheight
+    for layer in renderer.tmx_data.visible_layers:
+        if hasattr(layer, 'tiles'):
+            for x, y, image in layer.tiles():
+                surface.blit(image, (x * tw, y * th))
+
+
+def pan(renderer, camera, surface, frame):
+    # a square lap of FRAMES * SPEED pixels, starting in the center of the map
+    width, height = renderer.pixel_size
+    side = FRAMES // 4
+    leg, step = divmod(frame % FRAMES, side)
+    offsets = [(step, 0), (side, step), (side - step, side), (0, side - step)]
+    target = Rect(width // 2 + offsets[leg][0] * SPEED, height // 2 + offsets[leg][1] * SPEED, 1, 1)
+
+    camera.follow(target, renderer.pixel_size)
+    renderer.render_map(surface, camera.rect)
+
+
+def benchmark(path, screen):
+    renderer = TiledRenderer(path)
+
+    full = timeit.timeit(lambda: draw_every_tile(renderer, screen), number=FULL_FRAMES) * 1000 / FULL_FRAMES
+
+    camera = Camera(VIEW_SIZE)
+    frames = iter(range(2 * FRAMES))
+    first = timeit.timeit(lambda: pan(renderer, camera, screen, next(frames)), number=FRAMES) * 1000 / FRAMES
+    warm = timeit.timeit(lambda: pan(renderer, camera, screen, next(frames)), number=FRAMES) * 1000 / FRAMES
+
+    return renderer.tmx_data.width, full, first, warm
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode(VIEW_SIZE)
+
+    directory = tempfile.mkdtemp()
+    try:
+        print('ms per frame')
+        print('{:>10} {:>12} {:>12} {:>10} {:>8}'.format('tiles', 'every tile', 'first pass', 'warm', 'speedup'))
+
+        for repeat in (1, 5, 20):
+            tiles, full, first, warm = benchmark(write_map(directory, repeat), screen)
+            print('{:>10} {:>12.2f} {:>12.3f} {:>10.3f} {:>7.1f}x'.format('{0}x{1}'.format(tiles, tiles * 3 // 4), full,
+                                                                           first, warm, full / warm))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+time helpers.map_transition when every visit rebuilds the entities of the map from its tmx objects (park_budget=0,
+the way it used to work) against reattaching the entities parked on the previous visit.
+
+the maps themselves are parsed and baked before timing starts, so only the entity side of a transition is measured.
+"""
+import os
+import timeit
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import game
+from helpers import map_transition
+from loader import load_map_files
+
+ROUNDS = 200
+ROUTE = ['1', '2', '3']
+
+
+def tour(world, entities, player):
+    for key in ROUTE:
+        map_transition(world, key, 40, 360, entities, player)
+
+
+def benchmark(world, park_budget):
+    entities, player = game.new_game(world)
+    entities.park_budget = park_budget
+
+    # first visits: parse every map and build its entities once
+    tour(world, entities, player)
+
+    seconds = timeit.timeit(lambda: tour(world, entities, player), number=ROUNDS)
+    return seconds * 1000 / (ROUNDS * len(ROUTE))
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((640, 480))
+
+    world = load_map_files()
+    for key in ROUTE:
+        world[key].bake()
+
+    rebuild = benchmark(world, 0)
+    reattach = benchmark(world, 5000)
+
+    print('ms per map_transition over {} transitions'.format(ROUNDS * len(ROUTE)))
+    print('{:<12} {:>8.3f}'.format('rebuild', rebuild))
+    print('{:<12} {:>8.3f}'.format('reattach', reattach))
+    print('speedup: {:.1f}x'.format(rebuild / reattach))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+a rendered headless game with the systems run in order against the same game run through a SystemScheduler, which
+draws the map on a worker thread while the systems that work on the entities run. both have to end with the same
+entities and the same damage taken by the player.
+
+the map render only overlaps the entity systems when there is a second core and pygame releases the gil while it
+blits. on a single core the scheduler runs the systems in order, so both should take the same time.
+"""
+import os
+
+from pygame.locals import K_RIGHT, K_DOWN, K_SPACE
+
+import headless
+from loader import load_map_files
+
+FRAMES = 1500
+
+
+def make_script():
+    script = {}
+    for start in range(0, FRAMES, 300):
+        script[start] = {K_RIGHT: True, K_DOWN: True}
+        script[start + 150] = {K_RIGHT: False, K_DOWN: False, K_SPACE: True}
+        script[start + 151] = {K_SPACE: False}
+    return script
+
+
+def main():
+    screen = headless.init_display()
+    world = load_map_files()
+    script = make_script()
+
+    print('{} rendered frames, {} cores'.format(FRAMES, os.cpu_count() or 1))
+    print('{:>6} {:>12} {:>12} {:>8}'.format('map', 'in order', 'scheduled', 'speedup'))
+
+    for map_id in ('2', '3'):
+        results = [headless.run_headless(world, FRAMES, map_id=map_id, script=script, render=True, screen=screen,
+                                         parallel_systems=parallel)
+                   for parallel in (False, True)]
+
+        plain, scheduled = (result['seconds'] * 1000 / result['frames'] for result in results)
+        assert results[0]['damage_taken'] == results[1]['damage_taken']
+        assert results[0]['entities'] == results[1]['entities']
+
+        print('{:>6} {:>10.3f}ms {:>10.3f}ms {:>7.2f}x'.format(map_id, plain, scheduled, plain / scheduled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+synthetic worlds for the benchmarks. the entities have the same component layout as the ones built by entities.py and
+the loader, but carry placeholder sprites so that no display or image files are needed.
+"""
+from pygame import Rect
+
+from components import *
+from constants import *
+from entities import Entity
+
+
+def make_entity(kind, x, y):
+    sprites = {STATE_STANDING_STILL: [None]}
+    bounds = BoundsComponent(Rect(x, y, 64, 64))
+
+    if kind == 'wall':
+        comps = [bounds, CollisionSolidComponent()]
+    elif kind == 'dummy':
+        comps = [AnimatedSpriteComponent(sprites), bounds, CollisionDamagingComponent(5)]
+    elif kind == 'cobra':
+        comps = [
+            AnimatedSpriteComponent(sprites), bounds, MovementComponent(), DirectionComponent(),
+            HealthComponent(100), AutomatonComponent(PERSONALITY_AGGRESSIVE),
+            AttributesComponent({ATTRIBUTES_AGGRO_RANGE: 300, ATTRIBUTES_ATTACK_RANGE: 50,
+                                 ATTRIBUTES_MOVE_SPEED: 0.09}),
+            CollisionKnockbackComponent(0.8, 10), CollisionDamagingComponent(5)
+        ]
+    else:
+        comps = [
+            AnimatedSpriteComponent(sprites), InputComponent(), bounds, MovementComponent(), AttackComponent(),
+            DirectionComponent(), HealthComponent(100), PlayerComponent()
+        ]
+
+    return Entity(comps)
+
+
+def make_world(size, rng):
+    kinds = ['wall'] * 6 + ['dummy'] * 3 + ['cobra']
+    entities = [make_entity(rng.choice(kinds), rng.randrange(0, 640), rng.randrange(0, 480))
+                for _ in range(size - 1)]
+    entities.append(make_entity('player', 40, 360))
+    return entities
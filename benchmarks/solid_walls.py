@@ -0,0 +1,84 @@
+"""
+movers walking through a walled map: every wall as an entity in the spatial hash (the way the loader used to create
+them) against the same walls baked into the SolidGrid of the map. two in five tiles are walls, movers are spread over
+the free tiles and walk at constant speed.
+
+the movers have to end up at the same places either way.
+"""
+import random
+import timeit
+
+from pygame import Rect
+
+from components import *
+from entities import Entity
+from benchmarks.scenes import make_entity
+from registry import EntityRegistry
+from spatial import SolidGrid
+from systems import movement_system
+
+TILE = 32
+MOVERS = 300
+FRAMES = 20
+DELTA = 16
+
+
+class WalledMap(object):
+    def __init__(self, solids):
+        self.solids = solids
+
+
+def make_scene(side, rng):
+    walls, free = [], []
+    for y in range(side):
+        for x in range(side):
+            (walls if rng.random() < 0.4 else free).append((x * TILE, y * TILE))
+
+    movers = []
+    for x, y in rng.sample(free, min(MOVERS, len(free))):
+        cobra = make_entity('cobra', x, y)
+        cobra.components[MovementComponent.name].add_constant(rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1))
+        movers.append(cobra)
+
+    return [Rect(x, y, TILE, TILE) for x, y in walls], movers
+
+
+def benchmark(side, baked, vectorized):
+    walls, movers = make_scene(side, random.Random(4))
+
+    if baked:
+        solids = SolidGrid(0, 0, side, side, TILE, TILE)
+        for wall in walls:
+            solids.add_rect(wall)
+        world = {'default': WalledMap(solids)}
+        entities = movers
+    else:
+        world = None
+        entities = [Entity([BoundsComponent(wall), CollisionSolidComponent()]) for wall in walls] + movers
+
+    registry = EntityRegistry(entities, vectorized_movement=vectorized)
+
+    movement_system(registry, delta_time=DELTA, world=world)
+    seconds = min(timeit.repeat(lambda: movement_system(registry, delta_time=DELTA, world=world), number=FRAMES,
+                                repeat=5))
+
+    return seconds * 1000 / FRAMES, [tuple(mover.components[BoundsComponent.name].bounds) for mover in movers]
+
+
+def main():
+    print('{} movers, ms per movement_system call'.format(MOVERS))
+    print('{:>8} {:>8} {:>12} {:>12} {:>8}'.format('walls', 'backend', 'entities', 'solid grid', 'speedup'))
+
+    for side in (32, 64, 128):
+        for vectorized in (False, True):
+            walled, walled_places = benchmark(side, False, vectorized)
+            baked, baked_places = benchmark(side, True, vectorized)
+            assert walled_places == baked_places
+
+            walls = len(make_scene(side, random.Random(4))[0])
+            print('{:>8} {:>8} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(
+                walls, 'numpy' if vectorized else 'python', walled, baked, walled / baked))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+load time and resident pixel memory of the sprite sets, sliced as copies (the way the loaders used to do it, every
+frame a new SRCALPHA surface and every call a fresh decode) versus subsurfaces of one decoded sheet, shared through
+the asset manager.
+
+the cobra sprites are requested once per cobra, as CobraEntity does.
+"""
+import os
+import timeit
+from functools import lru_cache
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import loader
+from assets import asset_manager
+from constants import *
+
+COBRAS = 10
+REPEAT = 5
+
+
+def copy_sprite_file(name, num):
+    sheet = pygame.image.load(os.path.join('./', name)).convert_alpha()
+    width, height = int(sheet.get_width() / num), sheet.get_height()
+
+    sprites = []
+    for i in range(num):
+        surf = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+        surf.blit(sheet, (0, 0), (i * width, 0, width, height))
+        sprites.append(surf)
+
+    return sprites
+
+
+# the old load_sprite_file was memoized as well
+cached_copy_sprite_file = lru_cache()(copy_sprite_file)
+
+
+def copy_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None):
+    sheet = pygame.image.load(os.path.join('./', name)).convert_alpha()
+    width, height = sprite_size
+
+    if sprites_per_row is None:
+        sprites_per_row = int(sheet.get_width() / width)
+
+    sprite_dict = {}
+    for row, index in enumerate(indices):
+        sprites = []
+        for i in range(sprites_per_row):
+            surf = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+            surf.blit(sheet, (0, 0), (i * width, row * height, width, height))
+            sprites.append(surf)
+        sprite_dict[index] = sprites
+
+    return sprite_dict
+
+
+def load_copies():
+    """
+    the old loaders: sprite files memoized, but the cobra sheet decoded and copied twice for every cobra
+    """
+    cached_copy_sprite_file.cache_clear()
+
+    original = loader.load_sprite_file, loader.load_multi_row_sprite_file
+    loader.load_sprite_file, loader.load_multi_row_sprite_file = cached_copy_sprite_file, copy_multi_row_sprite_file
+
+    try:
+        sets = [loader.build_player_sprites(), loader.build_target_dummy()]
+        sets.extend(loader.build_cobra_sprites() for _ in range(COBRAS))
+    finally:
+        loader.load_sprite_file, loader.load_multi_row_sprite_file = original
+
+    return sets
+
+
+def load_shared():
+    asset_manager.clear()
+
+    sets = [loader.load_player_sprites(), loader.load_target_dummy()]
+    sets.extend(loader.load_cobra_sprites() for _ in range(COBRAS))
+
+    return sets
+
+
+def resident_bytes(sprite_sets):
+    # subsurfaces own no pixels of their own, count the sheet they point into once
+    owners = {}
+    for sprites in sprite_sets:
+        for frames in sprites.values():
+            for frame in frames:
+                owner = frame
+                while owner.get_parent() is not None:
+                    owner = owner.get_parent()
+                owners[id(owner)] = owner
+
+    return sum(owner.get_pitch() * owner.get_height() for owner in owners.values())
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((640, 480))
+
+    print('player, dummy and {} cobras, best of {}'.format(COBRAS, REPEAT))
+    print('{:<12} {:>10} {:>14}'.format('slicing', 'load ms', 'resident KiB'))
+
+    for name, load in [('copies', load_copies), ('shared', load_shared)]:
+        seconds = min(timeit.repeat(load, number=1, repeat=REPEAT))
+        print('{:<12} {:>10.2f} {:>14.1f}'.format(name, seconds * 1000, resident_bytes(load()) / 1024.0))
+
+    print('asset manager: {}'.format(asset_manager.stats()))
+
+
+if __name__ == '__main__':
+    main()
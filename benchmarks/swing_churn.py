@@ -0,0 +1,76 @@
+"""
+spawn and despawn churn: a crowd of entities plus attack entities that live for a few frames, with new ones
+spawned every frame (one per swing). compares the plain list of entities the game used to keep (list.append and
+list.remove) with the EntityRegistry, which hands out a generational id on every spawn and gives it back on every
+despawn.
+
+checks that the ids of the despawned attacks go stale and are never resolved to the attacks that reuse their slots.
+"""
+import random
+import timeit
+from collections import deque
+
+from pygame import Rect
+
+from components import *
+from entities import Entity
+from benchmarks.scenes import make_world
+from registry import EntityRegistry
+
+FRAMES = 200
+SWINGS = 20
+LIFETIME = 6
+
+
+def make_attack(rng):
+    return Entity([BoundsComponent(Rect(rng.randrange(0, 2000), rng.randrange(0, 2000), 64, 32)),
+                   CollisionDamagingComponent(10), TimeToLiveComponent(100)])
+
+
+def churn(entities, rng, stale=None):
+    alive = deque()
+
+    for _ in range(FRAMES):
+        swings = [make_attack(rng) for _ in range(SWINGS)]
+        for attack in swings:
+            entities.append(attack)
+        alive.append(swings)
+
+        if len(alive) > LIFETIME:
+            for attack in alive.popleft():
+                if stale is not None:
+                    stale.append(attack.id)
+                entities.remove(attack)
+
+
+def benchmark(size, registry):
+    rng = random.Random(11)
+    crowd = make_world(size, rng)
+
+    if registry:
+        entities = EntityRegistry(crowd)
+        stale = []
+    else:
+        entities = list(crowd)
+        stale = None
+
+    seconds = timeit.timeit(lambda: churn(entities, rng, stale), number=1)
+
+    if stale is not None:
+        assert all(entities.get(entity_id) is None for entity_id in stale)
+
+    return seconds * 1000 / FRAMES
+
+
+def main():
+    print('{} swings per frame living {} frames, ms per frame'.format(SWINGS, LIFETIME))
+    print('{:>8} {:>10} {:>10} {:>8}'.format('entities', 'list', 'registry', 'speedup'))
+
+    for size in (1000, 5000, 20000):
+        plain = benchmark(size, False)
+        registry = benchmark(size, True)
+        print('{:>8} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(size, plain, registry, plain / registry))
+
+
+if __name__ == '__main__':
+    main()
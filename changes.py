@@ -0,0 +1,51 @@
+class ChangeTracker(object):
+    """
+    dirty sets for the systems that only want to look at the entities that changed since they last ran (see
+    EntityRegistry.changed).
+
+    every watcher (a key, i.e. the name of a system) has its own set of entities, filled whenever one of the
+    components it watches changes (the registry passes on the on_change hooks of the components and its moved()), and
+    whenever the components of an entity are added or removed, which includes entering the registry. the watcher
+    empties its set every time it takes it.
+    """
+
+    def __init__(self):
+        # key -> dirty entities, used as an insertion ordered set
+        self.watchers = {}
+        # component name -> dirty sets of the watchers of that component
+        self.watching = {}
+
+    def take(self, key, names):
+        """
+        Returns: the entities that changed since the last take under key, None on the first one (when everything has
+            to be looked at)
+        """
+        dirty = self.watchers.get(key)
+        if dirty is None:
+            dirty = self.watchers[key] = {}
+            for name in names:
+                self.watching.setdefault(name, []).append(dirty)
+            return None
+
+        changed = list(dirty)
+        dirty.clear()
+        return changed
+
+    def watched(self, name):
+        return name in self.watching
+
+    def changed(self, entity, name):
+        for dirty in self.watching.get(name, ()):
+            dirty[entity] = None
+
+    def restructured(self, entity):
+        for dirty in self.watchers.values():
+            dirty[entity] = None
+
+    def removed(self, entity):
+        for dirty in self.watchers.values():
+            dirty.pop(entity, None)
+
+    def clear(self):
+        for dirty in self.watchers.values():
+            dirty.clear()
@@ -0,0 +1,407 @@
+from components import BoundsComponent, MovementComponent, RootedComponent
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# cell coordinates are packed into one int64 key as cell_x * CELL_KEY_STRIDE + cell_y
+CELL_KEY_STRIDE = 1 << 32
+
+
+def solid_table(solids):
+    """
+    summed area table of the cells of a spatial.SolidGrid that are not empty: table[y, x] counts the ones above and to
+    the left of cell (x, y), so the walled cells of any box of cells are counted in O(1)
+    """
+    walled = numpy.frombuffer(bytes(solids.cells), dtype=numpy.uint8).reshape(solids.height, solids.width) != 0
+
+    table = numpy.zeros((solids.height + 1, solids.width + 1), dtype=numpy.int64)
+    table[1:, 1:] = walled.cumsum(0).cumsum(1)
+    return table
+
+
+def box_keys(first_x, first_y, last_x, last_y):
+    """
+    expand the cell boxes [first_x, last_x] x [first_y, last_y] (one per row of the arrays) into their cell keys.
+
+    Returns: (keys, owners) where owners holds the row that each key came from
+    """
+    widths = last_x - first_x + 1
+    heights = last_y - first_y + 1
+    sizes = widths * heights
+
+    owners = numpy.repeat(numpy.arange(len(sizes)), sizes)
+    starts = numpy.cumsum(sizes) - sizes
+    local = numpy.arange(int(sizes.sum())) - numpy.repeat(starts, sizes)
+
+    cell_x = first_x[owners] + local % widths[owners]
+    cell_y = first_y[owners] + local // widths[owners]
+
+    return cell_x * CELL_KEY_STRIDE + cell_y, owners
+
+
+def cell_pairs(keys, owners):
+    """
+    every pair of owners that have the same cell key, each pair once per cell they share.
+
+    Returns: (first, second) arrays of owners
+    """
+    order = numpy.argsort(keys, kind='stable')
+    keys, owners = keys[order], owners[order]
+
+    starts = numpy.flatnonzero(numpy.concatenate(([True], keys[1:] != keys[:-1])))
+    sizes = numpy.diff(numpy.append(starts, len(keys)))
+
+    # pair every entry with the entries after it in the same cell
+    group = numpy.repeat(numpy.arange(len(starts)), sizes)
+    later = sizes[group] - 1 - (numpy.arange(len(keys)) - starts[group])
+
+    first = numpy.repeat(numpy.arange(len(keys)), later)
+    second = first + 1 + numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(later) - later, later)
+
+    return owners[first], owners[second]
+
+
+class MovementColumns(object):
+    """
+    struct-of-arrays store for every entity with bounds and movement, used by the numpy movement backend.
+
+    positions, sizes, constant velocities and the rooted and collidable flags of all movers live in numpy arrays, so
+    that a frame of movement can be integrated in one vectorized step. the registry reports structural changes, moves
+    and the velocity changes of the MovementComponents (movement_changed), so nothing has to be gathered from the
+    components every frame.
+
+    every frame, plan() works out which movers are alone: the box they sweep from their old to their new position
+    overlaps no other collidable entity, nor the box another mover sweeps, nor a cell of the solid grid of the map that
+    has a wall in it. candidates are found through a grid of cells like the one of the spatial hash. movers that are
+    alone cannot collide with anything and are moved in bulk by apply(), the others go through the regular per entity
+    movement and collision code, so the outcome is exactly the same.
+    """
+
+    def __init__(self, cell_size=64, capacity=64):
+        if numpy is None:
+            raise ImportError('the numpy movement backend needs numpy to be installed')
+
+        self.cell_size = cell_size
+
+        # slot -> entity / Rect, entity -> slot. slots are kept dense by moving the last mover into a freed slot
+        self.entities = []
+        self.rects = []
+        self.slots = {}
+
+        self.capacity = 0
+        self.x = self.y = self.w = self.h = self.order = None
+        self.velx = self.vely = None
+        self.rooted = self.collidable = None
+        self._grow(capacity)
+
+        # movers with dynamic movements, their displacement is summed up in python
+        self.impulsed = set()
+
+        # collidable entities that do not move, used as an ordered set
+        self.statics = {}
+        self._static_arrays = None
+
+        # (spatial.SolidGrid, its solid_table)
+        self._solid_table = None
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self.slots
+
+    def sync(self, entity, signature, order, collidable):
+        """
+        called by the registry whenever an entity was added or restructured
+        """
+        mover = BoundsComponent.name in signature and MovementComponent.name in signature
+
+        if mover:
+            self._remove_static(entity)
+            if entity not in self.slots:
+                self._insert(entity, order)
+
+            slot = self.slots[entity]
+            self.rooted[slot] = RootedComponent.name in signature
+            self.collidable[slot] = collidable
+        else:
+            self.remove(entity)
+            if collidable:
+                self._add_static(entity)
+            else:
+                self._remove_static(entity)
+
+    def moved(self, entity):
+        slot = self.slots.get(entity)
+        if slot is not None:
+            rect = self.rects[slot]
+            self.x[slot] = rect.x
+            self.y[slot] = rect.y
+        elif entity in self.statics:
+            self._static_arrays = None
+
+    def remove(self, entity):
+        self._remove_static(entity)
+
+        slot = self.slots.pop(entity, None)
+        if slot is None:
+            return
+
+        last = len(self.entities) - 1
+        if slot != last:
+            for column in self._columns():
+                column[slot] = column[last]
+
+            moved = self.entities[last]
+            self.entities[slot] = moved
+            self.rects[slot] = self.rects[last]
+            self.slots[moved] = slot
+
+        self.entities.pop()
+        self.rects.pop()
+
+        self.impulsed.discard(entity)
+
+    def clear(self):
+        self.entities = []
+        self.rects = []
+        self.slots.clear()
+        self.impulsed.clear()
+
+        self.statics.clear()
+        self._static_arrays = None
+
+    def movement_changed(self, entity):
+        slot = self.slots.get(entity)
+        if slot is None:
+            return
+
+        mov = entity.components[MovementComponent.name]
+
+        self.velx[slot] = mov.velx
+        self.vely[slot] = mov.vely
+
+        if mov.dynamic:
+            self.impulsed.add(entity)
+
+    def plan(self, delta_time, solids=None):
+        """
+        integrate one step for every mover and find the ones that are alone. solids is the spatial.SolidGrid of the
+        walls of the map, if any.
+
+        Returns: (alone, new_x, new_y) where alone is a boolean array by slot
+        """
+        n = len(self.entities)
+        size = self.cell_size
+
+        x, y, w, h = self.x[:n], self.y[:n], self.w[:n], self.h[:n]
+
+        delta_x = numpy.where(self.rooted[:n], 0.0, self.velx[:n])
+        delta_y = numpy.where(self.rooted[:n], 0.0, self.vely[:n])
+
+        # dynamic movements are added up exactly the way movement_system does, so that the sums are bit for bit equal
+        for entity in list(self.impulsed):
+            mov = entity.components[MovementComponent.name]
+            if not mov.dynamic:
+                self.impulsed.discard(entity)
+                continue
+
+            slot = self.slots[entity]
+            sum_x, sum_y = 0, 0
+            if not self.rooted[slot]:
+                sum_x += mov.velx
+                sum_y += mov.vely
+
+            delta_x[slot], delta_y[slot] = mov.dynamic.apply(sum_x, sum_y)
+
+        # pygame truncates fractional offsets towards zero
+        new_x = x + numpy.trunc(delta_x * delta_time).astype(numpy.int64)
+        new_y = y + numpy.trunc(delta_y * delta_time).astype(numpy.int64)
+
+        # the box covering a mover before and after the step. zero sized rects are given one pixel, that errs on the
+        # safe side
+        left = numpy.minimum(x, new_x)
+        top = numpy.minimum(y, new_y)
+        right = numpy.maximum(x, new_x) + numpy.maximum(w, 1)
+        bottom = numpy.maximum(y, new_y) + numpy.maximum(h, 1)
+
+        keys, owners = box_keys(left // size, top // size, (right - 1) // size, (bottom - 1) // size)
+
+        walled = self._walled(solids, left, top, right, bottom) if solids else None
+
+        # the statics only matter where there are movers
+        static_keys, static_owners, static_boxes = self._statics()
+        near = numpy.isin(static_keys, keys)
+
+        keys = numpy.concatenate((keys, static_keys[near]))
+        owners = numpy.concatenate((owners, static_owners[near] + n))
+        left, top, right, bottom = [numpy.concatenate((mine, static))
+                                    for mine, static in zip((left, top, right, bottom), static_boxes)]
+        collidable = numpy.concatenate((self.collidable[:n], numpy.ones(len(static_boxes[0]), dtype=bool)))
+
+        # every pair of boxes that share a cell, then the ones among them that really overlap
+        first, second = cell_pairs(keys, owners)
+        hit = (left[first] < right[second]) & (left[second] < right[first]) & \
+            (top[first] < bottom[second]) & (top[second] < bottom[first])
+        first, second = first[hit], second[hit]
+
+        blocked = numpy.zeros(len(collidable), dtype=bool)
+        blocked[first[collidable[second]]] = True
+        blocked[second[collidable[first]]] = True
+
+        if walled is not None:
+            blocked[:n] |= walled
+
+        return ~blocked[:n], new_x, new_y
+
+    def _walled(self, solids, left, top, right, bottom):
+        """
+        Returns: boolean array, True for the boxes that overlap a cell of solids with a wall in it
+        """
+        if self._solid_table is None or self._solid_table[0] is not solids:
+            self._solid_table = solids, solid_table(solids)
+        table = self._solid_table[1]
+
+        # cell ranges with exclusive ends, clipped to the grid
+        first_x = numpy.clip((left - solids.origin_x) // solids.tile_width, 0, solids.width)
+        first_y = numpy.clip((top - solids.origin_y) // solids.tile_height, 0, solids.height)
+        last_x = numpy.clip((right - 1 - solids.origin_x) // solids.tile_width + 1, 0, solids.width)
+        last_y = numpy.clip((bottom - 1 - solids.origin_y) // solids.tile_height + 1, 0, solids.height)
+
+        inside = (first_x < last_x) & (first_y < last_y)
+        count = table[last_y, last_x] - table[first_y, last_x] - table[last_y, first_x] + table[first_y, first_x]
+
+        return inside & (count > 0)
+
+    def crowded_slots(self, alone):
+        """
+        Returns: the slots of the movers that are not alone, in the order the movers were added to the registry
+        """
+        slots = numpy.flatnonzero(~alone)
+        return slots[numpy.argsort(self.order[slots], kind='stable')].tolist()
+
+    def apply(self, alone, new_x, new_y, delta_time, spatial, draw_order, changes=None):
+        """
+        move the movers that are alone to their new position and age their dynamic movements. the spatial hash, draw
+        order and change tracker of the registry are updated for the ones that moved
+        """
+        n = len(alone)
+
+        for entity in self.impulsed:
+            slot = self.slots[entity]
+            if slot < n and alone[slot]:
+                entity.components[MovementComponent.name].dynamic.decay(delta_time)
+
+        x, y = self.x[:n], self.y[:n]
+        moving = numpy.flatnonzero(alone & ((new_x != x) | (new_y != y)))
+
+        for slot in moving.tolist():
+            rect = self.rects[slot]
+            rect.x = int(new_x[slot])
+            rect.y = int(new_y[slot])
+
+        for slot in numpy.flatnonzero(alone & (new_y != y)).tolist():
+            draw_order.moved(self.entities[slot])
+
+        if changes is not None and changes.watched(BoundsComponent.name):
+            for slot in moving.tolist():
+                changes.changed(self.entities[slot], BoundsComponent.name)
+
+        if spatial is not None and len(moving):
+            size = self.cell_size
+            w, h = self.w[moving], self.h[moving]
+            old_x, old_y, moved_x, moved_y = x[moving], y[moving], new_x[moving], new_y[moving]
+
+            changed = (old_x // size != moved_x // size) | (old_y // size != moved_y // size) | \
+                ((old_x + w - 1) // size != (moved_x + w - 1) // size) | \
+                ((old_y + h - 1) // size != (moved_y + h - 1) // size)
+
+            for slot in moving[changed].tolist():
+                spatial.update(self.entities[slot], self.rects[slot])
+
+        x[moving] = new_x[moving]
+        y[moving] = new_y[moving]
+
+    @staticmethod
+    def apply_each(movers, alone, new_x, new_y, delta_time):
+        """
+        the slow version of apply() for when the slots have changed since plan(). movers are the entities by slot as
+        they were then
+        """
+        for slot in numpy.flatnonzero(alone).tolist():
+            entity = movers[slot]
+            entity.components[MovementComponent.name].dynamic.decay(delta_time)
+
+            rect = entity.components[BoundsComponent.name].bounds
+            rect.x = int(new_x[slot])
+            rect.y = int(new_y[slot])
+
+            registry = entity.components.registry
+            if registry is not None:
+                registry.moved(entity)
+
+    def _insert(self, entity, order):
+        slot = len(self.entities)
+        if slot >= self.capacity:
+            self._grow(self.capacity * 2)
+
+        rect = entity.components[BoundsComponent.name].bounds
+        mov = entity.components[MovementComponent.name]
+
+        self.x[slot], self.y[slot], self.w[slot], self.h[slot] = rect.x, rect.y, rect.width, rect.height
+        self.velx[slot] = mov.velx
+        self.vely[slot] = mov.vely
+        self.order[slot] = order
+
+        self.entities.append(entity)
+        self.rects.append(rect)
+        self.slots[entity] = slot
+
+        if mov.dynamic:
+            self.impulsed.add(entity)
+
+    def _columns(self):
+        return [self.x, self.y, self.w, self.h, self.order, self.velx, self.vely, self.rooted, self.collidable]
+
+    def _grow(self, capacity):
+        old = self._columns() if self.capacity else None
+        count = len(self.entities)
+
+        self.x, self.y, self.w, self.h, self.order = [numpy.zeros(capacity, dtype=numpy.int64) for _ in range(5)]
+        self.velx, self.vely = numpy.zeros(capacity), numpy.zeros(capacity)
+        self.rooted, self.collidable = numpy.zeros(capacity, dtype=bool), numpy.zeros(capacity, dtype=bool)
+
+        if old is not None:
+            for column, previous in zip(self._columns(), old):
+                column[:count] = previous[:count]
+
+        self.capacity = capacity
+
+    def _add_static(self, entity):
+        if entity not in self.statics:
+            self.statics[entity] = None
+            self._static_arrays = None
+
+    def _remove_static(self, entity):
+        if self.statics.pop(entity, 0) is None:
+            self._static_arrays = None
+
+    def _statics(self):
+        """
+        Returns: (keys, owners, (left, top, right, bottom)) of the cells and boxes of the static collidables
+        """
+        if self._static_arrays is None:
+            rects = [entity.components[BoundsComponent.name].bounds for entity in self.statics]
+            left = numpy.array([rect.x for rect in rects], dtype=numpy.int64)
+            top = numpy.array([rect.y for rect in rects], dtype=numpy.int64)
+            right = left + numpy.maximum(numpy.array([rect.width for rect in rects], dtype=numpy.int64), 1)
+            bottom = top + numpy.maximum(numpy.array([rect.height for rect in rects], dtype=numpy.int64), 1)
+
+            size = self.cell_size
+            keys, owners = box_keys(left // size, top // size, (right - 1) // size, (bottom - 1) // size)
+            self._static_arrays = keys, owners, (left, top, right, bottom)
+
+        return self._static_arrays
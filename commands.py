@@ -0,0 +1,77 @@
+class CommandBuffer(object):
+    """
+    structural changes to an EntityRegistry (spawning and despawning entities, adding and removing components and
+    changing the map) that the systems record while they iterate over it. nothing changes until flush(), which
+    run_systems calls after every system, so a system never sees the entities shift under it and the next system sees
+    all of it.
+
+    the commands are applied in the order they were recorded, except for the change of map which always comes last
+    since it takes the whole registry away.
+    """
+
+    def __init__(self):
+        # (command, entity, key, component), see flush
+        self._commands = []
+
+        # (key, target_x, target_y) of the map to change to
+        self.map_change = None
+
+    def __len__(self):
+        return len(self._commands) + (self.map_change is not None)
+
+    def spawn(self, entity):
+        self._commands.append(('spawn', entity, None, None))
+
+    def despawn(self, entity):
+        self._commands.append(('despawn', entity, None, None))
+
+    def add_component(self, entity, key, component):
+        self._commands.append(('add', entity, key, component))
+
+    def remove_component(self, entity, key, component=None):
+        """
+        with component given, the component under key is only removed if it still is that one
+        """
+        self._commands.append(('remove', entity, key, component))
+
+    def change_map(self, key, target_x, target_y):
+        """
+        move the player to (target_x, target_y) on the map stored under key in the world. the first change of map
+        recorded before a flush wins
+        """
+        if self.map_change is None:
+            self.map_change = key, target_x, target_y
+
+    def flush(self, entities):
+        """
+        apply every recorded command to entities, except for the change of map, which is left to the caller (see
+        game.sync_point)
+
+        Returns: (key, target_x, target_y) of the map to change to, or None
+        """
+        commands, self._commands = self._commands, []
+
+        gone = set()
+        for command, entity, key, component in commands:
+            if command == 'spawn':
+                gone.discard(entity)
+                entities.append(entity)
+            elif command == 'despawn':
+                # more than one system may have found a reason to get rid of the same entity
+                if entity in entities:
+                    entities.remove(entity)
+                gone.add(entity)
+            elif entity in gone:
+                # changes to the components of an entity that was despawned first go nowhere
+                continue
+            elif command == 'add':
+                entity.components[key] = component
+            elif component is None or entity.components.get(key) is component:
+                entity.components.pop(key, None)
+
+        map_change, self.map_change = self.map_change, None
+        return map_change
+
+    def clear(self):
+        del self._commands[:]
+        self.map_change = None
@@ -6,6 +6,7 @@ class Component(object):
     """
     base class to be inherited by any component
     """
+    __slots__ = ()
     Forever = 'Forever'
 
     def __init__(self):
@@ -19,6 +20,126 @@ class PlayerComponent(Component):
     mainly for use in the automation system for bots to interact with player
     """
     name = 'PlayerComponent'
+    __slots__ = ()
+
+
+class Impulses(object):
+    """
+    the dynamic velocities of a MovementComponent, (velx, vely, ttl) in the order they were added.
+
+    kept in slots that are reused in place: adding, applying and decaying impulses allocates nothing (except when more
+    impulses are active at once than ever before, which grows the slots). the slots are only allocated on the first
+    add, most movers never get knocked back. iterating still yields (velx, vely, ttl) tuples
+
+    movement_system adds up the impulses of every mover in one batch before moving anyone and ages them in another one
+    afterwards (see systems.apply_impulses), the sums are kept in between in sum_x and sum_y
+    """
+    __slots__ = ('velx', 'vely', 'ttl', 'count', 'sum_x', 'sum_y', 'summed', 'moved')
+
+    # number of slots allocated on the first add
+    capacity = 4
+
+    def __init__(self, impulses=()):
+        self.velx = self.vely = self.ttl = ()
+
+        self.count = 0
+
+        # the sums of the batch, how many impulses went into them (0 if they are not up to date) and whether the mover
+        # used them to move
+        self.sum_x = self.sum_y = 0
+        self.summed = 0
+        self.moved = False
+
+        for impulse in impulses:
+            self.add(*impulse)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.velx[i], self.vely[i], self.ttl[i]
+
+    def add(self, velx, vely, ttl):
+        if self.count == len(self.ttl):
+            grow = [0.0] * (len(self.ttl) or self.capacity)
+            self.velx = list(self.velx) + grow
+            self.vely = list(self.vely) + grow
+            self.ttl = list(self.ttl) + grow
+
+        i = self.count
+        self.velx[i], self.vely[i], self.ttl[i] = velx, vely, ttl
+        self.count += 1
+
+    def apply(self, delta_x, delta_y):
+        """
+        add every impulse to delta_x and delta_y, one after the other
+
+        Returns: (delta_x, delta_y)
+        """
+        velx, vely = self.velx, self.vely
+        for i in range(self.count):
+            delta_x += velx[i]
+            delta_y += vely[i]
+
+        return delta_x, delta_y
+
+    def add_up(self, delta_x, delta_y):
+        """
+        apply() for the batch of movement_system: the sums are kept in sum_x and sum_y rather than returned
+        """
+        velx, vely = self.velx, self.vely
+        for i in range(self.count):
+            delta_x += velx[i]
+            delta_y += vely[i]
+
+        self.sum_x, self.sum_y = delta_x, delta_y
+        self.summed = self.count
+
+    def decay(self, delta_time, count=None):
+        """
+        age every impulse by delta_time and drop the ones that run out, keeping the others in order. with count set,
+        only the first count impulses are aged, the ones added after them are kept as they are
+        """
+        velx, vely, ttl = self.velx, self.vely, self.ttl
+        if count is None:
+            count = self.count
+
+        kept = 0
+        for i in range(count):
+            left = ttl[i] - delta_time
+            if left > 0.0:
+                velx[kept], vely[kept], ttl[kept] = velx[i], vely[i], left
+                kept += 1
+
+        for i in range(count, self.count):
+            velx[kept], vely[kept], ttl[kept] = velx[i], vely[i], ttl[i]
+            kept += 1
+
+        self.count = kept
+
+    def step(self, delta_x, delta_y, delta_time):
+        """
+        apply() and decay() in one go, this is what movement_system does every frame
+
+        Returns: (delta_x, delta_y)
+        """
+        velx, vely, ttl = self.velx, self.vely, self.ttl
+        kept = 0
+        for i in range(self.count):
+            delta_x += velx[i]
+            delta_y += vely[i]
+
+            left = ttl[i] - delta_time
+            if left > 0.0:
+                velx[kept], vely[kept], ttl[kept] = velx[i], vely[i], left
+                kept += 1
+
+        self.count = kept
+        return delta_x, delta_y
+
+    def clear(self):
+        self.count = 0
 
 
 class MovementComponent(Component):
@@ -31,27 +152,50 @@ class MovementComponent(Component):
     be manually managed (i.e. they last forever)
 
     dynamic velocities, on the other hand, have a finite lifetime. they are used i.e. for applying knockback effects.
+    they are kept in an Impulses store of their own
     """
     name = 'MovementComponent'
+    __slots__ = ('velx', 'vely', 'dynamic', 'on_change')
 
-    def __init__(self, velx=0, vely=0, dynamic=list()):
+    def __init__(self, velx=0, vely=0, dynamic=()):
         Component.__init__(self)
         self.velx = velx
         self.vely = vely
 
-        self.dynamic = dynamic
+        self.dynamic = Impulses(dynamic)
 
-        self.name = MovementComponent.name
+        # called without arguments after any of the methods below changed the velocities (not when they left them as
+        # they were). set by the registry, which passes it on to the numpy movement backend (see
+        # columns.MovementColumns) and the systems that only look at what changed (see changes.ChangeTracker)
+        self.on_change = None
 
     def add_constant(self, velx, vely):
-        self.velx += velx
-        self.vely -= vely
+        self._constant(self.velx + velx, self.vely - vely)
+
+    def set_constant(self, velx, vely):
+        """
+        reset_constant() and add_constant() in one go, so that setting the velocity it already has is no change
+        """
+        self._constant(0 + velx, 0 - vely)
 
     def add_dynamic(self, velx, vely, ttl):
-        self.dynamic.append((velx, vely, ttl))
+        self.dynamic.add(velx, vely, ttl)
+
+        if self.on_change is not None:
+            self.on_change()
 
     def reset_constant(self):
-        self.velx = self.vely = 0
+        self._constant(0, 0)
+
+    def _constant(self, velx, vely):
+        if velx == self.velx and vely == self.vely:
+            return
+
+        self.velx = velx
+        self.vely = vely
+
+        if self.on_change is not None:
+            self.on_change()
 
 
 class DirectionComponent(Component):
@@ -60,6 +204,7 @@ class DirectionComponent(Component):
     directions.
     """
     name = 'DirectionComponent'
+    __slots__ = ('direction', 'on_change')
 
     North = 'North'
     South = 'South'
@@ -70,10 +215,16 @@ class DirectionComponent(Component):
         Component.__init__(self)
         self.direction = direction
 
+        # called without arguments after set() turned the entity, set by the registry (see changes.ChangeTracker)
+        self.on_change = None
+
     def set(self, val):
-        if val in [self.North, self.South, self.East, self.West]:
+        if val in [self.North, self.South, self.East, self.West] and val != self.direction:
             self.direction = val
 
+            if self.on_change is not None:
+                self.on_change()
+
 
 class InputComponent(Component):
     """
@@ -83,19 +234,19 @@ class InputComponent(Component):
     was released. the input component should be reset after processing.
     """
     name = 'InputComponent'
+    __slots__ = ('keys',)
 
     def __init__(self):
         Component.__init__(self)
         self.keys = {}
 
-        self.name = InputComponent.name
-
 
 class BoundsComponent(Component):
     """
     bounds component keeps position and boundaries of an Entity as a pygame.Rect object.
     """
     name = 'BoundsComponent'
+    __slots__ = ('bounds',)
 
     def __init__(self, bounds):
         Component.__init__(self)
@@ -111,6 +262,7 @@ class AttackComponent(Component):
     Spin = 2
 
     name = 'AttackComponent'
+    __slots__ = ('atype', 'ar', 'damage')
 
     def __init__(self, damage=0, atype=Spin, ar=0):
         Component.__init__(self)
@@ -118,8 +270,6 @@ class AttackComponent(Component):
         self.ar = ar
         self.damage = damage
 
-        self.name = AttackComponent.name
-
 
 class TimeToLiveComponent(Component):
     """
@@ -127,6 +277,7 @@ class TimeToLiveComponent(Component):
     component has expired, the Entity will be deleted.
     """
     name = 'TimeToLiveComponent'
+    __slots__ = ('ttl',)
 
     def __init__(self, ttl):
         Component.__init__(self)
@@ -145,6 +296,7 @@ class StatusComponent(Component):
     status component is the base class for all status effects that have a finite lifetime.
     """
     name = 'StatusComponent'
+    __slots__ = ('ttl',)
 
     def __init__(self, ttl):
         Component.__init__(self)
@@ -163,6 +315,7 @@ class RootedComponent(StatusComponent):
     rooted component will stop Entity from moving (i.e. any change in position)
     """
     name = 'RootedComponent'
+    __slots__ = ()
 
     def __init__(self, ttl):
         StatusComponent.__init__(self, ttl)
@@ -173,6 +326,7 @@ class UnableToAttackComponent(StatusComponent):
     unable to attack component is a debuff in which an Entity cannot execute any attacks
     """
     name = 'UnableToAttackComponent'
+    __slots__ = ()
 
     def __init__(self, ttl):
         StatusComponent.__init__(self, ttl)
@@ -183,6 +337,7 @@ class InvulnerableComponent(StatusComponent):
     for entities with a health component, if this component also exists, do not allow to take damage
     """
     name = 'InvulnerableComponent'
+    __slots__ = ()
 
     def __init__(self, ttl):
         StatusComponent.__init__(self, ttl)
@@ -193,6 +348,7 @@ class SpriteComponent(Component):
     sprite component is the base component for a single, static sprite image
     """
     name = 'SpriteComponent'
+    __slots__ = ('sprite',)
 
     def __init__(self, sprite):
         Component.__init__(self)
@@ -209,12 +365,12 @@ class AnimatedSpriteComponent(SpriteComponent):
     however, this class implements sprite as a dictionary of lists, where sprites[STATE][INDEX] = surface to draw
     """
     name = 'AnimatedSpriteComponent'
+    __slots__ = ('sprites', 'state', 'next_state', 'state_index', 'timer', 'time_between_frames')
 
     def __init__(self, sprites, initial_state=None, time_between_frames=100):
         Component.__init__(self)
         # sprites is a dictionary indexed by state and state_index to retrieve an image
         self.sprites = sprites
-        self.states = list(sprites.keys())
 
         if initial_state is None:
             self.state = list(sprites.keys())[0]
@@ -228,8 +384,12 @@ class AnimatedSpriteComponent(SpriteComponent):
         self.timer = 0.0
         self.time_between_frames = time_between_frames
 
+    @property
+    def states(self):
+        return list(self.sprites.keys())
+
     def set_state(self, new_state, repeated=True, reset_index_on_duplicate=True):
-        if new_state in self.states:
+        if new_state in self.sprites:
             if repeated:
                 self.next_state = new_state
 
@@ -260,6 +420,7 @@ class CollisionImmaterialComponent(Component):
     the entity is ignored by the collision system (while keeping movement in-tact)
     """
     name = 'CollisionImmaterialComponent'
+    __slots__ = ()
 
     def __init__(self):
         Component.__init__(self)
@@ -270,6 +431,7 @@ class CollisionSolidComponent(Component):
     component to represent that this object is not able to be passed through
     """
     name = 'CollisionSolidComponent'
+    __slots__ = ()
 
     def __init__(self):
         Component.__init__(self)
@@ -280,6 +442,7 @@ class CollisionKnockbackComponent(Component):
     component representing degree of knockback to apply to anything that collides with Entity
     """
     name = 'CollisionKnockbackComponent'
+    __slots__ = ('knockback', 'duration')
 
     def __init__(self, knockback, duration):
         Component.__init__(self)
@@ -293,6 +456,7 @@ class CollisionDamagingComponent(Component):
     any collision involving an entity with this component will hurt the other entity for damage
     """
     name = 'CollisionDamagingComponent'
+    __slots__ = ('damage',)
 
     def __init__(self, damage):
         Component.__init__(self)
@@ -305,6 +469,7 @@ class CollisionTransitionComponent(Component):
     colliding with this component will cause a transition to the map with the set id
     """
     name = 'CollisionTransitionComponent'
+    __slots__ = ('target', 'target_x', 'target_y')
 
     def __init__(self, target, target_x, target_y):
         Component.__init__(self)
@@ -316,14 +481,16 @@ class CollisionTransitionComponent(Component):
 
 class CollisionIgnoreComponent(Component):
     """
-    contains a list of entities to ignore when calculating collisions
+    contains the ids (Entity.id) of the entities to ignore when calculating collisions. an id goes stale when its
+    entity is removed, so an entity that takes over its slot later is not ignored by accident
     """
     name = 'CollisionIgnoreComponent'
+    __slots__ = ('ignored',)
 
-    def __init__(self, ignore_list):
+    def __init__(self, ignored):
         Component.__init__(self)
 
-        self.ignore_list = ignore_list
+        self.ignored = frozenset(ignored)
 
 
 class HealthComponent(Component):
@@ -331,6 +498,7 @@ class HealthComponent(Component):
     simple state component for health as an integer value
     """
     name = 'HealthComponent'
+    __slots__ = ('max_health', 'current_health')
 
     def __init__(self, max_health, initial_health=False):
         Component.__init__(self)
@@ -358,6 +526,7 @@ class AutomatonComponent(Component):
     allows processing by the automation system
     """
     name = 'AutomatonComponent'
+    __slots__ = ('personality',)
 
     def __init__(self, personality):
         Component.__init__(self)
@@ -375,6 +544,7 @@ class AttributesComponent(Component):
     dictionary that holds various values for a given entity
     """
     name = 'AttributesComponent'
+    __slots__ = ('vals',)
 
     def __init__(self, dictionary):
         Component.__init__(self)
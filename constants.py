@@ -8,6 +8,31 @@ PLAYER_ATTACK_ANIMATION_DURATION = 500
 
 INVULNERABLE_AFTER_DAMAGE_TIMER = 300
 
+# what every cobra is created with (see entities.CobraEntity). batch.py sweeps over these
+COBRA_STATS = {
+    'aggro_range': 300,
+    'attack_range': 50,
+    'move_speed': 0.09,
+    'damage': 5,
+    'knockback': 0.8,
+    'knockback_duration': 10
+}
+
+# automatons out of aggro range and off screen are planned every this many frames (see automation_system). both have
+# to divide the period of the AutomatonScheduler
+AUTOMATON_NEAR_INTERVAL = 4
+AUTOMATON_FAR_INTERVAL = 16
+# out to this many times its aggro range, an automaton counts as near
+AUTOMATON_NEAR_RANGE = 2
+
+# how far (in pixels walked) around the player the flow field the automatons path along is searched
+# (see navigation.FlowField). beyond that they head straight for the player. the way around a wall can be a lot longer
+# than the aggro range, more so for the larger automatons
+FLOW_FIELD_RANGE = 1024
+
+# size of the screen, i.e. how much of the map the camera shows
+VIEW_SIZE = 640, 480
+
 STATE_MOVING = 'moving'
 STATE_MOVING_WEST = STATE_MOVING + DirectionComponent.West
 STATE_MOVING_EAST = STATE_MOVING + DirectionComponent.East
@@ -0,0 +1,78 @@
+from bisect import bisect_left, bisect_right
+
+from components import BoundsComponent
+
+
+class DrawOrder(object):
+    """
+    the entities graphics_system draws, kept sorted by (bounds.y, registry order) - the order a stable sort by y of
+    the query result would give.
+
+    the registry keeps it up to date: entities are inserted and removed as they gain or lose their bounds or sprites,
+    and re-filed with a bisect when moved() reports a change of y. nothing is sorted per frame.
+    """
+
+    def __init__(self):
+        # sorted (y, order) keys and the entities that go with them
+        self.keys = []
+        self.entities = []
+
+        # entity -> its key
+        self.placed = {}
+
+        # the height of the tallest bounds ever inserted, for visible()
+        self.tallest = 0
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self.placed
+
+    def __iter__(self):
+        return iter(list(self.entities))
+
+    def insert(self, entity, order):
+        bounds = entity.components[BoundsComponent.name].bounds
+        key = (bounds.y, order)
+
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.entities.insert(i, entity)
+        self.placed[entity] = key
+
+        self.tallest = max(self.tallest, bounds.height)
+
+    def remove(self, entity):
+        key = self.placed.pop(entity, None)
+        if key is None:
+            return
+
+        i = bisect_left(self.keys, key)
+        del self.keys[i]
+        del self.entities[i]
+
+    def moved(self, entity):
+        key = self.placed.get(entity)
+        if key is None or key[0] == entity.components[BoundsComponent.name].bounds.y:
+            return
+
+        self.remove(entity)
+        self.insert(entity, key[1])
+
+    def visible(self, viewport):
+        """
+        Returns: the entities whose bounds overlap viewport (a Rect), in draw order
+        """
+        # nothing that starts below the viewport, or more than the tallest entity above it, can overlap it
+        first = bisect_left(self.keys, (viewport.top - self.tallest,))
+        last = bisect_left(self.keys, (viewport.bottom,))
+
+        return [entity for entity in self.entities[first:last]
+                if viewport.colliderect(entity.components[BoundsComponent.name].bounds)]
+
+    def clear(self):
+        del self.keys[:]
+        del self.entities[:]
+        self.placed.clear()
+        self.tallest = 0
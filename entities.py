@@ -2,11 +2,17 @@ from components import *
 from constants import *
 
 import loader
+from registry import ComponentDict
 
 
 class Entity(object):
+    __slots__ = ('components', 'id')
+
     def __init__(self, components=list()):
-        self.components = {}
+        # handed out by the registry the entity is in (see ids.EntityIds), None while it is in none
+        self.id = None
+
+        self.components = ComponentDict(self)
         for comp in components:
             self.components[comp.name] = comp
 
@@ -41,7 +47,12 @@ def DummyEntity(initial_position, damage=False, knockback=False):
     return Entity(comps)
 
 
-def CobraEntity(initial_position):
+def CobraEntity(initial_position, stats=None):
+    """
+    stats overrides any of COBRA_STATS
+    """
+    stats = dict(COBRA_STATS, **(stats or {}))
+
     return Entity(
         [
             AnimatedSpriteComponent(loader.load_cobra_sprites(), STATE_STANDING_STILL_SOUTH, 150),
@@ -51,12 +62,12 @@ def CobraEntity(initial_position):
             HealthComponent(100),
             AutomatonComponent(PERSONALITY_AGGRESSIVE),
             AttributesComponent({
-                ATTRIBUTES_AGGRO_RANGE: 300,
-                ATTRIBUTES_ATTACK_RANGE: 50,
-                ATTRIBUTES_MOVE_SPEED: 0.09
+                ATTRIBUTES_AGGRO_RANGE: stats['aggro_range'],
+                ATTRIBUTES_ATTACK_RANGE: stats['attack_range'],
+                ATTRIBUTES_MOVE_SPEED: stats['move_speed']
             }),
-            CollisionKnockbackComponent(0.8, 10),
-            CollisionDamagingComponent(5)
+            CollisionKnockbackComponent(stats['knockback'], stats['knockback_duration']),
+            CollisionDamagingComponent(stats['damage'])
         ]
     )
 
@@ -107,7 +118,7 @@ def PlayerAttackEntity(attacker):
                 CollisionDamagingComponent(10),
                 CollisionKnockbackComponent(0.5, 100),
                 TimeToLiveComponent(100),
-                CollisionIgnoreComponent([attacker]),
+                CollisionIgnoreComponent([attacker.id]),
                 SpriteComponent(loader.load_attack_sprite(atype))
             ]
         )
@@ -1,8 +1,4 @@
 
 
-class MapChangeException(Exception):
-    pass
-
-
 class GameOverException(Exception):
     pass
\ No newline at end of file
@@ -8,38 +8,187 @@ from systems import *
 from loader import *
 from graphics import *
 from exceptions import *
+from registry import EntityRegistry
+from profiler import section
+from scheduling import SystemScheduler, declare, WORLD, SCREEN
+from helpers import prefetch_transition_targets, map_transition
 
 
 black = 0, 0, 0
 initial_position = 40, 360
 
 
-def play_game(screen, world):
+# the order in which the systems run every frame
+SYSTEMS = \
+    [
+        death_system,
+        aging_system,
+        input_system,
+        automation_system,
+        direction_system,
+        direction_movement_animation_system,
+        movement_system,
+        graphics_system
+    ]
 
-    fps_clock = pygame.time.Clock()
 
+# systems that keep running for the parked maps, see play_game's background_interval
+BACKGROUND_SYSTEMS = \
+    [
+        death_system,
+        aging_system
+    ]
+
+
+def new_game(world, vectorized_movement=False, cobra_stats=None):
+    """
+    create the entities of the default map of world plus a fresh player. vectorized_movement switches movement_system
+    to the numpy backend (see columns.MovementColumns), cobra_stats overrides any of COBRA_STATS for the cobras
+
+    Returns: (entities, player)
+    """
     # get objects from TiledRenderer, convert them to Entities, and add to entities list
-    entities = []
-    entities.extend(load_entities_from_tiled_renderer(world['default']))
+    entities = EntityRegistry(vectorized_movement=vectorized_movement)
+    entities.extend(load_entities_from_tiled_renderer(world['default'], cobra_stats))
 
-    # load the ui
-    ui = UserInterface()
+    prefetch_transition_targets(world, entities)
 
     # initialize the player
     player = PlayerEntity(initial_position)
 
     entities.append(player)
-    systems = \
-        [
-            death_system,
-            aging_system,
-            input_system,
-            automation_system,
-            direction_system,
-            direction_movement_animation_system,
-            movement_system,
-            graphics_system
-        ]
+
+    return entities, player
+
+
+def run_systems(systems, entities, delta, key_transitions, world, player, profiler=None, viewport=None,
+                cobra_stats=None, **kwargs):
+    """
+    run one frame worth of systems. if a profiler.FrameProfiler is given, every system is timed on its own.
+
+    the structural changes a system recorded are applied right after it (see sync_point). once the map changed, the
+    rest of the frame is skipped, the systems can carry on with the new map on the next one.
+
+    viewport is the part of the map that is on screen, as a Rect (None when nothing is shown). cobra_stats is what the
+    game was started with (see new_game), for the cobras of the maps visited for the first time. any other kwargs are
+    handed to every system.
+
+    systems is either a list, run in order, or a scheduling.SystemScheduler, which runs the systems that don't touch
+    the same components at the same time
+    """
+    run = getattr(systems, 'run', None)
+    if run is not None:
+        run(lambda settle: sync_point(entities, world, player, settle, cobra_stats), profiler, entities=entities,
+            delta_time=delta, key_transitions=key_transitions, world=world, player=player, viewport=viewport, **kwargs)
+        return
+
+    if profiler is None:
+        for system in systems:
+            system(entities, delta_time=delta, key_transitions=key_transitions, world=world, player=player,
+                   viewport=viewport, **kwargs)
+            if sync_point(entities, world, player, cobra_stats=cobra_stats):
+                return
+    else:
+        for system in systems:
+            with profiler.section(system.__name__):
+                system(entities, delta_time=delta, key_transitions=key_transitions, world=world, player=player,
+                       viewport=viewport, **kwargs)
+                changed = sync_point(entities, world, player, cobra_stats=cobra_stats)
+            if changed:
+                return
+
+
+def sync_point(entities, world, player, settle=None, cobra_stats=None):
+    """
+    apply the spawns, despawns and component changes recorded in the command buffer of entities and change the map if
+    that was asked for (see helpers.map_transition). settle() is called right before the map changes (see
+    scheduling.SystemScheduler)
+
+    Returns: True if the map was changed
+    """
+    flush = getattr(entities, 'flush', None)
+    if flush is None:
+        return False
+
+    map_change = flush()
+    if map_change is None or world is None or player is None:
+        return False
+
+    if settle is not None:
+        settle()
+
+    key, target_x, target_y = map_change
+    return map_transition(world, key, target_x, target_y, entities, player, cobra_stats)
+
+
+@declare(reads=[WORLD], writes=[SCREEN])
+def map_render_system(entities, world=None, viewport=None, screen=None, dirty=None, **kwargs):
+    """
+    draw the part of the current map in viewport onto screen, through dirty (a graphics.DirtyRects) if given. it only
+    reads the map, so a SystemScheduler runs it alongside the systems that work on the entities
+    """
+    if screen is None:
+        return
+
+    if dirty is not None:
+        dirty.begin(screen, world['default'], viewport)
+    else:
+        screen.fill(black)
+
+        world['default'].render_map(screen, viewport)
+
+
+def run_background_systems(entities, delta, world):
+    """
+    advance the maps parked in entities by delta. only systems that need neither the player nor the screen run there
+    """
+    for parked in entities.parked().values():
+        run_systems(BACKGROUND_SYSTEMS, parked, delta, {}, world, None)
+
+
+def play_game(screen, world, dirty_rects=False, profiler=None, background_interval=0, vectorized_movement=False,
+              recorder=None, parallel_systems=False):
+    """
+    run the game until the game over screen has been shown.
+
+    with dirty_rects set, only the parts of the screen that changed are redrawn and pushed to the display (see
+    graphics.DirtyRects). otherwise the whole screen is redrawn and flipped every frame.
+
+    if a profiler.FrameProfiler is given, the systems, map and ui rendering are timed every frame and F3 toggles the
+    profiler overlay.
+
+    with a background_interval of n, the maps that are not on screen keep aging (timers, status effects, deaths) every
+    n-th frame, by the time of the last n frames. 0 leaves them frozen until they are visited again.
+
+    vectorized_movement moves the entities with the numpy backend, see new_game.
+
+    the screen shows the part of the map around the player (see graphics.Camera), maps larger than the screen scroll.
+
+    if a replay.ReplayRecorder is given, the input and delta of every frame are recorded along with a hash of the
+    state after it, to be played back by headless.run_headless.
+
+    parallel_systems runs the map render and the systems through a scheduling.SystemScheduler, so that the map is drawn
+    while the systems that don't need the screen run (with more than one core, otherwise it runs them in order).
+    """
+
+    fps_clock = pygame.time.Clock()
+
+    if recorder is not None:
+        recorder.begin(world['default'].map_id, background_interval)
+
+    entities, player = new_game(world, vectorized_movement)
+
+    # load the ui
+    ui = UserInterface()
+
+    dirty = DirtyRects() if dirty_rects else None
+
+    camera = Camera(screen.get_size())
+
+    scheduler = SystemScheduler([map_render_system] + SYSTEMS) if parallel_systems else None
+
+    frame = 0
+    background_delta = 0
 
     while True:
         key_transitions = {}
@@ -50,25 +199,62 @@ def play_game(screen, world):
             elif event.type in [KEYDOWN, KEYUP]:
                 key_transitions[event.key] = event.type == KEYDOWN  # True for key pressed down, False for released
 
+                if profiler is not None and event.key == K_F3 and event.type == KEYDOWN:
+                    profiler.toggle_overlay()
+
         delta = fps_clock.tick(60)
 
-        screen.fill(black)
+        camera.follow(player.components[BoundsComponent.name].bounds, world['default'].pixel_size)
+        view = camera.rect
 
-        world['default'].render_map(screen)
+        if scheduler is None:
+            with section(profiler, 'map render'):
+                map_render_system(entities, world=world, viewport=view, screen=screen, dirty=dirty)
 
-        try:
-            for system in systems:
-                system(entities, delta_time=delta, key_transitions=key_transitions, world=world, player=player)
-        except MapChangeException:
-            # in case of the map change, we do not want to continue processing --
-            # we can do that after the world has been changed
-            pass
+            run_systems(SYSTEMS, entities, delta, key_transitions, world, player, profiler, view)
+        else:
+            run_systems(scheduler, entities, delta, key_transitions, world, player, profiler, view, screen=screen,
+                        dirty=dirty)
 
-        graphics_system(entities, output=screen, delta_time=delta)
+        frame += 1
+        if background_interval:
+            background_delta += delta
+            if frame % background_interval == 0:
+                with section(profiler, 'background maps'):
+                    run_background_systems(entities, background_delta, world)
+                background_delta = 0
+
+        if recorder is not None:
+            recorder.record(delta, key_transitions, entities, world)
+
+        with section(profiler, 'entity render'):
+            if dirty is not None:
+                graphics_system(entities, output=screen, delta_time=delta, drawn=dirty.current, viewport=view)
+
+                dirty.draw_foreground(screen, world['default'])
+            else:
+                graphics_system(entities, output=screen, delta_time=delta, viewport=view)
+
+                world['default'].render_foreground(screen, view)
 
         try:
-            ui.render(screen, player)
+            with section(profiler, 'ui render'):
+                drawn = ui.render(screen, player)
         except GameOverException:
+            if scheduler is not None:
+                scheduler.shutdown()
             return
 
-        pygame.display.flip()
+        if profiler is not None:
+            overlay = profiler.render(screen)
+            if overlay is not None:
+                drawn.append(overlay)
+
+        if dirty is not None:
+            dirty.current.extend(drawn)
+            if ui.overlay:
+                dirty.invalidate()
+
+            dirty.finish()
+        else:
+            pygame.display.flip()
@@ -7,6 +7,7 @@ from pytmx.util_pygame import load_pygame
 
 from components import *
 from exceptions import *
+from assets import asset_manager
 
 """
 copied from https://github.com/bitcraft/PyTMX
@@ -17,51 +18,174 @@ thanks to bitcraft!! <3
 class TiledRenderer(object):
     """
     Super simple way to render a tiled map
+
+    the layers are pre-rendered in square chunks of chunk_size pixels. a chunk is only built the first time a part of
+    it is shown, and kept in the shared asset manager, which drops the least recently used chunks once its budget is
+    used up (and all chunks of a map once it was left, see AssetManager.leave_map). drawing a frame only blits the
+    handful of chunks inside the camera, however large the map is.
     """
 
+    chunk_size = 512
+
     def __init__(self, filename):
         tm = load_pygame(filename)
+        self.filename = filename
 
         # self.size will be the pixel size of the map
         # this value is used later to render the entire map to a pygame surface
         self.pixel_size = tm.width * tm.tilewidth, tm.height * tm.tileheight
         self.tmx_data = tm
+        self.map_id = tm.properties.get('id')
 
-    def render_map(self, surface):
-        """ Render our map to a pygame surface
-        Feel free to use this as a starting point for your pygame app.
-        This method expects that the surface passed is the same pixel
-        size as the map.
-        Scrolling is a often requested feature, but pytmx is a map
-        loader, not a renderer!  If you'd like to have a scrolling map
-        renderer, please see my pyscroll project.
+        # layers with a truthy `foreground` property are drawn on top of the entities
+        self.has_foreground = any(layer.properties.get('foreground') for layer in tm.visible_layers)
+
+        # tile images may be larger than the tiles, and then reach into the tiles to the right and below
+        widths = [image.get_width() for image in tm.images if image]
+        heights = [image.get_height() for image in tm.images if image]
+        self.tile_overhang = -(-max(widths + [tm.tilewidth]) // tm.tilewidth) - 1, \
+            -(-max(heights + [tm.tileheight]) // tm.tileheight) - 1
+
+        # the walls of the map as a spatial.SolidGrid, baked by the loader (see loader.build_solid_grid), and the
+        # navigation.FlowField toward the player over them
+        self.solids = None
+        self.flow_field = None
+
+    def bake(self, area=None):
         """
+        build the chunks that cover area (a Rect in map pixels, the whole map if None) ahead of time, i.e. when
+        entering a map. otherwise they are built the first time they are drawn.
+        """
+        if area is None:
+            area = Rect((0, 0), self.pixel_size)
+
+        for layer_group in ('background', 'foreground') if self.has_foreground else ('background',):
+            for cx, cy, chunk_rect in self.chunks_in(area):
+                self.chunk(layer_group, cx, cy)
+
+    def chunks_in(self, area):
+        """
+        Returns: list of (cx, cy, rect in map pixels) of every chunk that overlaps area
+        """
+        area = area.clip(Rect((0, 0), self.pixel_size))
+        if not area.width or not area.height:
+            return []
 
-        # fill the background color of our render surface
-        if self.tmx_data.background_color:
-            surface.fill(pygame.Color(self.tmx_data.background_color))
+        size = self.chunk_size
+        return [(cx, cy, Rect(cx * size, cy * size, size, size).clip(Rect((0, 0), self.pixel_size)))
+                for cy in range(area.top // size, (area.bottom - 1) // size + 1)
+                for cx in range(area.left // size, (area.right - 1) // size + 1)]
+
+    def chunk(self, layer_group, cx, cy):
+        """
+        the pre-rendered 'background' or 'foreground' chunk at chunk coordinates cx, cy (None for a foreground chunk of
+        a map without foreground layers)
+        """
+        if layer_group == 'foreground' and not self.has_foreground:
+            return None
+
+        with asset_manager.map_scope(self.map_id):
+            return asset_manager.get(('map_chunk', self.filename, layer_group, cx, cy),
+                                     lambda: self.render_chunk(layer_group, cx, cy))
+
+    def render_chunk(self, layer_group, cx, cy):
+        """
+        composite the visible tile and image layers of one chunk into a surface in the display format, in map order.
+        background chunks get every layer without the `foreground` property, foreground chunks (transparent) the ones
+        with it
+        """
+        size = self.chunk_size
+        bounds = Rect(cx * size, cy * size, size, size).clip(Rect((0, 0), self.pixel_size))
+
+        foreground = layer_group == 'foreground'
+        if foreground:
+            surface = pygame.Surface(bounds.size, pygame.SRCALPHA, 32)
+        else:
+            surface = pygame.Surface(bounds.size)
+
+            # fill the background color of our render surface
+            if self.tmx_data.background_color:
+                surface.fill(pygame.Color(self.tmx_data.background_color))
 
         # iterate over all the visible layers, then draw them
         for layer in self.tmx_data.visible_layers:
+            if bool(layer.properties.get('foreground')) != foreground:
+                continue
+
             if isinstance(layer, TiledTileLayer):
-                self.render_tile_layer(surface, layer)
+                self.render_tile_layer(surface, layer, bounds)
 
             elif isinstance(layer, TiledObjectGroup):
                 # self.render_object_layer(surface, layer)
                 pass
 
             elif isinstance(layer, TiledImageLayer):
-                self.render_image_layer(surface, layer)
+                self.render_image_layer(surface, layer, bounds)
+
+        return surface.convert_alpha() if foreground else surface.convert()
+
+    def render_area(self, surface, area, view, layer_group='background'):
+        """
+        draw the part of the map that is shown in area (a Rect on surface) when view (a Rect in map pixels) is on
+        screen
+        """
+        shown = area.move(view.x, view.y)
+
+        for cx, cy, chunk_rect in self.chunks_in(shown):
+            chunk = self.chunk(layer_group, cx, cy)
+            if chunk is None:
+                return
+
+            part = chunk_rect.clip(shown)
+            surface.blit(chunk, (part.x - view.x, part.y - view.y), part.move(-chunk_rect.x, -chunk_rect.y))
+
+    def render_map(self, surface, view=None):
+        """ Render our map to a pygame surface
+        Feel free to use this as a starting point for your pygame app.
+        Scrolling is a often requested feature, but pytmx is a map
+        loader, not a renderer!  If you'd like to have a scrolling map
+        renderer, please see my pyscroll project.
+
+        view is the part of the map to show (i.e. Camera.rect), the top left corner of the map if None. only the
+        pre-rendered chunks inside of it are blitted (see render_chunk).
+        """
+        if view is None:
+            view = surface.get_rect()
 
-    def render_tile_layer(self, surface, layer):
+        self.render_area(surface, surface.get_rect(), view)
+
+    def render_foreground(self, surface, view=None):
+        """
+        draw the foreground layers, if the map has any. must be called after the entities were drawn
+        """
+        if view is None:
+            view = surface.get_rect()
+
+        if self.has_foreground:
+            self.render_area(surface, surface.get_rect(), view, 'foreground')
+
+    def render_tile_layer(self, surface, layer, bounds):
+        """
+        draw the tiles of layer that reach into bounds (map pixels) onto surface, which shows bounds
+        """
         # deref these heavily used references for speed
         tw = self.tmx_data.tilewidth
         th = self.tmx_data.tileheight
+        images = self.tmx_data.images
+        data = layer.data
         surface_blit = surface.blit
 
-        # iterate over the tiles in the layer
-        for x, y, image in layer.tiles():
-            surface_blit(image, (x * tw, y * th))
+        overhang_x, overhang_y = self.tile_overhang
+        first_x, first_y = max(0, bounds.left // tw - overhang_x), max(0, bounds.top // th - overhang_y)
+        last_x, last_y = min(layer.width, -(-bounds.right // tw)), min(layer.height, -(-bounds.bottom // th))
+
+        # iterate over the tiles in the layer, in the same order as layer.tiles()
+        for y in range(first_y, last_y):
+            row = data[y]
+            for x in range(first_x, last_x):
+                gid = row[x]
+                if gid:
+                    surface_blit(images[gid], (x * tw - bounds.x, y * th - bounds.y))
 
     def render_object_layer(self, surface, layer):
         # deref these heavily used references for speed
@@ -93,9 +217,103 @@ class TiledRenderer(object):
                 draw_rect(surface, rect_color,
                           (obj.x, obj.y, obj.width, obj.height), 3)
 
-    def render_image_layer(self, surface, layer):
+    def render_image_layer(self, surface, layer, bounds):
         if layer.image:
-            surface.blit(layer.image, (0, 0))
+            surface.blit(layer.image, (-bounds.x, -bounds.y))
+
+
+class Camera(object):
+    """
+    the part of the map that is on screen, in map pixels. follows a target (the player) around, but never shows
+    anything beyond the right or bottom edge of the map. maps smaller than the screen stay in the top left corner.
+    """
+
+    def __init__(self, size):
+        self.rect = Rect((0, 0), size)
+
+    def follow(self, target, map_size):
+        """
+        center the camera on the target rect
+
+        Returns: True if the camera moved
+        """
+        map_width, map_height = map_size
+
+        x = max(0, min(target.centerx - self.rect.width // 2, map_width - self.rect.width))
+        y = max(0, min(target.centery - self.rect.height // 2, map_height - self.rect.height))
+
+        moved = (x, y) != self.rect.topleft
+        self.rect.topleft = x, y
+        return moved
+
+
+class DirtyRects(object):
+    """
+    bookkeeping for the dirty rectangle mode of play_game.
+
+    instead of clearing and redrawing the whole screen, only the screen rects that were drawn to in the previous frame
+    are restored from the pre-rendered map chunks. everything drawn this frame is recorded with add(), and at the
+    end of the frame only the previous and current rects are pushed to the display.
+
+    the whole screen is redrawn and flipped instead on the first frame, after the map changed and for as long as
+    invalidate() keeps being called (i.e. while a full screen overlay is shown) plus the frame after that.
+    """
+
+    background_color = 0, 0, 0
+
+    def __init__(self):
+        self.previous = []
+        self.current = []
+
+        self.renderer = None
+        self.view = None
+        self.full_frames = 1
+
+    def invalidate(self):
+        # redraw everything for this frame and the next one, which has to get rid of whatever covered the screen
+        self.full_frames = 2
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def begin(self, surface, renderer, view=None):
+        """
+        view is the part of the map on screen (Camera.rect). whenever it scrolls, everything on screen moves and the
+        whole frame is redrawn
+        """
+        if view is None:
+            view = surface.get_rect()
+
+        if renderer is not self.renderer or view != self.view:
+            self.renderer = renderer
+            self.view = Rect(view)
+            self.full_frames = max(self.full_frames, 1)
+
+        if self.full_frames:
+            surface.fill(self.background_color)
+            renderer.render_map(surface, view)
+        else:
+            for rect in self.previous:
+                surface.fill(self.background_color, rect)
+                renderer.render_area(surface, rect, view)
+
+    def draw_foreground(self, surface, renderer):
+        # the foreground layers have to be drawn on top of the entities again wherever the background was restored
+        if self.full_frames:
+            renderer.render_foreground(surface, self.view)
+        elif renderer.has_foreground:
+            for rect in self.previous + self.current:
+                renderer.render_area(surface, rect, self.view, 'foreground')
+
+    def finish(self):
+        if self.full_frames:
+            pygame.display.flip()
+            self.full_frames -= 1
+        else:
+            pygame.display.update(self.previous + self.current)
+
+        self.previous = self.current
+        self.current = []
 
 
 class UserInterface(object):
@@ -111,20 +329,29 @@ class UserInterface(object):
 
     def __init__(self):
         # load user interface images
-        self.full_bar = pygame.image.load(os.path.join('./', "data/ui/full_bar.png")).convert_alpha()
+        self.full_bar = asset_manager.image("data/ui/full_bar.png")
 
-        self.empty_bar = pygame.image.load(os.path.join('./', "data/ui/empty_bar.png")).convert_alpha()
+        self.empty_bar = asset_manager.image("data/ui/empty_bar.png")
 
-        self.game_over = pygame.image.load(os.path.join('./', "data/ui/game_over.png")).convert_alpha()
+        self.game_over = asset_manager.image("data/ui/game_over.png")
 
-        self.invuln = pygame.image.load(os.path.join('./', "data/ui/invuln.png")).convert_alpha()
+        self.invuln = asset_manager.image("data/ui/invuln.png")
 
         self.time_to_show_game_over = 0
 
+        # set by render when a full screen overlay was drawn
+        self.overlay = False
+
     def render(self, surface, player):
+        """
+        draw the ui and return the list of screen rects that were drawn to
+        """
+        drawn = []
+        self.overlay = False
+
         health_comp = player.components[HealthComponent.name]
         # first draw the empty bar fully onto the screen. then draw a percentage of the full bar on top of it
-        surface.blit(self.empty_bar, (10, 10))
+        drawn.append(surface.blit(self.empty_bar, (10, 10)))
 
         h = self.full_bar.get_height()
         w = self.full_bar.get_width()
@@ -133,7 +360,8 @@ class UserInterface(object):
         surface.blit(self.full_bar, (10, 10), (0, 0, w, h))
 
         if health_comp.current_health <= 0:
-            surface.blit(self.game_over, (0, 0))
+            drawn.append(surface.blit(self.game_over, (0, 0)))
+            self.overlay = True
             self.time_to_show_game_over += 1
 
             if self.time_to_show_game_over > self.game_over_length:
@@ -141,4 +369,7 @@ class UserInterface(object):
 
         invuln = player.components.get(InvulnerableComponent.name)
         if invuln is not None:
-            surface.blit(self.invuln, (0, 0))
+            drawn.append(surface.blit(self.invuln, (0, 0)))
+            self.overlay = True
+
+        return drawn
@@ -0,0 +1,242 @@
+"""
+run the simulation without a window, without real keyboard events and without the 60 fps cap.
+
+every frame advances by the same fixed delta_time, input comes from a scripted stream and the frames are stepped as
+fast as the systems allow. useful for soak testing and profiling on machines without a display, i.e.
+
+    python headless.py --map 2 --frames 10000 --script data/scripts/tour.txt
+
+or to play back a session recorded with main.py --record and check it against the recording frame by frame
+
+    python headless.py --replay session.replay
+"""
+import os
+
+# must be set before pygame initializes the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import time
+
+import pygame
+import pygame.locals
+
+import game
+from loader import load_map_files
+from assets import asset_manager
+from profiler import FrameProfiler, section
+from systems import graphics_system
+from graphics import Camera
+from components import BoundsComponent, HealthComponent
+from constants import VIEW_SIZE
+from replay import load_replay, state_hash
+from scheduling import SystemScheduler
+
+screen_size = VIEW_SIZE
+
+
+def load_input_script(filename):
+    """
+    read a scripted input stream. every line that is neither empty nor a comment reads `frame key down|up`, where key
+    is the name of a pygame key constant, i.e. `12 K_RIGHT down`
+
+    Returns: dict of frame number -> key_transitions for that frame
+    """
+    script = {}
+
+    with open(filename) as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+
+            try:
+                frame, key, state = line.split()
+                script.setdefault(int(frame), {})[getattr(pygame.locals, key)] = {'down': True, 'up': False}[state]
+            except (ValueError, AttributeError, KeyError):
+                raise ValueError('{}:{}: cannot read input line {!r}'.format(filename, number, line))
+
+    return script
+
+
+def init_display():
+    """
+    the loaders convert every image to the display format, so there has to be a display mode even without a window
+    """
+    pygame.init()
+    return pygame.display.set_mode(screen_size)
+
+
+def run_headless(world, frames, map_id=None, script=None, delta_time=16, systems=None, render=False, screen=None,
+                 profiler=None, vectorized_movement=False, background_interval=0, replay=None, pilot=None,
+                 stop_on_death=False, parallel_systems=False, cobra_stats=None):
+    """
+    step a new game for the given number of frames with a fixed delta_time.
+
+    with a replay.Replay, its frames are played back instead: the map, background_interval, input and delta of every
+    frame come from the recording and the state after every frame is checked against the recorded hash.
+
+    Args:
+        world: dict of maps as returned by loader.load_map_files
+        frames: number of frames to simulate
+        map_id: id of the map to start on, defaults to the map marked as default
+        script: dict of frame number -> key_transitions, see load_input_script
+        delta_time: milliseconds that pass every frame
+        systems: systems to run every frame, defaults to the ones play_game runs
+        render: also draw the map and the entities to screen every frame
+        screen: surface to render to
+        profiler: profiler.FrameProfiler to time the systems and rendering with
+        vectorized_movement: move the entities with the numpy backend
+        background_interval: age the parked maps every that many frames, see game.play_game
+        replay: replay.Replay to play back, overrides frames, map_id, script, delta_time and background_interval
+        pilot: callable(frame, entities, player) returning the key_transitions of every frame, instead of a script
+        stop_on_death: stop as soon as the player died
+        parallel_systems: run the systems (and the map render) through a scheduling.SystemScheduler
+        cobra_stats: dict overriding any of COBRA_STATS for every cobra of the game
+
+    Returns: dict with the frames simulated, the time it took and the resulting frames per second, the frame the
+        player died on (None if it did not) and the damage it took. played back replays add the first frame whose state
+        differs from the recording (None if none does) as 'mismatch'
+    """
+    if replay is not None:
+        frames = len(replay)
+        map_id = replay.map_id
+        background_interval = replay.background_interval
+
+    if map_id is not None:
+        world['default'] = world[map_id]
+
+    if systems is None:
+        systems = game.SYSTEMS
+
+    if script is None:
+        script = {}
+
+    if render and screen is None:
+        screen = pygame.display.get_surface()
+
+    entities, player = game.new_game(world, vectorized_movement, cobra_stats)
+    health = player.components[HealthComponent.name].current_health
+
+    # the camera decides which automatons are on screen and planned every frame. it follows the player even when
+    # nothing is drawn, so that batch runs, replays and play_game all schedule the automatons the same way
+    camera = Camera(screen.get_size() if render else screen_size)
+
+    scheduler = SystemScheduler([game.map_render_system] + list(systems)) if parallel_systems else None
+
+    background_delta = 0
+    mismatch = None
+    death_frame = None
+
+    frame = 0
+    start = time.perf_counter()
+
+    while frame < frames:
+        if replay is not None:
+            delta_time, key_transitions, recorded = replay.frames[frame]
+        elif pilot is not None:
+            key_transitions = pilot(frame, entities, player)
+        else:
+            key_transitions = script.get(frame, {})
+
+        camera.follow(player.components[BoundsComponent.name].bounds, world['default'].pixel_size)
+        viewport = camera.rect
+
+        if scheduler is not None:
+            game.run_systems(scheduler, entities, delta_time, key_transitions, world, player, profiler, viewport,
+                             cobra_stats, screen=screen if render else None)
+        else:
+            if render:
+                with section(profiler, 'map render'):
+                    game.map_render_system(entities, world=world, viewport=viewport, screen=screen)
+
+            game.run_systems(systems, entities, delta_time, key_transitions, world, player, profiler, viewport,
+                             cobra_stats)
+
+        if background_interval:
+            background_delta += delta_time
+            if (frame + 1) % background_interval == 0:
+                with section(profiler, 'background maps'):
+                    game.run_background_systems(entities, background_delta, world)
+                background_delta = 0
+
+        if replay is not None and mismatch is None and state_hash(entities, world) != recorded:
+            mismatch = frame
+
+        if render:
+            with section(profiler, 'entity render'):
+                graphics_system(entities, output=screen, delta_time=delta_time, viewport=viewport)
+
+        frame += 1
+
+        if death_frame is None and player not in entities:
+            death_frame = frame
+            if stop_on_death:
+                break
+
+    seconds = time.perf_counter() - start
+
+    if scheduler is not None:
+        scheduler.shutdown()
+
+    return {
+        'frames': frame,
+        'seconds': seconds,
+        'fps': frame / seconds if seconds > 0.0 else float('inf'),
+        'entities': len(entities),
+        'player_alive': player in entities,
+        'death_frame': death_frame,
+        'damage_taken': health - player.components[HealthComponent.name].current_health,
+        'map': world['default'].tmx_data.properties['id'],
+        'mismatch': mismatch
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='run the simulation headless with a fixed timestep')
+    parser.add_argument('--map', dest='map_id', default=None, help='id of the map to start on')
+    parser.add_argument('--frames', type=int, default=3600, help='number of frames to simulate')
+    parser.add_argument('--delta', type=int, default=16, help='fixed delta_time per frame in milliseconds')
+    parser.add_argument('--script', default=None, help='scripted input stream, see load_input_script')
+    parser.add_argument('--render', action='store_true', help='also render every frame to an offscreen surface')
+    parser.add_argument('--profile', metavar='FILE', default=None,
+                        help='time every system and write the stats to FILE (.json or .csv)')
+    parser.add_argument('--numpy-movement', action='store_true', help='move the entities with the numpy backend')
+    parser.add_argument('--replay', default=None,
+                        help='play back a session recorded with main.py --record and compare every frame')
+    parser.add_argument('--parallel-systems', action='store_true',
+                        help='run the systems that touch different components at the same time. only with more '
+                             'than one core, on a single core the systems run in order')
+    args = parser.parse_args()
+
+    screen = init_display()
+    world = load_map_files()
+
+    script = load_input_script(args.script) if args.script else None
+
+    replay = load_replay(args.replay) if args.replay else None
+
+    profiler = FrameProfiler(window=len(replay) if replay is not None else args.frames) if args.profile else None
+
+    result = run_headless(world, args.frames, map_id=args.map_id, script=script, delta_time=args.delta,
+                          render=args.render, screen=screen, profiler=profiler,
+                          vectorized_movement=args.numpy_movement, replay=replay,
+                          parallel_systems=args.parallel_systems)
+
+    print('{frames} frames in {seconds:.3f} s: {fps:.1f} frames per second '
+          '({entities} entities on map {map} at the end, player alive: {player_alive})'.format(**result))
+    print('assets: {entries} cached, {bytes} bytes, {hits} hits, {misses} misses, {evictions} evictions'.format(
+        **asset_manager.stats()))
+
+    if replay is not None:
+        if result['mismatch'] is None:
+            print('replay: every frame matches the recording')
+        else:
+            print('replay: the state first differs from the recording on frame {}'.format(result['mismatch']))
+
+    if profiler is not None:
+        profiler.dump(args.profile)
+
+
+if __name__ == '__main__':
+    main()
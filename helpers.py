@@ -1,22 +1,38 @@
 from loader import load_entities_from_tiled_renderer
 from components import *
-from exceptions import MapChangeException
+from constants import VIEW_SIZE
+from assets import asset_manager
 
 
-def map_transition(world, key, target_x, target_y, entities, player):
+def map_transition(world, key, target_x, target_y, entities, player, cobra_stats=None):
     """
     set 'default' key of world dict to next map
 
-    reset Entities list, add in Player, and load objects from map
+    park the Entities of the map we are leaving, bring back the ones of the next map (or load its objects on the first
+    visit, with cobra_stats for its cobras) and add in Player, under the id it had on the map it left. must not be
+    called while a system is iterating over entities, the systems ask for it with entities.commands.change_map and
+    game.run_systems does the transition in between systems
+
+    Returns: False if there is no map under key
     """
     if key not in world:
-        return
+        return False
+
+    previous = world['default']
 
     world['default'] = world[key]
+    world['default'].bake(Rect(target_x - VIEW_SIZE[0] // 2, target_y - VIEW_SIZE[1] // 2, *VIEW_SIZE))
+
+    entities.park(previous.map_id, keep=(player,))
+
+    if not entities.unpark(world['default'].map_id):
+        entities.extend(load_entities_from_tiled_renderer(world['default'], cobra_stats))
 
-    entities.clear()
+    for dropped in entities.trim_parked():
+        # drop the sprites that only the map whose entities were just dropped needed
+        asset_manager.leave_map(dropped)
 
-    entities.extend(load_entities_from_tiled_renderer(world['default']))
+    prefetch_transition_targets(world, entities)
 
     entities.append(player)
 
@@ -25,5 +41,15 @@ def map_transition(world, key, target_x, target_y, entities, player):
     if loc is not None:
         loc.bounds.x = target_x
         loc.bounds.y = target_y
+        entities.moved(player)
 
-    raise MapChangeException
+    return True
+
+
+def prefetch_transition_targets(world, entities):
+    """
+    have the map library load the maps that the transitions of the current map lead to in the background, so that
+    walking into one of them does not have to wait for the map to be parsed
+    """
+    for entity in entities.query([CollisionTransitionComponent.name]):
+        world.prefetch(entity.components[CollisionTransitionComponent.name].target)
@@ -0,0 +1,94 @@
+# an id is the index of its slot in the id table in the low bits and the generation of that slot above them
+INDEX_BITS = 32
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+
+class EntityIds(object):
+    """
+    generational integer ids for the entities of a registry.
+
+    the index of a released id goes on a free list and is handed out again with its generation bumped, so an id that
+    is kept around after its entity was removed (i.e. in a CollisionIgnoreComponent) never refers to whatever entity
+    got the index next - get() returns None for it instead.
+
+    the entities themselves are kept packed in a dense list, a released one is swapped with the last entity, so both
+    allocate() and release() are O(1).
+    """
+
+    def __init__(self):
+        # index -> generation of the id currently (or last) using that index
+        self.generations = []
+
+        # index -> position in dense, -1 when the index is free
+        self.slots = []
+
+        # indices that can be handed out again, the most recently released last
+        self.free = []
+
+        # the entities that have an id and their ids, packed
+        self.dense = []
+        self.dense_ids = []
+
+    def __len__(self):
+        return len(self.dense)
+
+    def __iter__(self):
+        return iter(list(self.dense))
+
+    def __contains__(self, entity_id):
+        return self.get(entity_id) is not None
+
+    def allocate(self, entity):
+        if self.free:
+            index = self.free.pop()
+            self.generations[index] += 1
+        else:
+            index = len(self.generations)
+            self.generations.append(0)
+            self.slots.append(-1)
+
+        entity_id = self.generations[index] << INDEX_BITS | index
+
+        self.slots[index] = len(self.dense)
+        self.dense.append(entity)
+        self.dense_ids.append(entity_id)
+
+        return entity_id
+
+    def release(self, entity_id):
+        """
+        give back a live id. its entity is swapped out of the dense list and the index goes on the free list
+        """
+        index = entity_id & INDEX_MASK
+        slot = self.slots[index]
+
+        last = len(self.dense) - 1
+        if slot != last:
+            moved_id = self.dense_ids[last]
+            self.dense[slot] = self.dense[last]
+            self.dense_ids[slot] = moved_id
+            self.slots[moved_id & INDEX_MASK] = slot
+
+        self.dense.pop()
+        self.dense_ids.pop()
+
+        self.slots[index] = -1
+        self.free.append(index)
+
+    def get(self, entity_id):
+        """
+        Returns: the entity with the given id, None if the id is stale (its entity was removed) or was never handed out
+        """
+        index = entity_id & INDEX_MASK
+        if index >= len(self.generations) or self.generations[index] != entity_id >> INDEX_BITS:
+            return None
+
+        slot = self.slots[index]
+        if slot < 0:
+            return None
+
+        return self.dense[slot]
+
+    def clear(self):
+        for entity_id in list(self.dense_ids):
+            self.release(entity_id)
@@ -9,14 +9,18 @@ from loader import *
 from graphics import *
 
 from game import play_game
+from assets import asset_manager
 
 
-def intro(screen, world):
+def intro(screen, world, **options):
+    """
+    show the splash screen until a key is pressed, then play. options are passed on to play_game
+    """
 
     fps_clock = pygame.time.Clock()
 
     # load the ui
-    ui = pygame.image.load(os.path.join('.', 'data', 'ui', 'intro_splash.png'))
+    ui = asset_manager.image('data/ui/intro_splash.png', alpha=False)
 
     while True:
 
@@ -25,7 +29,7 @@ def intro(screen, world):
                 sys.exit()
             elif event.type in (KEYDOWN, KEYUP):
                 # start the game!
-                play_game(screen, world)
+                play_game(screen, world, **options)
 
         fps_clock.tick(60)
 
@@ -1,19 +1,38 @@
 import pygame
 import os
 from glob import glob
-from functools import lru_cache
 from pytmx import *
 from ast import literal_eval
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
 
 from constants import *
 from components import *
 import entities as entities_mod
 from graphics import *
+from assets import asset_manager
+from spatial import SolidGrid
+from navigation import FlowField
+
+# every loader goes through the shared asset manager, so a file is decoded once and every entity built from the same
+# sprites shares the same surfaces
+
+
+def load_sheet(name):
+    """
+    decode an image file once and convert it to the display format. the sprite loaders slice their frames out of the
+    returned surface as subsurfaces, so every frame of a sheet shares its pixels
+    """
+    return asset_manager.image(name)
 
 
-@lru_cache()
 def load_sprite_file(name, num):
-    sheet = pygame.image.load(os.path.join('./', name)).convert_alpha()
+    return asset_manager.get(('sprite_file', name, num), lambda: cut_sprite_file(name, num))
+
+
+def cut_sprite_file(name, num):
+    sheet = load_sheet(name)
 
     bounds = sheet.get_rect()
 
@@ -26,15 +45,17 @@ def load_sprite_file(name, num):
         src_x = i * src_width
         src_y = 0
 
-        surf = pygame.Surface((src_width, src_height), pygame.SRCALPHA, 32)
-        surf.blit(sheet, (0, 0), (src_x, src_y, src_width, src_height))
-
-        sprites.append(surf)
+        sprites.append(sheet.subsurface((src_x, src_y, src_width, src_height)))
 
     return sprites
 
 
 def load_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None):
+    key = ('multi_row_sprite_file', name, tuple(sprite_size), tuple(indices), sprites_per_row)
+    return asset_manager.get(key, lambda: cut_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row))
+
+
+def cut_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None):
     """
     this will take a sprite sheet with m by n sprites, where number of sprites per row is the same for every row
     Args:
@@ -43,9 +64,9 @@ def load_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None)
         indices: array of hashable values to index the result sprite rows (in order)
 
     Returns:
-
+        dict of index -> list of sprites, which are subsurfaces of the (shared) sheet
     """
-    sheet = pygame.image.load(os.path.join('./', name)).convert_alpha()
+    sheet = load_sheet(name)
 
     bounds = sheet.get_rect()
 
@@ -66,10 +87,7 @@ def load_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None)
             src_x = i * sprite_width
             src_y = row * sprite_height
 
-            surf = pygame.Surface((sprite_width, sprite_height), pygame.SRCALPHA, 32)
-            surf.blit(sheet, (0, 0), (src_x, src_y, sprite_width, sprite_height))
-
-            sprites.append(surf)
+            sprites.append(sheet.subsurface((src_x, src_y, sprite_width, sprite_height)))
 
         sprite_dict[ indices[row] ] = sprites
 
@@ -78,10 +96,14 @@ def load_multi_row_sprite_file(name, sprite_size, indices, sprites_per_row=None)
 
 def load_attack_sprite(atype):
 
-    return pygame.image.load(os.path.join('./', 'data/attack_animations/attack_' + atype + '.png')).convert_alpha()
+    return asset_manager.image('data/attack_animations/attack_' + atype + '.png')
 
 
 def load_cobra_sprites():
+    return asset_manager.get(('cobra_sprites',), build_cobra_sprites)
+
+
+def build_cobra_sprites():
     keys = [
         STATE_MOVING_NORTH,
         STATE_MOVING_EAST,
@@ -104,12 +126,20 @@ def load_cobra_sprites():
 
 
 def load_target_dummy():
+    return asset_manager.get(('target_dummy_sprites',), build_target_dummy)
+
+
+def build_target_dummy():
     return {
         STATE_STANDING_STILL: load_sprite_file("data/target_dummy/combat_dummy.png", 8)
     }
 
 
 def load_player_sprites():
+    return asset_manager.get(('player_sprites',), build_player_sprites)
+
+
+def build_player_sprites():
     sprites = {
         STATE_ATTACKING_NORTH: load_sprite_file("data/human/attacking_north.png", 8),
         STATE_ATTACKING_SOUTH: load_sprite_file("data/human/attacking_south.png", 8),
@@ -131,7 +161,16 @@ def load_player_sprites():
     return sprites
 
 
-def load_entities_from_tiled_renderer(tr):
+def load_entities_from_tiled_renderer(tr, cobra_stats=None):
+    # any sprites loaded for the entities of this map are tagged with it in the asset manager
+    with asset_manager.map_scope(tr.map_id):
+        return build_entities_from_tiled_renderer(tr, cobra_stats)
+
+
+def build_entities_from_tiled_renderer(tr, cobra_stats=None):
+    """
+    cobra_stats overrides any of COBRA_STATS for the cobras of the map (see entities.CobraEntity)
+    """
     entities = []
 
     for layer in tr.tmx_data.visible_layers:
@@ -156,8 +195,12 @@ def load_entities_from_tiled_renderer(tr):
 
                         entities.append(entities_mod.DummyEntity((obj.x, obj.y), **extra))
                     elif obj_type == 'cobra':
-                        entities.append(entities_mod.CobraEntity((obj.x, obj.y)))
+                        entities.append(entities_mod.CobraEntity((obj.x, obj.y), cobra_stats))
+
+                    continue
 
+                # plain walls are baked into the solid grid of the map
+                if is_static_solid(obj):
                     continue
 
                 # otherwise, create the custom Entity according to its properties
@@ -184,14 +227,177 @@ def load_entities_from_tiled_renderer(tr):
     return entities
 
 
-def load_map_files():
-    res = {}
+def is_static_solid(obj):
+    """
+    True for an object that is nothing but solid: no predefined type and no property that would give it anything else
+    to do (the ones build_entities_from_tiled_renderer looks at)
+    """
+    properties = obj.properties
+    if properties.get('obj_type') is not None or not properties.get('solid'):
+        return False
+
+    if 'damage' in properties or properties.get('input'):
+        return False
+
+    if 'transition' in properties and properties.get('target_x') is not None and properties.get('target_y') is not None:
+        return False
+
+    return True
+
+
+def build_solid_grid(tm):
+    """
+    rasterize the walls of a map into a SolidGrid at tile resolution: every static solid object (see is_static_solid)
+    and every tile with a truthy `solid` property
+    """
+    walls = [Rect(obj.x, obj.y, obj.width, obj.height)
+             for layer in tm.visible_layers if isinstance(layer, TiledObjectGroup)
+             for obj in layer if is_static_solid(obj)]
+
+    # the grid covers the map and every wall that sticks out of it
+    area = Rect(0, 0, tm.width * tm.tilewidth, tm.height * tm.tileheight)
+    if walls:
+        area = area.unionall(walls)
+
+    first_x, first_y = area.left // tm.tilewidth, area.top // tm.tileheight
+    last_x, last_y = (area.right - 1) // tm.tilewidth, (area.bottom - 1) // tm.tileheight
+
+    grid = SolidGrid(first_x * tm.tilewidth, first_y * tm.tileheight, last_x - first_x + 1, last_y - first_y + 1,
+                     tm.tilewidth, tm.tileheight)
+
+    for wall in walls:
+        grid.add_rect(wall)
 
-    for file in glob(os.path.join('./', 'data/places/*')):
-        tr = TiledRenderer(file)
-        res[tr.tmx_data.properties['id']] = tr
+    for layer in tm.visible_layers:
+        if isinstance(layer, TiledTileLayer):
+            for x, y, gid in layer:
+                properties = tm.get_tile_properties_by_gid(gid) if gid else None
+                if properties and properties.get('solid'):
+                    grid.fill_cell(x - first_x, y - first_y)
 
-        if tr.tmx_data.properties.get('default'):
-            res['default'] = tr
+    return grid
 
-    return res
+
+def load_tiled_renderer(filename):
+    tr = TiledRenderer(filename)
+    tr.solids = build_solid_grid(tr.tmx_data)
+    tr.flow_field = FlowField(tr.solids, FLOW_FIELD_RANGE // tr.tmx_data.tilewidth)
+    return tr
+
+
+def read_map_properties(filename):
+    """
+    read only the properties of the <map> element of a tmx file, without parsing its layers or loading any images
+    """
+    properties = {}
+    depth = 0
+
+    for event, elem in ElementTree.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            if elem.tag == 'properties':
+                for prop in elem.iter('property'):
+                    properties[prop.get('name')] = prop.get('value')
+            # the map properties come before any tileset or layer
+            break
+
+    return properties
+
+
+class MapLibrary(MutableMapping):
+    """
+    the `world` dict: map id -> TiledRenderer, plus 'default' for the current map.
+
+    only the properties of every tmx file are read up front. a map is parsed the first time it is looked up, or ahead
+    of time in a background thread once prefetch() was asked for it, in which case looking it up only blocks until
+    that load is done (if it isn't already).
+    """
+
+    def __init__(self, filenames):
+        # key -> filename for every key that has not been looked up yet
+        self.filenames = {}
+        # key -> TiledRenderer
+        self.maps = {}
+
+        # filename -> TiledRenderer / Future, so that the map id and 'default' share one renderer
+        self.loaded = {}
+        self.pending = {}
+
+        self._executor = None
+
+        for filename in filenames:
+            properties = read_map_properties(filename)
+            self.filenames[properties['id']] = filename
+
+            if properties.get('default'):
+                self.filenames['default'] = filename
+
+    def __getitem__(self, key):
+        tr = self.maps.get(key)
+        if tr is not None:
+            return tr
+
+        filename = self.filenames.get(key)
+        if filename is None:
+            raise KeyError(key)
+
+        tr = self.maps[key] = self.load(filename)
+        return tr
+
+    def __setitem__(self, key, tr):
+        self.filenames.pop(key, None)
+        self.maps[key] = tr
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        self.filenames.pop(key, None)
+        self.maps.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.maps or key in self.filenames
+
+    def __iter__(self):
+        return iter(set(self.maps) | set(self.filenames))
+
+    def __len__(self):
+        return len(set(self.maps) | set(self.filenames))
+
+    def is_loaded(self, key):
+        return key in self.maps or self.filenames.get(key) in self.loaded
+
+    def load(self, filename):
+        tr = self.loaded.get(filename)
+        if tr is not None:
+            return tr
+
+        future = self.pending.pop(filename, None)
+        if future is not None:
+            tr = future.result()
+        else:
+            tr = load_tiled_renderer(filename)
+
+        self.loaded[filename] = tr
+        return tr
+
+    def prefetch(self, key):
+        """
+        start parsing the map in the background unless it is loaded or on its way already
+        """
+        filename = self.filenames.get(key)
+        if filename is None or filename in self.loaded or filename in self.pending:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self.pending[filename] = self._executor.submit(load_tiled_renderer, filename)
+
+
+def load_map_files():
+    return MapLibrary(glob(os.path.join('./', 'data/places/*')))
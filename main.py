@@ -1,3 +1,4 @@
+import argparse
 import pygame
 import sys
 from pygame.locals import *
@@ -5,14 +6,32 @@ from pygame.locals import *
 from entities import *
 from components import *
 from systems import *
+from constants import VIEW_SIZE
 from loader import *
 from graphics import *
 
 from intro import intro
+from profiler import FrameProfiler
+from replay import ReplayRecorder
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--dirty-rects', action='store_true', help='only redraw the parts of the screen that changed')
+parser.add_argument('--profile', metavar='FILE', default=None,
+                    help='time every system (F3 shows the overlay) and write the stats to FILE (.json or .csv) on exit')
+parser.add_argument('--background-interval', metavar='N', type=int, default=0,
+                    help='keep aging the maps that are not on screen every N frames (0 freezes them)')
+parser.add_argument('--numpy-movement', action='store_true',
+                    help='move the entities with the numpy struct-of-arrays backend (needs numpy)')
+parser.add_argument('--record', metavar='FILE', default=None,
+                    help='record the input of the last game played to FILE, see headless.py --replay')
+parser.add_argument('--parallel-systems', action='store_true',
+                    help='run the systems that touch different components (and the map render) at the same time. '
+                         'only with more than one core, on a single core the systems run in order')
+args = parser.parse_args()
 
 pygame.init()
 
-size = width, height = 640, 480
+size = width, height = VIEW_SIZE
 black = 0, 0, 0
 
 screen = pygame.display.set_mode(size)
@@ -22,4 +41,16 @@ fps_clock = pygame.time.Clock()
 # load our map(s)
 world = load_map_files()
 
-intro(screen, world)
+profiler = FrameProfiler() if args.profile else None
+
+recorder = ReplayRecorder(args.record) if args.record else None
+
+try:
+    intro(screen, world, dirty_rects=args.dirty_rects, profiler=profiler,
+          background_interval=args.background_interval, vectorized_movement=args.numpy_movement, recorder=recorder,
+          parallel_systems=args.parallel_systems)
+finally:
+    if profiler is not None:
+        profiler.dump(args.profile)
+    if recorder is not None:
+        recorder.save()
@@ -0,0 +1,233 @@
+from collections import deque
+from itertools import chain
+
+from spatial import EMPTY
+
+# the eight neighbours of a cell, the straight ones first so that they win ties
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1))
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+class FlowField(object):
+    """
+    pathfinding toward one goal (the player) around the walls of a map, shared by every automaton on it.
+
+    a breadth first search over the cells of the map's spatial.SolidGrid gives every cell within `reach` steps of the
+    goal its number of steps to it. a diagonal step counts as one, the automatons move along both axes at full speed.
+    an automaton only has to look at the neighbours of its own cell and take the step to the closest one (or to the
+    farthest one, to get away), so the cost of a frame does not grow with the number of automatons.
+
+    the automatons are not points, so there is a search for every size of automaton. it runs over the cell the top
+    left corner of the automaton is in, and a cell only counts as open if the automaton fits with its corner anywhere
+    in it, i.e. the walls are grown by its size. cells that are partly covered by a wall count as blocked, and a
+    diagonal step is only taken between two open cells, so that automatons don't try to cut corners. a search only
+    runs again once the goal has moved to another cell.
+
+    where nothing is in the way (see clear()) the automatons don't need the field, they head straight for the goal or
+    straight away from it the way they did before there was one. among equally good steps of the field, the one
+    closest to that straight heading wins.
+    """
+
+    def __init__(self, solids, reach=20):
+        self.solids = solids
+        self.reach = reach
+
+        # pixel x, y of the goal, None until the first update
+        self.goal = None
+
+        # (width, height) of the automatons -> [cell of the goal, cell index -> steps to the goal]. only for the cells
+        # the last search for that size reached
+        self.fields = {}
+        # (cells covered to the right, cells covered below) -> cell index -> True if an automaton with its corner in
+        # that cell fits there. the walls don't move, so this is kept for the life of the map
+        self.open = {}
+
+        self.searches = 0
+
+    def cell(self, x, y):
+        """
+        Returns: (cell_x, cell_y) of the cell the pixel x, y is in, None if it is off the grid
+        """
+        solids = self.solids
+        cell_x = (x - solids.origin_x) // solids.tile_width
+        cell_y = (y - solids.origin_y) // solids.tile_height
+
+        if 0 <= cell_x < solids.width and 0 <= cell_y < solids.height:
+            return cell_x, cell_y
+        return None
+
+    def update(self, x, y):
+        """
+        move the goal to the pixel x, y. the fields are searched again the next time they are asked for a step
+
+        Returns: True if the goal moved
+        """
+        if self.goal == (x, y):
+            return False
+
+        self.goal = x, y
+        return True
+
+    def clear(self, bounds, target, away=False):
+        """
+        Returns: True if nothing is in the way of bounds heading straight for target (a Rect): along both axes until
+            it is level with target on one of them, then along the other, it does not run into a wall before it touches
+            target. if away, True if a cell's worth of heading straight away from target runs into no wall
+        """
+        solids = self.solids
+        delta_x, delta_y = target.centerx - bounds.centerx, target.centery - bounds.centery
+        step_x, step_y = sign(delta_x), sign(delta_y)
+
+        if away:
+            return not solids.blocked(bounds.move(-step_x * solids.tile_width, -step_y * solids.tile_height))
+
+        if not solids.blocked(bounds.union(target)):
+            return True
+
+        # walk the way in short stretches. the box around both ends of a stretch covers all of it
+        spacing = max(1, min(solids.tile_width, solids.tile_height) // 4)
+        diagonal = min(abs(delta_x), abs(delta_y))
+        length = max(abs(delta_x), abs(delta_y))
+
+        last = bounds
+        for walked in chain(range(spacing, length, spacing), (length,)):
+            along = min(walked, diagonal)
+            here = bounds.move(step_x * (walked if abs(delta_x) > diagonal else along),
+                               step_y * (walked if abs(delta_y) > diagonal else along))
+
+            if solids.blocked(last.union(here)):
+                return False
+            if here.colliderect(target):
+                return True
+            last = here
+
+        return True
+
+    def step(self, bounds, away=False):
+        """
+        Returns: (dx, dy), each -1, 0 or 1, the step from the cell of the automaton with bounds (a Rect) to its
+            neighbour that is the fewest steps from the goal (the most steps if away). None if there is no better
+            neighbour: at the goal, at the farthest point of a dead end, or where the search did not reach
+        """
+        if self.goal is None:
+            return None
+
+        solids = self.solids
+        goal_x, goal_y = self.goal
+        heading_x, heading_y = sign(goal_x - bounds.centerx), sign(goal_y - bounds.centery)
+        if away:
+            heading_x, heading_y = -heading_x, -heading_y
+
+        cell = self.cell(bounds.x, bounds.y)
+        if cell is None:
+            return None
+
+        x, y = cell
+        width, height = solids.width, solids.height
+        distances, is_open = self._field(bounds.width, bounds.height)
+
+        # a step has to get closer (farther if away) than the cell the automaton is in, unless the search didn't reach
+        # that cell, i.e. it is blocked
+        here = distances.get(y * width + x)
+
+        best = best_step = best_along = None
+        for dx, dy in NEIGHBOURS:
+            next_x, next_y = x + dx, y + dy
+            if not (0 <= next_x < width and 0 <= next_y < height):
+                continue
+
+            distance = distances.get(next_y * width + next_x)
+            if distance is None:
+                continue
+
+            if here is not None and not (distance > here if away else distance < here):
+                continue
+
+            if dx and dy and not (is_open(y * width + next_x) and is_open(next_y * width + x)):
+                continue
+
+            # how far the step goes along the straight heading, breaks ties
+            along = dx * heading_x + dy * heading_y
+            if best_step is None or (distance > best if away else distance < best) or \
+                    (distance == best and along > best_along):
+                best, best_step, best_along = distance, (dx, dy), along
+
+        return best_step
+
+    def _field(self, width, height):
+        """
+        Returns: (distances, is_open) for automatons of the given size, searched again if the goal moved to another
+            cell since the last search for that size
+        """
+        solids = self.solids
+        span = (max(0, (width + solids.tile_width - 2) // solids.tile_width),
+                max(0, (height + solids.tile_height - 2) // solids.tile_height))
+
+        open_cells = self.open.get(span)
+        if open_cells is None:
+            open_cells = self.open[span] = {}
+
+        def is_open(index):
+            fits = open_cells.get(index)
+            if fits is None:
+                fits = open_cells[index] = self._fits(index, span)
+            return fits
+
+        goal_x, goal_y = self.goal
+        goal = self.cell(goal_x - width // 2, goal_y - height // 2)
+
+        field = self.fields.get((width, height))
+        if field is None or field[0] != goal:
+            field = self.fields[(width, height)] = [goal, self._search(goal, is_open) if goal is not None else {}]
+            self.searches += 1
+
+        return field[1], is_open
+
+    def _fits(self, index, span):
+        solids = self.solids
+        width, cells = solids.width, solids.cells
+        x, y = index % width, index // width
+
+        # the grid covers every wall, there is nothing to run into beyond it
+        last_x, last_y = min(x + span[0], width - 1), min(y + span[1], solids.height - 1)
+        for row in range(y * width, last_y * width + 1, width):
+            for covered in range(row + x, row + last_x + 1):
+                if cells[covered] != EMPTY:
+                    return False
+
+        return True
+
+    def _search(self, goal, is_open):
+        width, height = self.solids.width, self.solids.height
+        reach = self.reach
+
+        goal_x, goal_y = goal
+
+        # the goal itself may be blocked, i.e. when the player stands right next to a wall
+        distances = {goal_y * width + goal_x: 0}
+        frontier = deque([(goal_x, goal_y, 0)])
+
+        while frontier:
+            x, y, distance = frontier.popleft()
+            if distance == reach:
+                continue
+
+            for dx, dy in NEIGHBOURS:
+                next_x, next_y = x + dx, y + dy
+                if not (0 <= next_x < width and 0 <= next_y < height):
+                    continue
+
+                index = next_y * width + next_x
+                if index in distances or not is_open(index):
+                    continue
+
+                if dx and dy and not (is_open(y * width + next_x) and is_open(next_y * width + x)):
+                    continue
+
+                distances[index] = distance + 1
+                frontier.append((next_x, next_y, distance + 1))
+
+        return distances
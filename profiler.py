@@ -0,0 +1,180 @@
+import csv
+import json
+from collections import deque, OrderedDict
+from time import perf_counter
+
+import pygame
+
+
+class _Section(object):
+    """
+    times the body of a with-statement and records it under name
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, perf_counter() - self.start)
+        return False
+
+
+class _NullSection(object):
+    """
+    stands in for a _Section when profiling is disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SECTION = _NullSection()
+
+
+def section(profiler, name):
+    """
+    with section(profiler, 'map'): ... times the block if profiler is not None and costs next to nothing otherwise
+    """
+    if profiler is None:
+        return NULL_SECTION
+    return _Section(profiler, name)
+
+
+class FrameProfiler(object):
+    """
+    keeps a rolling window of timings for every named section of a frame (each system, map render, ui render, ...)
+    and reports their percentiles.
+
+    the profiler only does work when it is handed to play_game / run_systems, passing None instead turns all timing
+    off. the overlay is toggled with toggle_overlay() and drawn with render().
+    """
+
+    # milliseconds a frame may take at 60 fps, the full width of a bar in the overlay
+    frame_budget = 1000.0 / 60
+
+    # only re-render the overlay text every this many frames, fonts are slow
+    overlay_refresh = 30
+
+    def __init__(self, window=600):
+        self.window = window
+
+        # section name -> deque of the last `window` timings in milliseconds, in first seen order
+        self.samples = OrderedDict()
+        self.counts = {}
+        self.maxima = {}
+
+        self.show_overlay = False
+        self._overlay = None
+        self._overlay_age = 0
+        self._font = None
+
+    def section(self, name):
+        return _Section(self, name)
+
+    def record(self, name, seconds):
+        ms = seconds * 1000.0
+
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+            self.counts[name] = 0
+            self.maxima[name] = ms
+
+        samples.append(ms)
+        self.counts[name] += 1
+        if ms > self.maxima[name]:
+            self.maxima[name] = ms
+
+    def percentiles(self, name, points=(50, 95, 99)):
+        ordered = sorted(self.samples[name])
+        last = len(ordered) - 1
+        return [ordered[min(last, int(round(last * point / 100.0)))] for point in points]
+
+    def summary(self):
+        """
+        Returns: list of dicts, one per section, with the count, mean, p50, p95, p99 and max of its timings in ms
+        """
+        rows = []
+        for name, samples in self.samples.items():
+            p50, p95, p99 = self.percentiles(name)
+            rows.append(OrderedDict([
+                ('section', name),
+                ('count', self.counts[name]),
+                ('mean_ms', sum(samples) / len(samples)),
+                ('p50_ms', p50),
+                ('p95_ms', p95),
+                ('p99_ms', p99),
+                ('max_ms', self.maxima[name])
+            ]))
+
+        return rows
+
+    def dump(self, filename):
+        """
+        write the summary to filename, as csv if it ends with .csv and as json otherwise
+        """
+        rows = self.summary()
+
+        with open(filename, 'w') as f:
+            if filename.endswith('.csv'):
+                writer = csv.DictWriter(f, fieldnames=['section', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+                                                       'max_ms'])
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump({'window': self.window, 'sections': rows}, f, indent=2)
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self._overlay = None
+
+    def render(self, surface):
+        """
+        draw the overlay with one bar per section (p50 solid, p95 outlined, relative to the 60 fps frame budget) in
+        the bottom left corner of surface. returns the rect that was drawn to, or None
+        """
+        if not self.show_overlay or not self.samples:
+            return None
+
+        self._overlay_age -= 1
+        if self._overlay is None or self._overlay_age <= 0:
+            self._overlay = self._render_overlay()
+            self._overlay_age = self.overlay_refresh
+
+        return surface.blit(self._overlay, (0, surface.get_height() - self._overlay.get_height()))
+
+    def _render_overlay(self):
+        if self._font is None:
+            self._font = pygame.font.Font(None, 16)
+
+        line_height = 14
+        label_width = 250
+        bar_width = 150
+        padding = 4
+
+        overlay = pygame.Surface((label_width + bar_width + 3 * padding,
+                                  len(self.samples) * line_height + 2 * padding), pygame.SRCALPHA, 32)
+        overlay.fill((0, 0, 0, 180))
+
+        for row, name in enumerate(self.samples):
+            p50, p95, p99 = self.percentiles(name)
+            y = padding + row * line_height
+
+            label = '{}  {:.2f} / {:.2f} / {:.2f} ms'.format(name, p50, p95, p99)
+            overlay.blit(self._font.render(label, True, (255, 255, 255)), (padding, y))
+
+            x = label_width + 2 * padding
+            scale = bar_width / self.frame_budget
+            overlay.fill((80, 200, 80), (x, y + 2, min(bar_width, p50 * scale), line_height - 4))
+            pygame.draw.rect(overlay, (230, 200, 60), (x, y + 2, min(bar_width, p95 * scale), line_height - 4), 1)
+
+        return overlay
@@ -0,0 +1,555 @@
+from collections import OrderedDict
+from functools import partial
+from itertools import chain
+
+from components import BoundsComponent, CollisionImmaterialComponent, StatusComponent, TimeToLiveComponent, \
+    AnimatedSpriteComponent, SpriteComponent, MovementComponent, DirectionComponent
+from spatial import SpatialHash
+from columns import MovementColumns
+from scheduling import AutomatonScheduler
+from timers import TimerHeap
+from draworder import DrawOrder
+from commands import CommandBuffer
+from ids import EntityIds
+from changes import ChangeTracker
+
+# components that run out after a while, see TimerHeap
+TIMED_COMPONENTS = (TimeToLiveComponent, StatusComponent)
+
+# components that report their changes through an on_change hook, see ChangeTracker
+TRACKED_COMPONENTS = (MovementComponent, DirectionComponent)
+
+
+def component_changed(entity, name):
+    # the on_change hook of a tracked component. goes through the registry the entity is in right now, which is a
+    # parked world while its map is not on screen
+    registry = entity.components.registry
+    if registry is not None:
+        registry.component_changed(entity, name)
+
+
+class ComponentDict(dict):
+    """
+    the components of an Entity, keyed by component name.
+
+    behaves exactly like a plain dict, but tells the owning registry whenever a component name is added or removed so
+    that the entity can be moved to its new archetype and any cached query results can be thrown away. replacing a
+    component under a name that already exists does not change the entity's signature, the registry is only told so
+    that it can restart the timer of a timed component.
+    """
+    __slots__ = ('owner', 'registry')
+
+    def __init__(self, owner):
+        dict.__init__(self)
+        self.owner = owner
+        self.registry = None
+
+    def _restructure(self):
+        if self.registry is not None:
+            self.registry.restructure(self.owner)
+
+    def _replaced(self, key, old, new):
+        if self.registry is not None:
+            self.registry.replaced(self.owner, key, old, new)
+
+    def __setitem__(self, key, value):
+        added = key not in self
+        old = None if added else dict.__getitem__(self, key)
+        dict.__setitem__(self, key, value)
+        if added:
+            self._restructure()
+        self._replaced(key, old, value)
+
+    def __delitem__(self, key):
+        old = dict.__getitem__(self, key)
+        dict.__delitem__(self, key)
+        self._restructure()
+        self._replaced(key, old, None)
+
+    def pop(self, key, *default):
+        present = key in self
+        value = dict.pop(self, key, *default)
+        if present:
+            self._restructure()
+            self._replaced(key, value, None)
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        old = list(self.items())
+        dict.clear(self)
+        self._restructure()
+        for key, value in old:
+            self._replaced(key, value, None)
+
+
+class Archetype(object):
+    """
+    the set of entities that share one exact component signature (a frozenset of component names)
+    """
+
+    def __init__(self, signature):
+        self.signature = signature
+        # used as an insertion ordered set
+        self.entities = {}
+        # cached queries that this archetype satisfies
+        self.queries = []
+
+
+class Query(object):
+    """
+    a cached component query. keeps the archetypes that satisfy it and the last result built from them. the result is
+    thrown away whenever an entity enters or leaves one of those archetypes.
+    """
+
+    def __init__(self, required, optional, disallowed):
+        self.required = frozenset(required)
+        self.optional = [frozenset(option) for option in optional]
+        self.disallowed = frozenset(disallowed)
+
+        self.archetypes = []
+        self.result = None
+
+    def matches(self, signature):
+        return self.required <= signature and \
+            all(not option.isdisjoint(signature) for option in self.optional) and \
+            self.disallowed.isdisjoint(signature)
+
+
+class EntityRegistry(object):
+    """
+    entity storage grouped by component signature (archetypes) with cached query views.
+
+    the registry stands in for the plain list of Entities that the systems used to share, so append, extend, remove,
+    clear, iteration and len all still work. systems ask for entities through query() (usually by way of
+    systems.relevant_entities) and get back a tuple that is only rebuilt after an entity matching the query has been
+    added, removed or had a component added or removed. results keep the order in which entities were added, exactly
+    like the old list did.
+
+    every entity with bounds that is not immaterial is also kept in a spatial hash so that collision_system only has
+    to look at its neighbours (see nearby()). pass cell_size=None to go without the broadphase.
+
+    the entities of a map that is not on screen can be parked under a key (the map id) and brought back later without
+    rebuilding them. at most park_budget entities are kept parked, the least recently parked maps are dropped first.
+
+    every entity in the registry has a generational id (Entity.id, see ids.EntityIds) that other components can hold
+    on to instead of the entity itself. get() turns an id back into its entity, or None once the entity was removed.
+    the ids are shared with the parked worlds, an entity kept out of park() (the player) keeps its id on every map.
+
+    with vectorized_movement set, the positions and velocities of every moving entity are mirrored in numpy arrays
+    (see columns.MovementColumns) that movement_system integrates in bulk.
+
+    systems that only need to look at what changed since they last ran ask changed() instead of query(). the registry
+    keeps track of the moves, the changes of the velocities and directions and the added and removed components for
+    them (see changes.ChangeTracker).
+
+    systems do not change the structure of the registry while they iterate over it, they record the changes in
+    commands (see commands.CommandBuffer) and game.run_systems applies them between systems.
+    """
+
+    # everything that describes the entities currently in the registry. park() and unpark() swap these as a whole
+    _storage = ('_order', '_sequence', '_archetypes', '_entity_archetype', '_queries', 'spatial', 'columns',
+                'automatons', 'timers', 'draw_order', 'changes', 'impulsed')
+
+    def __init__(self, entities=(), cell_size=64, park_budget=5000, vectorized_movement=False):
+        # entity -> insertion sequence number. doubles as an ordered set of every entity in the registry
+        self._order = {}
+        self._sequence = 0
+
+        self.ids = EntityIds()
+
+        self._archetypes = {}
+        self._entity_archetype = {}
+
+        self._queries = {}
+
+        self.spatial = SpatialHash(cell_size) if cell_size else None
+
+        self.columns = MovementColumns(cell_size or 64) if vectorized_movement else None
+
+        # which automatons automation_system plans on which frame
+        self.automatons = AutomatonScheduler()
+
+        # when the timed components run out, see aging_system
+        self.timers = TimerHeap()
+
+        # the entities graphics_system draws, in the order it draws them
+        self.draw_order = DrawOrder()
+
+        # which entities changed since the systems that ask changed() last ran
+        self.changes = ChangeTracker()
+
+        # mover -> its MovementComponent, for the movers with knockback impulses in insertion order. movement_system
+        # applies and decays them in one batch (see systems.apply_impulses). the numpy movement backend keeps its own
+        self.impulsed = {}
+
+        # structural changes recorded by the systems, applied by flush(). stays with the registry when parking
+        self.commands = CommandBuffer()
+
+        self.cell_size = cell_size
+        self.vectorized_movement = vectorized_movement
+
+        # key -> EntityRegistry holding the entities parked under that key, least recently parked first
+        self._parked = OrderedDict()
+        self.park_budget = park_budget
+
+        self.extend(entities)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, entity):
+        return entity in self._order
+
+    def __iter__(self):
+        # iterate over a snapshot, systems are allowed to add and remove entities while looping
+        return iter(list(self._order))
+
+    def append(self, entity):
+        if entity in self._order:
+            return
+
+        self._order[entity] = self._sequence
+        self._sequence += 1
+
+        # an entity kept out of park() comes back under the id it already has
+        if entity.id is None or self.ids.get(entity.id) is not entity:
+            entity.id = self.ids.allocate(entity)
+
+        entity.components.registry = self
+        self._place(entity, self._archetype(frozenset(entity.components)))
+
+        for key, component in entity.components.items():
+            if isinstance(component, TIMED_COMPONENTS):
+                self.timers.add(entity, key, component)
+            elif isinstance(component, TRACKED_COMPONENTS):
+                component.on_change = partial(component_changed, entity, key)
+
+        movement = entity.components.get(MovementComponent.name)
+        if movement is not None and movement.dynamic and self.columns is None:
+            self.impulsed[entity] = movement
+
+    def extend(self, entities):
+        for entity in entities:
+            self.append(entity)
+
+    def remove(self, entity):
+        # same contract as list.remove
+        if entity not in self._order:
+            raise ValueError('entity is not in registry')
+
+        self._detach(entity)
+
+        self.ids.release(entity.id)
+        entity.id = None
+
+    def get(self, entity_id):
+        """
+        Returns: the entity with the given id, None if it is not in the registry (anymore)
+        """
+        entity = self.ids.get(entity_id)
+        if entity is None or entity not in self._order:
+            # removed, or parked with the world of another map
+            return None
+        return entity
+
+    def flush(self):
+        """
+        apply the structural changes recorded in commands
+
+        Returns: (key, target_x, target_y) of the map to change to, or None
+        """
+        return self.commands.flush(self)
+
+    def clear(self):
+        for entity in self._order:
+            entity.components.registry = None
+
+            # the ids are shared with the parked worlds, only this one's go
+            self.ids.release(entity.id)
+            entity.id = None
+
+            for component in entity.components.values():
+                if isinstance(component, TRACKED_COMPONENTS):
+                    component.on_change = None
+
+        self._order.clear()
+        self._entity_archetype.clear()
+        for archetype in self._archetypes.values():
+            archetype.entities.clear()
+        for query in self._queries.values():
+            query.result = None
+
+        if self.spatial is not None:
+            self.spatial.clear()
+
+        if self.columns is not None:
+            self.columns.clear()
+
+        self.automatons.clear()
+        self.timers.clear()
+        self.draw_order.clear()
+        self.commands.clear()
+        self.changes.clear()
+        self.impulsed.clear()
+
+    def park(self, key, keep=()):
+        """
+        move every entity into a parked world stored under key, leaving the registry empty. O(n) only for re-pointing
+        the entities at their new registry, nothing is rebuilt.
+
+        the entities in keep are left out of the parked world but hold on to their ids, append() them again to bring
+        them into the world that comes next under the same id
+        """
+        for entity in keep:
+            if entity in self._order:
+                self._detach(entity)
+
+        parked = EntityRegistry(cell_size=self.cell_size, park_budget=0, vectorized_movement=self.vectorized_movement)
+        parked.ids = self.ids
+        self._swap_storage(parked)
+
+        self._parked.pop(key, None)
+        self._parked[key] = parked
+
+    def unpark(self, key):
+        """
+        bring back the entities parked under key into the (empty) registry.
+
+        Returns: False if nothing was parked under key
+        """
+        parked = self._parked.pop(key, None)
+        if parked is None:
+            return False
+
+        if self._order:
+            raise ValueError('can only unpark into an empty registry')
+
+        self._swap_storage(parked)
+        return True
+
+    def trim_parked(self):
+        """
+        drop the least recently parked worlds until no more than park_budget entities are parked.
+
+        Returns: the keys of the worlds that were dropped
+        """
+        dropped = []
+        parked_entities = sum(len(parked) for parked in self._parked.values())
+
+        while self._parked and parked_entities > self.park_budget:
+            key, parked = self._parked.popitem(last=False)
+            parked_entities -= len(parked)
+            parked.clear()
+            dropped.append(key)
+
+        return dropped
+
+    def parked(self):
+        """
+        Returns: dict of key -> EntityRegistry of every parked world
+        """
+        return dict(self._parked)
+
+    def moved(self, entity):
+        """
+        must be called after the bounds of an entity were changed so that the broadphase can re-file it
+        """
+        if self.spatial is not None and entity in self.spatial:
+            self.spatial.update(entity, entity.components[BoundsComponent.name].bounds)
+
+        if self.columns is not None:
+            self.columns.moved(entity)
+
+        self.draw_order.moved(entity)
+
+        # none of the systems watch the bounds so far, don't go through the tracker for every move
+        if self.changes.watched(BoundsComponent.name):
+            self.changes.changed(entity, BoundsComponent.name)
+
+    def component_changed(self, entity, name):
+        """
+        called through the on_change hook of a tracked component (see TRACKED_COMPONENTS) after it changed
+        """
+        if name == MovementComponent.name:
+            if self.columns is not None:
+                self.columns.movement_changed(entity)
+            elif entity.components[name].dynamic:
+                self.impulsed[entity] = entity.components[name]
+
+        self.changes.changed(entity, name)
+
+    def changed(self, key, watched, required, optional=(), disallowed=()):
+        """
+        like query(), but only the entities that had one of the watched components change, or a component added or
+        removed, since the last call under key (i.e. the name of the system asking). the first call returns everything
+
+        Returns: a tuple of entities, in insertion order
+        """
+        dirty = self.changes.take(key, watched)
+        if dirty is None:
+            return self.query(required, optional, disallowed)
+
+        query = self._query(required, optional, disallowed)
+        entity_archetype = self._entity_archetype
+
+        matches = [entity for entity in dirty
+                   if entity in entity_archetype and query in entity_archetype[entity].queries]
+        matches.sort(key=self._order.__getitem__)
+        return tuple(matches)
+
+    def nearby(self, rect):
+        """
+        every entity with bounds that is not immaterial and might overlap rect, in insertion order. only a superset of
+        the entities that overlap, the exact test is left to the caller
+        """
+        if self.spatial is None:
+            return self.query([BoundsComponent.name], disallowed=[CollisionImmaterialComponent.name])
+
+        return sorted(self.spatial.query(rect), key=self._order.__getitem__)
+
+    def restructure(self, entity):
+        """
+        called by an entity's ComponentDict after a component name was added or removed
+        """
+        signature = frozenset(entity.components)
+        if self._entity_archetype[entity].signature == signature:
+            return
+
+        self._displace(entity)
+        self._place(entity, self._archetype(signature))
+
+    def replaced(self, entity, key, old, new):
+        """
+        called by an entity's ComponentDict after the component under key was set or removed (old and new are None
+        when there was or is no component)
+        """
+        if isinstance(old, TIMED_COMPONENTS):
+            self.timers.cancel(old)
+        if isinstance(new, TIMED_COMPONENTS):
+            self.timers.add(entity, key, new)
+
+        if isinstance(old, TRACKED_COMPONENTS):
+            old.on_change = None
+        if isinstance(old, MovementComponent):
+            self.impulsed.pop(entity, None)
+        if isinstance(new, TRACKED_COMPONENTS):
+            new.on_change = partial(component_changed, entity, key)
+            self.component_changed(entity, key)
+
+        if old is not None and new is not None:
+            # swapped for another component under the same name, as good as a structural change to the watchers
+            self.changes.restructured(entity)
+
+    def query(self, required, optional=(), disallowed=()):
+        """
+        return a tuple of every entity that has all of the required components, at least one component from each of
+        the optional pairs, and none of the disallowed components
+        """
+        query = self._query(required, optional, disallowed)
+
+        if query.result is None:
+            matched = chain.from_iterable(archetype.entities for archetype in query.archetypes)
+            query.result = tuple(sorted(matched, key=self._order.__getitem__))
+
+        return query.result
+
+    def _query(self, required, optional, disallowed):
+        key = (tuple(required), tuple(tuple(option) for option in optional), tuple(disallowed))
+
+        query = self._queries.get(key)
+        if query is None:
+            query = Query(required, optional, disallowed)
+            for archetype in self._archetypes.values():
+                if query.matches(archetype.signature):
+                    query.archetypes.append(archetype)
+                    archetype.queries.append(query)
+            self._queries[key] = query
+
+        return query
+
+    def _swap_storage(self, other):
+        for name in self._storage:
+            mine = getattr(self, name)
+            setattr(self, name, getattr(other, name))
+            setattr(other, name, mine)
+
+        for registry in (self, other):
+            for entity in registry._order:
+                entity.components.registry = registry
+
+    def _detach(self, entity):
+        # remove() without giving up the id
+        self._displace(entity, leaving=True)
+        del self._order[entity]
+        entity.components.registry = None
+
+        for component in entity.components.values():
+            if isinstance(component, TIMED_COMPONENTS):
+                self.timers.cancel(component)
+            elif isinstance(component, TRACKED_COMPONENTS):
+                component.on_change = None
+
+    def _archetype(self, signature):
+        archetype = self._archetypes.get(signature)
+        if archetype is None:
+            archetype = Archetype(signature)
+            for query in self._queries.values():
+                if query.matches(signature):
+                    query.archetypes.append(archetype)
+                    archetype.queries.append(query)
+            self._archetypes[signature] = archetype
+
+        return archetype
+
+    def _place(self, entity, archetype):
+        archetype.entities[entity] = None
+        self._entity_archetype[entity] = archetype
+        for query in archetype.queries:
+            query.result = None
+
+        self.changes.restructured(entity)
+
+        collidable = BoundsComponent.name in archetype.signature and \
+            CollisionImmaterialComponent.name not in archetype.signature
+
+        if self.spatial is not None:
+            if collidable and entity not in self.spatial:
+                self.spatial.insert(entity, entity.components[BoundsComponent.name].bounds)
+            elif not collidable and entity in self.spatial:
+                self.spatial.remove(entity)
+
+        if self.columns is not None:
+            self.columns.sync(entity, archetype.signature, self._order[entity], collidable)
+
+        drawable = BoundsComponent.name in archetype.signature and \
+            not archetype.signature.isdisjoint((AnimatedSpriteComponent.name, SpriteComponent.name))
+        if drawable and entity not in self.draw_order:
+            self.draw_order.insert(entity, self._order[entity])
+        elif not drawable and entity in self.draw_order:
+            self.draw_order.remove(entity)
+
+    def _displace(self, entity, leaving=False):
+        archetype = self._entity_archetype.pop(entity)
+        del archetype.entities[entity]
+        for query in archetype.queries:
+            query.result = None
+
+        if leaving and self.spatial is not None:
+            self.spatial.remove(entity)
+
+        if leaving and self.columns is not None:
+            self.columns.remove(entity)
+
+        if leaving:
+            self.draw_order.remove(entity)
+            self.changes.removed(entity)
+            self.impulsed.pop(entity, None)
@@ -0,0 +1,111 @@
+"""
+recording and playing back a session frame by frame.
+
+play_game hands every frame's key_transitions and delta to a ReplayRecorder, together with a hash of the state of the
+simulation after the frame (state_hash). headless.run_headless feeds a loaded Replay back through the same systems,
+as fast as they go, and compares the hashes, so a change to a system can be checked against a recorded session frame
+by frame, i.e.
+
+    python main.py --record session.replay
+    python headless.py --replay session.replay --numpy-movement
+
+a replay file is gzipped text: a header line `wanderer-replay <version> <map id> <background interval>`, then one
+line per frame, `<delta> <state hash> <key transitions>`, where every key transition is +key (pressed down) or -key
+(released) with the pygame key code.
+"""
+import gzip
+import hashlib
+
+from components import BoundsComponent, HealthComponent, MovementComponent
+
+MAGIC = 'wanderer-replay'
+VERSION = 2
+
+
+def state_hash(entities, world):
+    """
+    digest of everything the systems decide: the current map and, in registry order, the bounds, health, velocity and
+    component names of every entity. animation frames are left out, they only advance while drawn
+    """
+    state = [world['default'].map_id]
+
+    for entity in entities:
+        components = entity.components
+
+        bounds = components.get(BoundsComponent.name)
+        health = components.get(HealthComponent.name)
+        movement = components.get(MovementComponent.name)
+
+        state.append((
+            tuple(bounds.bounds) if bounds is not None else None,
+            health.current_health if health is not None else None,
+            (movement.velx, movement.vely, len(movement.dynamic)) if movement is not None else None,
+            sorted(components)
+        ))
+
+    return hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+
+
+class Replay(object):
+    """
+    a recorded session: the map it started on, the background_interval it was played with and a list of
+    (delta, key_transitions, state hash) for every frame
+    """
+
+    def __init__(self, map_id, background_interval=0, frames=None):
+        self.map_id = map_id
+        self.background_interval = background_interval
+        self.frames = frames if frames is not None else []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def save(self, filename):
+        with gzip.open(filename, 'wt') as f:
+            f.write('{} {} {} {}\n'.format(MAGIC, VERSION, self.map_id, self.background_interval))
+
+            for delta, key_transitions, state in self.frames:
+                keys = ''.join(' {}{}'.format('+' if down else '-', key)
+                               for key, down in sorted(key_transitions.items()))
+                f.write('{} {}{}\n'.format(delta, state, keys))
+
+
+def load_replay(filename):
+    with gzip.open(filename, 'rt') as f:
+        header = f.readline().split()
+        if len(header) != 4 or header[0] != MAGIC or header[1] != str(VERSION):
+            raise ValueError('{} is not a replay file'.format(filename))
+
+        replay = Replay(header[2], int(header[3]))
+
+        for number, line in enumerate(f, 2):
+            try:
+                delta, state, *keys = line.split()
+                key_transitions = {int(key[1:]): key[0] == '+' for key in keys}
+            except ValueError:
+                raise ValueError('{}:{}: cannot read frame {!r}'.format(filename, number, line))
+
+            replay.frames.append((int(delta), key_transitions, state))
+
+    return replay
+
+
+class ReplayRecorder(object):
+    """
+    collects the frames of the game play_game is running and writes them to filename on save(). every new game
+    (begin) starts the recording over, so the file ends up holding the last one
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.replay = None
+
+    def begin(self, map_id, background_interval=0):
+        self.replay = Replay(map_id, background_interval)
+
+    def record(self, delta, key_transitions, entities, world):
+        self.replay.frames.append((delta, dict(key_transitions), state_hash(entities, world)))
+
+    def save(self):
+        if self.replay is not None:
+            self.replay.save(self.filename)
@@ -0,0 +1,243 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# pseudo components for declare() / SystemScheduler besides the component names: which entities there are and which
+# components they have (every query reads it, every system that records commands writes it), the map the world is on,
+# the screen and the flow field of the map (see navigation.FlowField), which is searched again as the player moves
+# rather than at a sync point
+ENTITIES = 'entities'
+WORLD = 'world'
+SCREEN = 'screen'
+NAVIGATION = 'navigation'
+
+
+def declare(reads=(), writes=()):
+    """
+    decorator for a system: the components (names, or one of the pseudo components above) it reads and writes. the
+    SystemScheduler only lets systems run at the same time if neither writes anything the other one touches
+    """
+    def decorate(system):
+        system.reads = frozenset(reads) | frozenset(writes)
+        system.writes = frozenset(writes)
+        return system
+
+    return decorate
+
+
+class AutomatonScheduler(object):
+    """
+    decides which automatons automation_system re-plans on a given frame (ai level of detail).
+
+    automatons the system asks for every frame (close to the player or on screen) are kept in one set, all others are
+    filed under the frame they are due next on a ring of `period` frames. an automaton planned every n frames (n has to
+    divide period) always lands on the frames that leave the same remainder, picked from the order it showed up in, so
+    that the distant automatons are spread evenly over the frames and the cost per frame stays bounded.
+    """
+
+    def __init__(self, period=16):
+        self.period = period
+        self.frame = 0
+
+        # used as insertion ordered sets
+        self.every_frame = {}
+        self.buckets = [{} for _ in range(period)]
+
+        # entity -> (bucket index or None for every frame, phase)
+        self.scheduled = {}
+        self._sequence = 0
+
+        # the query result the members were last synced with
+        self.members = ()
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def sync(self, automatons):
+        """
+        pick up the automatons that were added or removed since the last call. automatons is the (cached) result of the
+        automaton query, so nothing needs to be done as long as it is the same tuple
+        """
+        if automatons is self.members:
+            return
+
+        current = set(automatons)
+        for entity in [entity for entity in self.scheduled if entity not in current]:
+            self.remove(entity)
+
+        for entity in automatons:
+            if entity not in self.scheduled:
+                # plan new automatons straight away
+                self.scheduled[entity] = (None, self._sequence)
+                self._sequence += 1
+                self.every_frame[entity] = None
+
+        self.members = automatons
+
+    def due(self):
+        """
+        Returns: list of the automatons to plan on this frame
+        """
+        bucket = self.buckets[self.frame % self.period]
+        due = list(self.every_frame)
+        due.extend(bucket)
+        bucket.clear()
+        return due
+
+    def schedule(self, entity, interval):
+        """
+        plan entity again in interval frames, 1 meaning every frame. called for every automaton that was due
+        """
+        where, phase = self.scheduled[entity]
+
+        if interval <= 1:
+            if where is not None:
+                self.every_frame[entity] = None
+                self.scheduled[entity] = (None, phase)
+            return
+
+        self.every_frame.pop(entity, None)
+
+        # the next frame after this one that leaves the remainder of this entity's phase
+        frame = self.frame + 1 + (phase - self.frame - 1) % interval
+        where = frame % self.period
+        self.buckets[where][entity] = None
+        self.scheduled[entity] = (where, phase)
+
+    def advance(self):
+        self.frame += 1
+
+    def remove(self, entity):
+        where, phase = self.scheduled.pop(entity)
+        if where is None:
+            del self.every_frame[entity]
+        else:
+            self.buckets[where].pop(entity, None)
+
+    def clear(self):
+        self.every_frame.clear()
+        for bucket in self.buckets:
+            bucket.clear()
+        self.scheduled.clear()
+        self.members = ()
+
+
+class SystemScheduler(object):
+    """
+    runs a list of systems (see game.run_systems) as a dependency graph instead of one after the other.
+
+    a system depends on every system before it in the list that writes something it reads or reads something it
+    writes. a system without declarations (see declare) depends on, and is depended on by, everything.
+
+    the systems that write the entities or the world record commands and end in a sync point (see game.sync_point).
+    they run on the calling thread, as does every system that all later systems wait for anyway. the others are handed
+    to a thread pool and start as soon as the systems they depend on are done, so i.e. the map render can go on while
+    the chain of systems that work on the entities runs.
+
+    a change of map at a sync point waits for everything still reading the world and ends the frame, the systems after
+    a system that writes the world depend on it. the results are the same as running the list in order, which stays
+    the deterministic fallback (game.run_systems without a scheduler).
+
+    handing systems to the pool only pays off with a second core to run them on, on a single core it only adds the
+    cost of switching threads. with a single worker or on a single core every system runs on the calling thread in
+    order.
+    """
+
+    def __init__(self, systems, workers=2):
+        self.systems = list(systems)
+        self.workers = workers
+
+        n = len(self.systems)
+
+        # index -> indices of the earlier systems it has to wait for
+        self.dependencies = [set(j for j in range(i) if self._conflict(self.systems[j], system))
+                             for i, system in enumerate(self.systems)]
+
+        # only the systems that record commands end in a sync point
+        self.syncs = [not self._writes(system).isdisjoint((ENTITIES, WORLD)) for system in self.systems]
+
+        # index -> every later system that depends on it, directly or not
+        waited_for = [set() for _ in self.systems]
+        for i in reversed(range(n)):
+            for j in self.dependencies[i]:
+                waited_for[j] |= waited_for[i] | {i}
+
+        self.inline = [self.syncs[i] or waited_for[i] >= set(range(i + 1, n)) for i in range(n)]
+
+        if workers <= 1 or (os.cpu_count() or 1) == 1:
+            self.inline = [True] * n
+
+        self._executor = None
+
+    def run(self, sync, profiler=None, **kwargs):
+        """
+        call every system with kwargs. sync(settle) is called after every system that records commands and returns
+        True if it changed the map, it has to call settle() before it does
+
+        Returns: True if the map changed, the systems after the one that changed it did not run
+        """
+        pending = {}
+
+        def settle():
+            # the map is about to change, everything that still works on the old one has to finish first
+            for j in sorted(pending):
+                if WORLD in self._reads(self.systems[j]):
+                    pending.pop(j).result()
+
+        try:
+            for i, system in enumerate(self.systems):
+                if pending:
+                    for j in self.dependencies[i]:
+                        future = pending.pop(j, None)
+                        if future is not None:
+                            future.result()
+
+                if not self.inline[i]:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+                    pending[i] = self._executor.submit(self._call, system, profiler, kwargs)
+                    continue
+
+                self._call(system, profiler, kwargs)
+
+                if self.syncs[i] and sync(settle):
+                    return True
+        finally:
+            for future in pending.values():
+                future.result()
+
+        return False
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @staticmethod
+    def _call(system, profiler, kwargs):
+        if profiler is None:
+            system(**kwargs)
+        else:
+            with profiler.section(system.__name__):
+                system(**kwargs)
+
+    @staticmethod
+    def _reads(system):
+        reads = getattr(system, 'reads', None)
+        return reads if reads is not None else frozenset([ENTITIES, WORLD, SCREEN, NAVIGATION])
+
+    @staticmethod
+    def _writes(system):
+        writes = getattr(system, 'writes', None)
+        return writes if writes is not None else frozenset([ENTITIES, WORLD, SCREEN, NAVIGATION])
+
+    @classmethod
+    def _conflict(cls, earlier, later):
+        if getattr(earlier, 'reads', None) is None or getattr(later, 'reads', None) is None:
+            return True
+
+        if WORLD in cls._writes(earlier):
+            return True
+
+        # the world only changes at sync points, which settle the systems reading it themselves
+        earlier_writes, later_writes = cls._writes(earlier) - {WORLD}, cls._writes(later) - {WORLD}
+        return not earlier_writes.isdisjoint(cls._reads(later)) or not later_writes.isdisjoint(cls._reads(earlier))
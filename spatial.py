@@ -0,0 +1,205 @@
+from pygame import Rect
+
+
+class SpatialHash(object):
+    """
+    uniform grid broadphase. every entity is filed under each cell its bounds overlap, so finding the entities that
+    might touch a rect only has to look at the handful of cells that the rect covers.
+
+    the hash does not watch the rects it was given. whoever moves an entity has to call update() afterwards.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+
+        # (cell_x, cell_y) -> set of entities overlapping that cell
+        self.cells = {}
+        # entity -> (first_x, first_y, last_x, last_y) cell span it is currently filed under
+        self.spans = {}
+
+    def __contains__(self, entity):
+        return entity in self.spans
+
+    def __len__(self):
+        return len(self.spans)
+
+    def span(self, rect):
+        size = self.cell_size
+        # a rect covers [left, right) and [top, bottom). zero sized rects still get the cell they sit in
+        return rect.left // size, rect.top // size, \
+            max(rect.left, rect.right - 1) // size, max(rect.top, rect.bottom - 1) // size
+
+    def insert(self, entity, rect):
+        span = self.span(rect)
+        self.spans[entity] = span
+        self._file(entity, span)
+
+    def update(self, entity, rect):
+        old = self.spans.get(entity)
+        if old is None:
+            return
+
+        span = self.span(rect)
+        if span != old:
+            self._unfile(entity, old)
+            self._file(entity, span)
+            self.spans[entity] = span
+
+    def remove(self, entity):
+        span = self.spans.pop(entity, None)
+        if span is not None:
+            self._unfile(entity, span)
+
+    def clear(self):
+        self.cells.clear()
+        self.spans.clear()
+
+    def query(self, rect):
+        """
+        return the set of entities filed under any cell that rect overlaps. this is a superset of the entities that
+        actually collide with rect, the caller still has to do the exact test
+        """
+        first_x, first_y, last_x, last_y = self.span(rect)
+        cells = self.cells
+
+        if first_x == last_x and first_y == last_y:
+            return set(cells.get((first_x, first_y), ()))
+
+        found = set()
+        for x in range(first_x, last_x + 1):
+            for y in range(first_y, last_y + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    found.update(cell)
+
+        return found
+
+    def _file(self, entity, span):
+        first_x, first_y, last_x, last_y = span
+        cells = self.cells
+        for x in range(first_x, last_x + 1):
+            for y in range(first_y, last_y + 1):
+                cell = cells.get((x, y))
+                if cell is None:
+                    cells[(x, y)] = {entity}
+                else:
+                    cell.add(entity)
+
+    def _unfile(self, entity, span):
+        first_x, first_y, last_x, last_y = span
+        cells = self.cells
+        for x in range(first_x, last_x + 1):
+            for y in range(first_y, last_y + 1):
+                cell = cells[(x, y)]
+                cell.discard(entity)
+                if not cell:
+                    del cells[(x, y)]
+
+
+# the state of a cell of a SolidGrid
+EMPTY = 0
+PARTIAL = 1
+FULL = 2
+
+
+class SolidGrid(object):
+    """
+    the static walls of a map, rasterized at tile resolution so that asking whether a rect runs into one of them only
+    looks at the few cells the rect covers instead of at every wall.
+
+    a cell is either empty, full (i.e. a solid tile, or completely inside a wall) or partly covered, in which case the
+    walls that cover it are kept with it and tested exactly. the answer is the same as testing every wall with
+    colliderect.
+
+    the grid covers the map plus whatever sticks out of it, its origin is the top left of the first cell in pixels.
+    """
+
+    def __init__(self, origin_x, origin_y, width, height, tile_width, tile_height):
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+
+        # row major, one of EMPTY, PARTIAL or FULL per cell
+        self.cells = bytearray(width * height)
+        # cell index -> list of the walls partly covering that cell
+        self.partial = {}
+
+    def __bool__(self):
+        return any(self.cells)
+
+    def span(self, rect):
+        """
+        Returns: (first_x, first_y, last_x, last_y) cells that rect overlaps, clipped to the grid. empty (first > last)
+            if rect misses the grid
+        """
+        x, y = rect.left - self.origin_x, rect.top - self.origin_y
+        right, bottom = max(x, x + rect.width - 1), max(y, y + rect.height - 1)
+
+        return max(0, x // self.tile_width), max(0, y // self.tile_height), \
+            min(self.width - 1, right // self.tile_width), min(self.height - 1, bottom // self.tile_height)
+
+    def cell_rect(self, x, y):
+        return Rect(self.origin_x + x * self.tile_width, self.origin_y + y * self.tile_height,
+                    self.tile_width, self.tile_height)
+
+    def add_rect(self, rect):
+        # rects without an area never collide with anything
+        if rect.width <= 0 or rect.height <= 0:
+            return
+
+        first_x, first_y, last_x, last_y = self.span(rect)
+        for y in range(first_y, last_y + 1):
+            for x in range(first_x, last_x + 1):
+                cell = self.cell_rect(x, y)
+                if rect.contains(cell):
+                    self.fill_cell(x, y)
+                else:
+                    index = y * self.width + x
+                    if self.cells[index] != FULL:
+                        self.cells[index] = PARTIAL
+                        self.partial.setdefault(index, []).append(Rect(rect))
+
+    def fill_cell(self, x, y):
+        index = y * self.width + x
+        self.cells[index] = FULL
+        self.partial.pop(index, None)
+
+    def blocked(self, rect):
+        """
+        Returns: True if rect overlaps any wall
+        """
+        left, top, width, height = rect
+        if width <= 0 or height <= 0:
+            return False
+
+        # span() inlined, this is asked for every step of every mover
+        x, y = left - self.origin_x, top - self.origin_y
+        first_x, last_x = x // self.tile_width, (x + width - 1) // self.tile_width
+        first_y, last_y = y // self.tile_height, (y + height - 1) // self.tile_height
+
+        if first_x < 0:
+            first_x = 0
+        if first_y < 0:
+            first_y = 0
+        if last_x >= self.width:
+            last_x = self.width - 1
+        if last_y >= self.height:
+            last_y = self.height - 1
+
+        cells, width, partial = self.cells, self.width, self.partial
+        for row in range(first_y * width, last_y * width + 1, width):
+            for index in range(row + first_x, row + last_x + 1):
+                state = cells[index]
+                if not state:
+                    continue
+                if state == FULL:
+                    # rect overlaps every cell of its span, so it overlaps whatever covers one of them completely
+                    return True
+                for wall in partial[index]:
+                    if wall.colliderect(rect):
+                        return True
+
+        return False
@@ -4,9 +4,34 @@ from constants import *
 from helpers import *
 from pygame.locals import *
 from math import sqrt
+from scheduling import declare, ENTITIES, WORLD, SCREEN, NAVIGATION
 
 
 def relevant_entities(entities, required_components, optional_components=list(), disallowed_components=list()):
+    """
+    entities with all required components, at least one of each pair of optional components and none of the disallowed
+    components. an EntityRegistry answers from its cached archetype queries, anything else is scanned in full
+    """
+    query = getattr(entities, 'query', None)
+    if query is not None:
+        return query(required_components, optional_components, disallowed_components)
+
+    return scan_entities(entities, required_components, optional_components, disallowed_components)
+
+
+def changed_entities(entities, key, watched_components, required_components, disallowed_components=list()):
+    """
+    like relevant_entities, but an EntityRegistry only hands out the entities that had one of the watched components
+    change or a component added or removed since the last call under key (see EntityRegistry.changed)
+    """
+    changed = getattr(entities, 'changed', None)
+    if changed is not None:
+        return changed(key, watched_components, required_components, disallowed=disallowed_components)
+
+    return relevant_entities(entities, required_components, disallowed_components=disallowed_components)
+
+
+def scan_entities(entities, required_components, optional_components=list(), disallowed_components=list()):
     # todo optional components should be lists of lists of components such that at least one component from each
     #  sublist is present in the entity
     for item in entities:
@@ -20,16 +45,92 @@ def relevant_entities(entities, required_components, optional_components=list(),
                     yield item
 
 
+@declare(reads=[PlayerComponent.name, CollisionImmaterialComponent.name, CollisionSolidComponent.name,
+               CollisionKnockbackComponent.name, CollisionDamagingComponent.name, CollisionTransitionComponent.name,
+               CollisionIgnoreComponent.name, RootedComponent.name],
+         writes=[BoundsComponent.name, MovementComponent.name, HealthComponent.name, InvulnerableComponent.name,
+                 ENTITIES, WORLD])
 def movement_system(entities, delta_time=0, world=None, player=None, **kwargs):
+    """
+    entities has to be an EntityRegistry, unlike for the other systems a plain list won't do: the movers are looked up
+    in its broadphase, their impulses batched in its impulsed, and map transitions queued in its command buffer
+    """
     # only want to process entities who have a PositionComponent and either Movement or Acceleration Component
 
     # for now, we aren't worrying about acceleration. that will come later todo or another system
+    columns = entities.columns
+    if columns is not None and len(columns):
+        return columnar_movement_system(entities, columns, delta_time, world, player)
+
     requirements = [BoundsComponent.name, MovementComponent.name]
 
+    impulsed = entities.impulsed
+    if impulsed:
+        apply_impulses(impulsed)
+
     for entity in relevant_entities(entities, requirements):
-        pos = entity.components[BoundsComponent.name]
-        mov = entity.components[MovementComponent.name]
+        move_entity(entity, entities, delta_time, world, player)
 
+        # once a transition was hit, nobody else moves on the map that is about to be left
+        if entities.commands.map_change is not None:
+            break
+
+    if impulsed:
+        decay_impulses(impulsed, delta_time)
+
+
+def apply_impulses(impulsed):
+    """
+    add up the knockback impulses of every mover in impulsed (see EntityRegistry.impulsed) in one batch, ahead of
+    movement_system moving them. the impulses are added on top of the constant velocity exactly the way move_entity
+    does, the sums are kept in the Impulses store of the mover (see Impulses.add_up)
+    """
+    for entity, mov in impulsed.items():
+        dynamic = mov.dynamic
+        if not dynamic.count:
+            continue
+
+        if RootedComponent.name in entity.components:
+            dynamic.add_up(0, 0)
+        else:
+            dynamic.add_up(mov.velx, mov.vely)
+
+
+def decay_impulses(impulsed, delta_time):
+    """
+    age the impulses apply_impulses added up, in one batch after movement_system moved everyone. knockbacks picked up
+    while moving are left alone, as are the movers that did not get to move before a map change. movers that ran out
+    of impulses are dropped from impulsed
+    """
+    dropped = None
+
+    for entity, mov in impulsed.items():
+        dynamic = mov.dynamic
+        if dynamic.moved:
+            dynamic.decay(delta_time, dynamic.summed)
+            dynamic.moved = False
+        dynamic.summed = 0
+
+        if not dynamic.count:
+            if dropped is None:
+                dropped = []
+            dropped.append(entity)
+
+    if dropped is not None:
+        for entity in dropped:
+            del impulsed[entity]
+
+
+def move_entity(entity, entities, delta_time, world, player):
+    pos = entity.components[BoundsComponent.name]
+    mov = entity.components[MovementComponent.name]
+
+    dynamic = mov.dynamic
+    if dynamic.summed:
+        # already added up with the constant velocity by apply_impulses, aged by decay_impulses
+        delta_x, delta_y = dynamic.sum_x, dynamic.sum_y
+        dynamic.moved = True
+    else:
         # sums for which to ultimately apply change in position
         delta_x, delta_y = 0, 0
 
@@ -40,28 +141,43 @@ def movement_system(entities, delta_time=0, world=None, player=None, **kwargs):
             delta_x += mov.velx
             delta_y += mov.vely
 
-        # move according to dynamic-velocities (aka will be removed after time runs out)
-        updated_dynamics = []
-        for dyn in mov.dynamic:
-            delta_x += dyn[0]
-            delta_y += dyn[1]
+        # move according to dynamic-velocities (aka will be removed after time runs out). stale movements are purged
+        # in place
+        if mov.dynamic.count:
+            delta_x, delta_y = mov.dynamic.step(delta_x, delta_y, delta_time)
+
+    # move will return a new Rect but not mutate the existing one
+    new_pos = pos.bounds.move(delta_x * delta_time, delta_y * delta_time)
 
-            # purge any stale movements
-            if dyn[2] - delta_time > 0.0:
-                updated_dynamics.append((dyn[0], dyn[1], dyn[2] - delta_time))
+    if collision_system(new_pos, entity, entities, world=world, player=player):
+        # finally, move the entity
+        pos.bounds.move_ip(delta_x * delta_time, delta_y * delta_time)
+        entities.moved(entity)
 
-        # it's not great, but it should work
-        mov.dynamic = updated_dynamics
 
-        # move will return a new Rect but not mutate the existing one
-        new_pos = pos.bounds.move(delta_x * delta_time, delta_y * delta_time)
+def columnar_movement_system(entities, columns, delta_time, world, player):
+    """
+    movement_system for a registry with numpy movement columns. the movers that might touch something take the usual
+    per entity path in registry order, all the others are moved at once afterwards. ends up exactly where the plain
+    movement_system would
+    """
+    alone, new_x, new_y = columns.plan(delta_time, world['default'].solids if world is not None else None)
+    movers = list(columns.entities)
+    order = columns.order[:len(movers)].copy()
+
+    for slot in columns.crowded_slots(alone):
+        move_entity(movers[slot], entities, delta_time, world, player)
 
-        # try:
-        if collision_system(new_pos, entity, entities, world=world, player=player):
-            # finally, move the entity
-            pos.bounds.move_ip(delta_x * delta_time, delta_y * delta_time)
-        # except MapChangeException:
-        #     raise MapChangeException
+        if entities.commands.map_change is not None:
+            # a transition was hit, only the movers ahead of this one had their turn (see movement_system)
+            alone = alone & (order < order[slot])
+            break
+
+    if columns.entities == movers:
+        columns.apply(alone, new_x, new_y, delta_time, entities.spatial, entities.draw_order, entities.changes)
+    else:
+        # the movers changed while moving the crowded ones, the slots can't be trusted anymore
+        columns.apply_each(movers, alone, new_x, new_y, delta_time)
 
 
 def collision_system(new, current, entities, world, player):
@@ -71,25 +187,23 @@ def collision_system(new, current, entities, world, player):
 
     result of collision will be based on the collision-relevant traits of each entity
 
+    only the neighbours that the broadphase of the entity registry finds around the new position are tested. the walls
+    of the map are not entities, they are looked up in its solid grid (see spatial.SolidGrid)
+
     Returns True if player can move
     """
-    can_move = True
-    for entity in relevant_entities(entities,
-                                    [BoundsComponent.name],
-                                    disallowed_components=[CollisionImmaterialComponent.name]):
+    solids = world['default'].solids if world is not None else None
+    can_move = solids is None or not solids.blocked(new)
+
+    for entity in entities.nearby(new):
         # do not process an entity's collision with itself
         if entity is current:
             continue
 
         # check if this entity is on the current's ignore list
-        ignore_list = entity.components.get(CollisionIgnoreComponent.name)
-        if ignore_list is not None:
-            cont = False
-            for ignored in ignore_list.ignore_list:
-                if ignored is current:
-                    cont = True
-            if cont:
-                continue
+        ignore = entity.components.get(CollisionIgnoreComponent.name)
+        if ignore is not None and current.id in ignore.ignored:
+            continue
 
         target_bounds = entity.components[BoundsComponent.name].bounds
         # given the pygame.Rect object 'new' and the pygame.Rect object, check for collision!
@@ -133,13 +247,17 @@ def collision_system(new, current, entities, world, player):
                     current.components[InvulnerableComponent.name] = \
                         InvulnerableComponent(INVULNERABLE_AFTER_DAMAGE_TIMER)
 
-            if transition is not None:
-                # cause a transition to the next map
-                map_transition(world, transition.target, transition.target_x, transition.target_y, entities, player)
+            if transition is not None and transition.target in world:
+                # cause a transition to the next map once movement_system is done. current stays where it is and
+                # nothing else touches it this frame
+                entities.commands.change_map(transition.target, transition.target_x, transition.target_y)
+                return False
 
     return can_move
 
 
+@declare(reads=[InputComponent.name, AttackComponent.name, DirectionComponent.name, UnableToAttackComponent.name],
+         writes=[BoundsComponent.name, MovementComponent.name, AnimatedSpriteComponent.name, ENTITIES, WORLD])
 def input_system(entities, key_transitions=None, world=None, player=None, **kwargs):
     """
     for each entity that has an input component, take the appropriate action by the component's state
@@ -161,6 +279,7 @@ def input_system(entities, key_transitions=None, world=None, player=None, **kwar
             do_center = key_transitions.get(K_z)
             if do_center:
                 pos.bounds.x, pos.bounds.y = 320, 320
+                entities.moved(entity)
 
         movement = entity.components.get(MovementComponent.name)
 
@@ -199,16 +318,17 @@ def input_system(entities, key_transitions=None, world=None, player=None, **kwar
             space = key_transitions.get(K_SPACE)
             if space == True:
                 # attack!
-                entities.append(PlayerAttackEntity(entity))
+                entities.commands.spawn(PlayerAttackEntity(entity))
 
                 animation = entity.components.get(AnimatedSpriteComponent.name)
                 if animation is not None:
                     animation.set_state(STATE_ATTACKING + direction.direction, False)
 
                 # player cannot move while attacking
-                entity.components[RootedComponent.name] = RootedComponent(PLAYER_ATTACK_ANIMATION_DURATION)
-                entity.components[UnableToAttackComponent.name] = \
-                    UnableToAttackComponent(PLAYER_ATTACK_ANIMATION_DURATION)
+                entities.commands.add_component(entity, RootedComponent.name,
+                                                RootedComponent(PLAYER_ATTACK_ANIMATION_DURATION))
+                entities.commands.add_component(entity, UnableToAttackComponent.name,
+                                                UnableToAttackComponent(PLAYER_ATTACK_ANIMATION_DURATION))
 
         # implement world transitions as a number pressed down
         if world is not None:
@@ -227,7 +347,32 @@ def input_system(entities, key_transitions=None, world=None, player=None, **kwar
                         return
 
 
+@declare(writes=[TimeToLiveComponent.name, RootedComponent.name, UnableToAttackComponent.name,
+                 InvulnerableComponent.name, ENTITIES])
 def aging_system(entities, delta_time=0, **kwargs):
+    """
+    remove the entities whose time to live ran out and the status components that wore off. an EntityRegistry keeps
+    the expiry times in a heap (see timers.TimerHeap), so only the timers that are due are looked at. anything else
+    is aged component by component
+    """
+    timers = getattr(entities, 'timers', None)
+    if timers is None:
+        return scan_aging(entities, delta_time)
+
+    expired = timers.advance(delta_time)
+
+    # remove stale entities
+    for entity, key, component in expired:
+        if isinstance(component, TimeToLiveComponent):
+            entities.commands.despawn(entity)
+
+    # remove stale components from entities
+    for entity, key, component in expired:
+        if isinstance(component, StatusComponent):
+            entities.commands.remove_component(entity, key, component)
+
+
+def scan_aging(entities, delta_time):
     # remove stale entities
     to_remove = []
     for entity in relevant_entities(entities, [TimeToLiveComponent.name]):
@@ -249,6 +394,7 @@ def aging_system(entities, delta_time=0, **kwargs):
             del entity.components[key]
 
 
+@declare(reads=[HealthComponent.name], writes=[ENTITIES])
 def death_system(entities, **kwargs):
     """
 
@@ -259,7 +405,6 @@ def death_system(entities, **kwargs):
     Returns:
 
     """
-    to_remove = []
     for entity in relevant_entities(entities, [HealthComponent.name]):
         health = entity.components[HealthComponent.name].current_health
 
@@ -268,9 +413,7 @@ def death_system(entities, **kwargs):
             # and give it a death timer (TTL component) equal to the length of the animation
 
             # fixme for now, simply eliminate the entity
-            to_remove.append(entity)
-
-    [entities.remove(entity) for entity in to_remove]
+            entities.commands.despawn(entity)
 
 mss_rate = 3
 
@@ -287,18 +430,35 @@ def monster_spawn_system(entities, delta_time=0, global_timer=1, **kwargs):
         print("Spawned a monster!")
 
 
-def graphics_system(entities, output=None, delta_time=0, **kwargs):
+@declare(reads=[BoundsComponent.name, SpriteComponent.name, ENTITIES], writes=[AnimatedSpriteComponent.name, SCREEN])
+def graphics_system(entities, output=None, delta_time=0, drawn=None, viewport=None, **kwargs):
+    """
+    draw every entity with bounds and a sprite onto output. if drawn is given, the screen rect of every blit is
+    appended to it (used by the dirty rectangle mode)
+
+    viewport is the part of the map on screen (graphics.Camera.rect, the whole of output at the top left of the map if
+    not given). entities are drawn relative to it, the ones whose bounds miss it are skipped and their animations don't
+    advance while they are not drawn
+    """
     # can't do anything if we don't have a screen to draw to!
     if output is None:
         return
 
-    # have to draw the entities in the correct order. any entity positioned 'below' another should be drawn afterward
-    # todo move this somewhere else to be more efficient (if it becomes an issue)
-    entities_to_draw = [entity for entity in relevant_entities(entities, [BoundsComponent.name], optional_components=[(AnimatedSpriteComponent.name, SpriteComponent.name)])]
-    entities_to_draw.sort(
-        key=lambda x: x.components[BoundsComponent.name].bounds.y,
-        reverse=False
-    )
+    if viewport is None:
+        viewport = output.get_rect()
+
+    # have to draw the entities in the correct order. any entity positioned 'below' another should be drawn afterward.
+    # the registry keeps them sorted by y as they move (see draworder.DrawOrder)
+    draw_order = getattr(entities, 'draw_order', None)
+    if draw_order is not None:
+        entities_to_draw = draw_order.visible(viewport)
+    else:
+        entities_to_draw = [entity for entity in relevant_entities(entities, [BoundsComponent.name], optional_components=[(AnimatedSpriteComponent.name, SpriteComponent.name)])
+                            if viewport.colliderect(entity.components[BoundsComponent.name].bounds)]
+        entities_to_draw.sort(
+            key=lambda x: x.components[BoundsComponent.name].bounds.y,
+            reverse=False
+        )
 
     # process all entries
     for entity in entities_to_draw:
@@ -307,15 +467,21 @@ def graphics_system(entities, output=None, delta_time=0, **kwargs):
             img = entity.components[SpriteComponent.name]
 
         img = img.get_image(delta_time=delta_time)
-        pos = entity.components[BoundsComponent.name].bounds.x, entity.components[BoundsComponent.name].bounds.y
+        bounds = entity.components[BoundsComponent.name].bounds
+        pos = bounds.x - viewport.x, bounds.y - viewport.y
 
-        output.blit(img, pos)
+        rect = output.blit(img, pos)
+        if drawn is not None:
+            drawn.append(rect)
 
 
+@declare(reads=[MovementComponent.name, RootedComponent.name, ENTITIES], writes=[DirectionComponent.name])
 def direction_system(entities, **kwargs):
-    for entity in relevant_entities(entities,
-                                    [MovementComponent.name, DirectionComponent.name],
-                                    disallowed_components=[RootedComponent.name]):  # if you're stuck, you're stuck!
+    # the direction only follows the velocity, so only the entities whose velocity changed need to be turned
+    for entity in changed_entities(entities, 'direction_system',
+                                   [MovementComponent.name],
+                                   [MovementComponent.name, DirectionComponent.name],
+                                   disallowed_components=[RootedComponent.name]):  # if you're stuck, you're stuck!
         mov = entity.components[MovementComponent.name]
         dire = entity.components[DirectionComponent.name]
 
@@ -329,10 +495,15 @@ def direction_system(entities, **kwargs):
             dire.set(DirectionComponent.South)
 
 
+@declare(reads=[MovementComponent.name, DirectionComponent.name, RootedComponent.name, ENTITIES],
+         writes=[AnimatedSpriteComponent.name])
 def direction_movement_animation_system(entities, **kwargs):
-    for entity in relevant_entities(entities,
-                                    [MovementComponent.name, DirectionComponent.name, AnimatedSpriteComponent.name],
-                                    disallowed_components=[RootedComponent.name]):  # if you're stuck, you're stuck!
+    # setting the same state again changes nothing, so only the entities whose velocity or direction changed (or that
+    # just got unrooted) need their state set
+    for entity in changed_entities(entities, 'direction_movement_animation_system',
+                                   [MovementComponent.name, DirectionComponent.name],
+                                   [MovementComponent.name, DirectionComponent.name, AnimatedSpriteComponent.name],
+                                   disallowed_components=[RootedComponent.name]):  # if you're stuck, you're stuck!
         # seems to be working. will keep this here until a better way is found
         ani = entity.components[AnimatedSpriteComponent.name]
         mov = entity.components[MovementComponent.name]
@@ -345,89 +516,132 @@ def direction_movement_animation_system(entities, **kwargs):
 
 
 # todo implement change to flee personality here thru use of percent max health remaining on Entity
-def automation_system(entities, **kwargs):
-    for entity in relevant_entities(entities, [AutomatonComponent.name]):
-        # get relevant components of our automaton Entity
-        personality = entity.components[AutomatonComponent.name].personality
-        mov = entity.components.get(MovementComponent.name)
-        pos = entity.components.get(BoundsComponent.name)
-        attributes = entity.components.get(AttributesComponent.name)
+# the flow field hangs off the map but is searched here, mid frame, so it is declared on its own. the automaton
+# scheduler of the registry is advanced here too
+@declare(reads=[AutomatonComponent.name, BoundsComponent.name, AttributesComponent.name, PlayerComponent.name, WORLD],
+         writes=[MovementComponent.name, NAVIGATION, ENTITIES])
+def automation_system(entities, viewport=None, world=None, **kwargs):
+    """
+    plan the movement of every automaton towards or away from the player.
+
+    automatons within aggro range of the player or on screen (inside viewport, a Rect) are planned every frame. the
+    ones further away only every AUTOMATON_NEAR_INTERVAL or AUTOMATON_FAR_INTERVAL frames, spread over the frames by
+    the automaton scheduler of the registry (see scheduling.AutomatonScheduler)
+
+    they find their way around the walls along the flow field of the map (see navigation.FlowField), which is only
+    searched again once the player moved to another cell. in the open they head straight for the player
+    """
+    automatons = relevant_entities(entities, [AutomatonComponent.name])
 
-        # get components of the player entity
-        # todo find closest enemy -- this isnt a great solution
-        player = None
-        for ent2 in relevant_entities(entities, [PlayerComponent.name]):
-            player = ent2
+    # get components of the player entity, looked up once through the registry's index of players
+    # todo find closest enemy -- this isnt a great solution
+    player = None
+    for ent2 in relevant_entities(entities, [PlayerComponent.name]):
+        player = ent2
 
-        # in case something strange happens and there's no player available to act against,
-        # we do not need to continue processing the system at all
-        if player is None:
-            return
+    # in case something strange happens and there's no player available to act against,
+    # we do not need to continue processing the system at all
+    if player is None:
+        return
 
-        pos_player = player.components.get(BoundsComponent.name)
+    field = world['default'].flow_field if world is not None else None
+    if field is not None:
+        bounds = player.components[BoundsComponent.name].bounds
+        field.update(bounds.centerx, bounds.centery)
 
-        # check if player is within aggro range. if not, continue loop
-        aggro_range = attributes.vals.get(ATTRIBUTES_AGGRO_RANGE)
-        move_speed = attributes.vals.get(ATTRIBUTES_MOVE_SPEED)
+    scheduler = getattr(entities, 'automatons', None)
+    if scheduler is None:
+        for entity in automatons:
+            plan_automaton(entity, player, viewport, field)
+        return
 
-        if aggro_range is None:
-            continue
+    scheduler.sync(automatons)
+    for entity in scheduler.due():
+        scheduler.schedule(entity, plan_automaton(entity, player, viewport, field))
+    scheduler.advance()
 
-        dist = sqrt(
-            pow(pos_player.bounds.centerx - pos.bounds.centerx, 2) +
-            pow(pos_player.bounds.centery - pos.bounds.centery, 2))
 
-        if dist < aggro_range:
+def plan_automaton(entity, player, viewport, field=None):
+    """
+    set the constant velocity of one automaton
 
-            if personality == PERSONALITY_FLEE:
-                # run away from enemy
-                delta_x = pos.bounds.centerx - pos_player.bounds.centerx
-                delta_y = pos.bounds.centery - pos_player.bounds.centery
+    Returns: the number of frames until it should be planned again
+    """
+    # get relevant components of our automaton Entity
+    personality = entity.components[AutomatonComponent.name].personality
+    mov = entity.components.get(MovementComponent.name)
+    pos = entity.components.get(BoundsComponent.name)
+    attributes = entity.components.get(AttributesComponent.name)
 
-                if abs(delta_x) < 0.001:
-                    velx = 0.0
-                else:
-                    velx = (delta_x / abs(delta_x)) * move_speed
+    pos_player = player.components.get(BoundsComponent.name)
 
-                if abs(delta_y) < 0.001:
-                    vely = 0.0
-                else:
-                    vely = -(delta_y / abs(delta_y)) * move_speed
+    # check if player is within aggro range. if not, there is nothing to plan
+    aggro_range = attributes.vals.get(ATTRIBUTES_AGGRO_RANGE)
+    move_speed = attributes.vals.get(ATTRIBUTES_MOVE_SPEED)
 
-                mov.reset_constant()
+    if aggro_range is None:
+        return AUTOMATON_FAR_INTERVAL
 
-                mov.add_constant(velx, vely)
+    dist = sqrt(
+        pow(pos_player.bounds.centerx - pos.bounds.centerx, 2) +
+        pow(pos_player.bounds.centery - pos.bounds.centery, 2))
 
-            elif personality == PERSONALITY_AGGRESSIVE:
-                # if enemy is within attacking range
-                attack_range = attributes.vals.get(ATTRIBUTES_ATTACK_RANGE)
-                if attack_range and attack_range < dist:
-                    attack = entity.components.get(AttackComponent.name)
-                    if attack is not None:
-                        pass
-                        # if we are on attack cooldown: move away from enemy slowly
+    if dist < aggro_range:
 
-                        # else: perform an attack
+        if personality == PERSONALITY_FLEE:
+            # run away from enemy
+            step_x, step_y = steer(pos.bounds, pos_player.bounds, field, away=True)
 
-                # else: move towards enemy
-                delta_x = pos.bounds.centerx - pos_player.bounds.centerx
-                delta_y = pos.bounds.centery - pos_player.bounds.centery
+            # the steps are on screen, where y grows downward. constant velocities count y upward
+            mov.set_constant(step_x * move_speed, -step_y * move_speed)
 
-                if abs(delta_x) < 0.001:
-                    velx = 0.0
-                else:
-                    velx = -(delta_x / abs(delta_x)) * move_speed
+        elif personality == PERSONALITY_AGGRESSIVE:
+            # if enemy is within attacking range
+            attack_range = attributes.vals.get(ATTRIBUTES_ATTACK_RANGE)
+            if attack_range and attack_range < dist:
+                attack = entity.components.get(AttackComponent.name)
+                if attack is not None:
+                    pass
+                    # if we are on attack cooldown: move away from enemy slowly
 
-                if abs(delta_y) < 0.001:
-                    vely = 0.0
-                else:
-                    vely = (delta_y / abs(delta_y)) * move_speed
+                    # else: perform an attack
 
-                mov.reset_constant()
+            # else: move towards enemy
+            step_x, step_y = steer(pos.bounds, pos_player.bounds, field)
 
-                mov.add_constant(velx, vely)
+            mov.set_constant(step_x * move_speed, -step_y * move_speed)
 
-        else:
-            # for now, just reset movement
-            # todo enemies could patrol or pace around rooms
-            mov.reset_constant()
+        return 1
+
+    # for now, just reset movement
+    # todo enemies could patrol or pace around rooms
+    mov.reset_constant()
+
+    if viewport is not None and viewport.colliderect(pos.bounds):
+        return 1
+
+    if dist < AUTOMATON_NEAR_RANGE * aggro_range:
+        return AUTOMATON_NEAR_INTERVAL
+
+    return AUTOMATON_FAR_INTERVAL
+
+
+def steer(bounds, target, field=None, away=False):
+    """
+    Returns: (dx, dy), each -1, 0 or 1, the direction that takes bounds toward target (away from it if away). in a
+        straight line where no wall is in the way, along the flow field where it knows the way around the walls
+    """
+    if field is not None and not field.clear(bounds, target, away):
+        step = field.step(bounds, away)
+        if step is not None:
+            return step
+
+    delta_x = target.centerx - bounds.centerx
+    delta_y = target.centery - bounds.centery
+
+    step_x = (delta_x > 0) - (delta_x < 0)
+    step_y = (delta_y > 0) - (delta_y < 0)
+
+    if away:
+        return -step_x, -step_y
+    return step_x, step_y
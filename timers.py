@@ -0,0 +1,75 @@
+import heapq
+
+
+class TimerHeap(object):
+    """
+    expiry times of the timed components (TimeToLiveComponent and every StatusComponent) of the entities in a registry,
+    in a heap keyed on the time they run out.
+
+    the heap keeps a clock of its own that aging_system moves forward, so a component added with a ttl of t expires on
+    the first advance() that brings the clock t past the time it was added, exactly when counting its ttl down every
+    frame would have reached zero. only the timers that are due are looked at.
+
+    a timer that is cancelled (its component removed or replaced, or its entity taken out of the registry) stays in the
+    heap and is skipped once it comes up. cancelling writes the time that is left back to the component's ttl, so that
+    it keeps counting down from there in whichever registry the entity ends up next.
+    """
+
+    def __init__(self):
+        self.clock = 0
+
+        # (deadline, sequence, entity, key, component)
+        self._heap = []
+        self._sequence = 0
+
+        # component -> deadline of every timer that is running
+        self._deadlines = {}
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, component):
+        return component in self._deadlines
+
+    def add(self, entity, key, component):
+        deadline = self.clock + component.ttl
+
+        self._deadlines[component] = deadline
+        heapq.heappush(self._heap, (deadline, self._sequence, entity, key, component))
+        self._sequence += 1
+
+    def cancel(self, component):
+        deadline = self._deadlines.pop(component, None)
+        if deadline is not None:
+            component.ttl = deadline - self.clock
+
+    def remaining(self, component):
+        """
+        Returns: the time left on the timer of component
+        """
+        return self._deadlines[component] - self.clock
+
+    def advance(self, delta_time):
+        """
+        move the clock forward and stop every timer that ran out
+
+        Returns: list of (entity, key, component) of the expired timers, the earliest first
+        """
+        self.clock += delta_time
+
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= self.clock:
+            deadline, sequence, entity, key, component = heapq.heappop(heap)
+            if self._deadlines.get(component) == deadline:
+                del self._deadlines[component]
+                component.ttl = deadline - self.clock
+                expired.append((entity, key, component))
+
+        return expired
+
+    def clear(self):
+        for component in list(self._deadlines):
+            self.cancel(component)
+
+        del self._heap[:]